@@ -1,14 +1,122 @@
-import sqlite3
+import argparse
 import json
 import shutil
+import sys
 from datetime import datetime
-
-def backup_existing_data():
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "scripts"))
+import gymdb
+from instrumentation import add_profile_argument, count, profiling, span
+
+# Closure table of the ParentExerciseId variant trees: one row per (ancestor,
+# descendant) pair, including (x, x, 0). "All variants of X" is a PK range scan
+# and "root of Y" one index seek, instead of a recursive walk per call.
+EXERCISE_HIERARCHY_TABLE = """
+    CREATE TABLE IF NOT EXISTS ExerciseHierarchy (
+        AncestorId INTEGER NOT NULL,
+        DescendantId INTEGER NOT NULL,
+        Depth INTEGER NOT NULL,
+        PRIMARY KEY (AncestorId, DescendantId)
+    ) WITHOUT ROWID
+"""
+EXERCISE_HIERARCHY_INDEX = (
+    "CREATE INDEX IF NOT EXISTS IX_ExerciseHierarchy_Descendant ON ExerciseHierarchy (DescendantId, Depth)"
+)
+# Children lookups: the insert trigger and rebuild_exercise_hierarchy()
+EXERCISE_PARENT_INDEX = (
+    "CREATE INDEX IF NOT EXISTS IX_Exercises_ParentExerciseId ON Exercises (ParentExerciseId)"
+)
+
+# Triggers keep the closure in sync with whatever writes Exercises (the app,
+# the import tools) and refuse changes that would create a cycle
+EXERCISE_HIERARCHY_TRIGGERS = {
+    "TR_Exercises_Hierarchy_CheckInsert": """
+        CREATE TRIGGER TR_Exercises_Hierarchy_CheckInsert
+        BEFORE INSERT ON Exercises
+        WHEN NEW.ParentExerciseId IS NOT NULL
+        BEGIN
+            SELECT RAISE(ABORT, 'ExerciseHierarchy: cycle in ParentExerciseId')
+            WHERE NEW.ParentExerciseId = NEW.Id
+               OR EXISTS (
+                   SELECT 1 FROM ExerciseHierarchy h
+                   JOIN Exercises c ON c.Id = h.AncestorId
+                   WHERE h.DescendantId = NEW.ParentExerciseId AND c.ParentExerciseId = NEW.Id
+               );
+        END
+    """,
+    "TR_Exercises_Hierarchy_Insert": """
+        CREATE TRIGGER TR_Exercises_Hierarchy_Insert
+        AFTER INSERT ON Exercises
+        BEGIN
+            INSERT INTO ExerciseHierarchy (AncestorId, DescendantId, Depth)
+            SELECT NEW.Id, NEW.Id, 0
+            UNION ALL
+            SELECT AncestorId, NEW.Id, Depth + 1 FROM ExerciseHierarchy
+            WHERE DescendantId = NEW.ParentExerciseId;
+            -- Children inserted before their parent hang below it now
+            INSERT INTO ExerciseHierarchy (AncestorId, DescendantId, Depth)
+            SELECT a.AncestorId, d.DescendantId, a.Depth + d.Depth + 1
+            FROM ExerciseHierarchy a
+            JOIN Exercises c ON c.ParentExerciseId = NEW.Id AND c.Id <> NEW.Id
+            JOIN ExerciseHierarchy d ON d.AncestorId = c.Id
+            WHERE a.DescendantId = NEW.Id;
+        END
+    """,
+    "TR_Exercises_Hierarchy_CheckMove": """
+        CREATE TRIGGER TR_Exercises_Hierarchy_CheckMove
+        BEFORE UPDATE OF ParentExerciseId ON Exercises
+        WHEN NEW.ParentExerciseId IS NOT NULL AND NEW.ParentExerciseId IS NOT OLD.ParentExerciseId
+        BEGIN
+            SELECT RAISE(ABORT, 'ExerciseHierarchy: cycle in ParentExerciseId')
+            WHERE EXISTS (
+                SELECT 1 FROM ExerciseHierarchy
+                WHERE AncestorId = NEW.Id AND DescendantId = NEW.ParentExerciseId
+            );
+        END
+    """,
+    "TR_Exercises_Hierarchy_Move": """
+        CREATE TRIGGER TR_Exercises_Hierarchy_Move
+        AFTER UPDATE OF ParentExerciseId ON Exercises
+        WHEN NEW.ParentExerciseId IS NOT OLD.ParentExerciseId
+        BEGIN
+            -- Detach the subtree from its old ancestors, then attach it to the new ones
+            DELETE FROM ExerciseHierarchy
+            WHERE DescendantId IN (SELECT DescendantId FROM ExerciseHierarchy WHERE AncestorId = NEW.Id)
+              AND AncestorId NOT IN (SELECT DescendantId FROM ExerciseHierarchy WHERE AncestorId = NEW.Id);
+            INSERT INTO ExerciseHierarchy (AncestorId, DescendantId, Depth)
+            SELECT a.AncestorId, d.DescendantId, a.Depth + d.Depth + 1
+            FROM ExerciseHierarchy a, ExerciseHierarchy d
+            WHERE a.DescendantId = NEW.ParentExerciseId AND d.AncestorId = NEW.Id;
+        END
+    """,
+    "TR_Exercises_Hierarchy_Delete": """
+        CREATE TRIGGER TR_Exercises_Hierarchy_Delete
+        AFTER DELETE ON Exercises
+        BEGIN
+            -- Its children keep a dangling ParentExerciseId and become roots
+            DELETE FROM ExerciseHierarchy
+            WHERE DescendantId IN (SELECT DescendantId FROM ExerciseHierarchy WHERE AncestorId = OLD.Id)
+              AND AncestorId IN (SELECT AncestorId FROM ExerciseHierarchy WHERE DescendantId = OLD.Id);
+        END
+    """,
+}
+
+# Queries the closure table answers
+EXERCISE_VARIANTS_SQL = (
+    "SELECT DescendantId, Depth FROM ExerciseHierarchy WHERE AncestorId = ? AND Depth > 0"
+)
+EXERCISE_ROOT_SQL = (
+    "SELECT AncestorId FROM ExerciseHierarchy WHERE DescendantId = ? ORDER BY Depth DESC LIMIT 1"
+)
+
+@span("backup_existing_data")
+def backup_existing_data(db_path=None):
     """Backup existing exercises and related data"""
     print("=== RESPALDANDO DATOS EXISTENTES ===")
 
     # Try to find and backup from existing database
-    db_files = ['gymroutine.db', 'gym_routine.db', 'app-ui/gymroutine.db']
+    db_files = list(dict.fromkeys([str(db_path or gymdb.default_db_path()), 'gym_routine.db', 'app-ui/gymroutine.db']))
     backup_data = {
         'exercises': [],
         'muscle_groups': [],
@@ -18,7 +126,8 @@ def backup_existing_data():
 
     for db_file in db_files:
         try:
-            conn = sqlite3.connect(db_file)
+            # Read-only: never creates missing files, and reads alongside the running app
+            conn = gymdb.open_connection(db_file, readonly=True)
             cursor = conn.cursor()
 
             # Backup exercises
@@ -34,6 +143,7 @@ def backup_existing_data():
                     for exercise in exercises:
                         exercise_dict = dict(zip(columns, exercise))
                         backup_data['exercises'].append(exercise_dict)
+                    count("rows_backed_up", len(exercises))
 
                     print(f"✅ Respaldados {len(exercises)} ejercicios desde {db_file}")
             except Exception as e:
@@ -51,6 +161,7 @@ def backup_existing_data():
                     for mg in muscle_groups:
                         mg_dict = dict(zip(columns, mg))
                         backup_data['muscle_groups'].append(mg_dict)
+                    count("rows_backed_up", len(muscle_groups))
 
                     print(f"✅ Respaldados {len(muscle_groups)} grupos musculares desde {db_file}")
             except Exception as e:
@@ -68,6 +179,7 @@ def backup_existing_data():
                     for et in equipment_types:
                         et_dict = dict(zip(columns, et))
                         backup_data['equipment_types'].append(et_dict)
+                    count("rows_backed_up", len(equipment_types))
 
                     print(f"✅ Respaldados {len(equipment_types)} tipos de equipamiento desde {db_file}")
             except Exception as e:
@@ -84,7 +196,7 @@ def backup_existing_data():
             print(f"⚠️ No se pudo acceder a {db_file}: {e}")
 
     # Save backup to JSON
-    with open('data_backup.json', 'w', encoding='utf-8') as f:
+    with span("write_json"), open('data_backup.json', 'w', encoding='utf-8') as f:
         json.dump(backup_data, f, indent=2, ensure_ascii=False)
 
     print(f"📁 Backup guardado en data_backup.json")
@@ -94,241 +206,353 @@ def backup_existing_data():
 
     return backup_data
 
-def create_fresh_database():
+def find_exercise_cycles(cursor):
+    """Return the ParentExerciseId cycles as lists of exercise ids"""
+    parents = dict(cursor.execute("SELECT Id, ParentExerciseId FROM Exercises"))
+    state = {}  # id -> 1 while on the current path, 2 when done
+    cycles = []
+    for start in parents:
+        path = []
+        node = start
+        while node in parents and node not in state:
+            state[node] = 1
+            path.append(node)
+            node = parents[node]
+        if state.get(node) == 1:
+            cycles.append(path[path.index(node):])
+        for visited in path:
+            state[visited] = 2
+    return cycles
+
+def drop_exercise_hierarchy_triggers(cursor):
+    """Drop the triggers before a bulk load; install_exercise_hierarchy() puts them back"""
+    for name in EXERCISE_HIERARCHY_TRIGGERS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+@span("rebuild_exercise_hierarchy")
+def rebuild_exercise_hierarchy(cursor):
+    """Recompute ExerciseHierarchy from Exercises; exercises in a cycle only get their own row"""
+    cycles = find_exercise_cycles(cursor)
+    # Bulk insert in key order without the secondary index, then index once
+    cursor.execute("DROP INDEX IF EXISTS IX_ExerciseHierarchy_Descendant")
+    cursor.execute("DELETE FROM ExerciseHierarchy")
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS _cycle_members (Id INTEGER PRIMARY KEY)")
+    cursor.execute("DELETE FROM _cycle_members")
+    cursor.executemany("INSERT OR IGNORE INTO _cycle_members (Id) VALUES (?)",
+                       [(member,) for cycle in cycles for member in cycle])
+    cursor.execute("""
+        WITH RECURSIVE walk(AncestorId, DescendantId, Depth) AS (
+            SELECT Id, Id, 0 FROM Exercises
+            UNION ALL
+            SELECT w.AncestorId, e.Id, w.Depth + 1
+            FROM walk w
+            JOIN Exercises e ON e.ParentExerciseId = w.DescendantId
+            WHERE e.Id NOT IN (SELECT Id FROM _cycle_members)
+        )
+        INSERT INTO ExerciseHierarchy (AncestorId, DescendantId, Depth)
+        SELECT AncestorId, DescendantId, Depth FROM walk ORDER BY AncestorId, DescendantId
+    """)
+    cursor.execute(EXERCISE_HIERARCHY_INDEX)
+    cursor.execute("DROP TABLE temp._cycle_members")
+    count("hierarchy_rows", cursor.execute("SELECT COUNT(*) FROM ExerciseHierarchy").fetchone()[0])
+    return cycles
+
+def install_exercise_hierarchy(cursor):
+    """Create ExerciseHierarchy and its triggers (idempotent) and rebuild it; returns the cycles found"""
+    cursor.execute(EXERCISE_HIERARCHY_TABLE)
+    cursor.execute(EXERCISE_PARENT_INDEX)
+    drop_exercise_hierarchy_triggers(cursor)
+    for sql in EXERCISE_HIERARCHY_TRIGGERS.values():
+        cursor.execute(sql)
+    cycles = rebuild_exercise_hierarchy(cursor)
+    for cycle in cycles:
+        print(f"⚠️ Ciclo en ParentExerciseId: {' -> '.join(map(str, cycle + cycle[:1]))}")
+    return cycles
+
+@span("create_fresh_database")
+def create_fresh_database(db_path=None):
     """Create a completely fresh database with correct schema"""
     print("\n=== CREANDO BASE DE DATOS NUEVA ===")
+    db_path = str(db_path or gymdb.default_db_path())
 
     # Remove old databases
-    db_files = ['gymroutine.db', 'gym_routine.db']
+    db_files = list(dict.fromkeys([db_path, 'gym_routine.db']))
     for db_file in db_files:
         try:
             import os
+            # Pooled connections would keep using the old file; closing them
+            # also checkpoints the WAL into it
+            gymdb.close_all(db_file)
             if os.path.exists(db_file):
                 shutil.move(db_file, f"{db_file}.old_backup")
+                # Keep a WAL still held open by the app next to the moved file
+                for suffix in ("-wal", "-shm"):
+                    if os.path.exists(db_file + suffix):
+                        shutil.move(db_file + suffix, f"{db_file}.old_backup{suffix}")
                 print(f"📦 Movido {db_file} a {db_file}.old_backup")
         except Exception as e:
             print(f"⚠️ Error moviendo {db_file}: {e}")
 
     # Create fresh database
-    conn = sqlite3.connect('gymroutine.db')
-    cursor = conn.cursor()
-
-    # Create tables with correct schema including ImageMetadata
-    print("🏗️ Creando tablas...")
-
-    # MuscleGroups table
-    cursor.execute("""
-        CREATE TABLE MuscleGroups (
-            Id INTEGER PRIMARY KEY AUTOINCREMENT,
-            Name TEXT NOT NULL,
-            SpanishName TEXT NOT NULL,
-            Description TEXT NOT NULL
-        )
-    """)
-    print("✅ Tabla MuscleGroups creada")
-
-    # EquipmentTypes table
-    cursor.execute("""
-        CREATE TABLE EquipmentTypes (
-            Id INTEGER PRIMARY KEY AUTOINCREMENT,
-            Name TEXT NOT NULL,
-            SpanishName TEXT NOT NULL,
-            Description TEXT NOT NULL
-        )
-    """)
-    print("✅ Tabla EquipmentTypes creada")
-
-    # Exercises table
-    cursor.execute("""
-        CREATE TABLE Exercises (
-            Id INTEGER PRIMARY KEY AUTOINCREMENT,
-            Name TEXT NOT NULL,
-            SpanishName TEXT NOT NULL,
-            Description TEXT NOT NULL,
-            Instructions TEXT NOT NULL,
-            PrimaryMuscleGroupId INTEGER NOT NULL,
-            EquipmentTypeId INTEGER NOT NULL,
-            DifficultyLevel INTEGER NOT NULL,
-            ExerciseType INTEGER NOT NULL,
-            DurationSeconds INTEGER NULL,
-            IsActive INTEGER NOT NULL DEFAULT 1,
-            CreatedAt TEXT NOT NULL,
-            UpdatedAt TEXT NULL,
-            ParentExerciseId INTEGER NULL,
-            FOREIGN KEY (PrimaryMuscleGroupId) REFERENCES MuscleGroups(Id),
-            FOREIGN KEY (EquipmentTypeId) REFERENCES EquipmentTypes(Id),
-            FOREIGN KEY (ParentExerciseId) REFERENCES Exercises(Id)
-        )
-    """)
-    print("✅ Tabla Exercises creada")
-
-    # ExerciseImages table WITH ImageMetadata column
-    cursor.execute("""
-        CREATE TABLE ExerciseImages (
-            Id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ExerciseId INTEGER NOT NULL,
-            ImagePath TEXT NULL,
-            ImageData BLOB NOT NULL DEFAULT x'',
-            ImageMetadata TEXT NOT NULL DEFAULT '',
-            ImagePosition TEXT NOT NULL,
-            IsPrimary INTEGER NOT NULL DEFAULT 0,
-            Description TEXT NOT NULL,
-            FOREIGN KEY (ExerciseId) REFERENCES Exercises(Id) ON DELETE CASCADE
-        )
-    """)
-    print("✅ Tabla ExerciseImages creada CON COLUMNA ImageMetadata")
+    with gymdb.connection(db_path) as conn:
+        cursor = conn.cursor()
+
+        # Create tables with correct schema including ImageMetadata
+        print("🏗️ Creando tablas...")
+
+        # MuscleGroups table
+        cursor.execute("""
+            CREATE TABLE MuscleGroups (
+                Id INTEGER PRIMARY KEY AUTOINCREMENT,
+                Name TEXT NOT NULL,
+                SpanishName TEXT NOT NULL,
+                Description TEXT NOT NULL
+            )
+        """)
+        print("✅ Tabla MuscleGroups creada")
+
+        # EquipmentTypes table
+        cursor.execute("""
+            CREATE TABLE EquipmentTypes (
+                Id INTEGER PRIMARY KEY AUTOINCREMENT,
+                Name TEXT NOT NULL,
+                SpanishName TEXT NOT NULL,
+                Description TEXT NOT NULL
+            )
+        """)
+        print("✅ Tabla EquipmentTypes creada")
+
+        # Exercises table
+        cursor.execute("""
+            CREATE TABLE Exercises (
+                Id INTEGER PRIMARY KEY AUTOINCREMENT,
+                Name TEXT NOT NULL,
+                SpanishName TEXT NOT NULL,
+                Description TEXT NOT NULL,
+                Instructions TEXT NOT NULL,
+                PrimaryMuscleGroupId INTEGER NOT NULL,
+                EquipmentTypeId INTEGER NOT NULL,
+                DifficultyLevel INTEGER NOT NULL,
+                ExerciseType INTEGER NOT NULL,
+                DurationSeconds INTEGER NULL,
+                IsActive INTEGER NOT NULL DEFAULT 1,
+                CreatedAt TEXT NOT NULL,
+                UpdatedAt TEXT NULL,
+                ParentExerciseId INTEGER NULL,
+                FOREIGN KEY (PrimaryMuscleGroupId) REFERENCES MuscleGroups(Id),
+                FOREIGN KEY (EquipmentTypeId) REFERENCES EquipmentTypes(Id),
+                FOREIGN KEY (ParentExerciseId) REFERENCES Exercises(Id)
+            )
+        """)
+        print("✅ Tabla Exercises creada")
+
+        # ExerciseImages table WITH ImageMetadata column
+        cursor.execute("""
+            CREATE TABLE ExerciseImages (
+                Id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ExerciseId INTEGER NOT NULL,
+                ImagePath TEXT NULL,
+                ImageData BLOB NOT NULL DEFAULT x'',
+                ImageMetadata TEXT NOT NULL DEFAULT '',
+                ImagePosition TEXT NOT NULL,
+                IsPrimary INTEGER NOT NULL DEFAULT 0,
+                Description TEXT NOT NULL,
+                FOREIGN KEY (ExerciseId) REFERENCES Exercises(Id) ON DELETE CASCADE
+            )
+        """)
+        print("✅ Tabla ExerciseImages creada CON COLUMNA ImageMetadata")
+
+        # ExerciseSecondaryMuscles table
+        cursor.execute("""
+            CREATE TABLE ExerciseSecondaryMuscles (
+                Id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ExerciseId INTEGER NOT NULL,
+                MuscleGroupId INTEGER NOT NULL,
+                FOREIGN KEY (ExerciseId) REFERENCES Exercises(Id) ON DELETE CASCADE,
+                FOREIGN KEY (MuscleGroupId) REFERENCES MuscleGroups(Id)
+            )
+        """)
+        print("✅ Tabla ExerciseSecondaryMuscles creada")
 
-    # ExerciseSecondaryMuscles table
-    cursor.execute("""
-        CREATE TABLE ExerciseSecondaryMuscles (
-            Id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ExerciseId INTEGER NOT NULL,
-            MuscleGroupId INTEGER NOT NULL,
-            FOREIGN KEY (ExerciseId) REFERENCES Exercises(Id) ON DELETE CASCADE,
-            FOREIGN KEY (MuscleGroupId) REFERENCES MuscleGroups(Id)
-        )
-    """)
-    print("✅ Tabla ExerciseSecondaryMuscles creada")
+        # ExerciseHierarchy closure table and its triggers
+        install_exercise_hierarchy(cursor)
+        print("✅ Tabla ExerciseHierarchy creada (con triggers)")
 
-    conn.commit()
-    conn.close()
+        conn.commit()
 
     print("🎉 Base de datos nueva creada exitosamente con schema correcto")
     return True
 
-def populate_basic_data(backup_data):
+@span("populate_basic_data")
+def populate_basic_data(backup_data, db_path=None):
     """Populate the new database with backed up data plus some basics"""
     print("\n=== POBLANDO BASE DE DATOS NUEVA ===")
-
-    conn = sqlite3.connect('gymroutine.db')
-    cursor = conn.cursor()
-
-    # Insert basic muscle groups if none in backup
-    if not backup_data['muscle_groups']:
-        basic_muscle_groups = [
-            (1, "Chest", "Pecho", "Músculos del pecho"),
-            (2, "Back", "Espalda", "Músculos de la espalda"),
-            (3, "Shoulders", "Hombros", "Músculos de los hombros"),
-            (4, "Arms", "Brazos", "Músculos de los brazos"),
-            (5, "Legs", "Piernas", "Músculos de las piernas"),
-            (6, "Core", "Abdomen", "Músculos del core y abdomen"),
-            (7, "Glutes", "Glúteos", "Músculos de los glúteos"),
-            (8, "Calves", "Pantorrillas", "Músculos de las pantorrillas")
-        ]
-
-        cursor.executemany(
-            "INSERT INTO MuscleGroups (Id, Name, SpanishName, Description) VALUES (?, ?, ?, ?)",
-            basic_muscle_groups
-        )
-        print(f"✅ Insertados {len(basic_muscle_groups)} grupos musculares básicos")
-    else:
-        # Insert backed up muscle groups
-        for mg in backup_data['muscle_groups']:
-            cursor.execute(
+    db_path = db_path or gymdb.default_db_path()
+
+    # One write transaction for the whole restore
+    with gymdb.transaction(db_path) as conn:
+        cursor = conn.cursor()
+
+        # Insert basic muscle groups if none in backup
+        if not backup_data['muscle_groups']:
+            basic_muscle_groups = [
+                (1, "Chest", "Pecho", "Músculos del pecho"),
+                (2, "Back", "Espalda", "Músculos de la espalda"),
+                (3, "Shoulders", "Hombros", "Músculos de los hombros"),
+                (4, "Arms", "Brazos", "Músculos de los brazos"),
+                (5, "Legs", "Piernas", "Músculos de las piernas"),
+                (6, "Core", "Abdomen", "Músculos del core y abdomen"),
+                (7, "Glutes", "Glúteos", "Músculos de los glúteos"),
+                (8, "Calves", "Pantorrillas", "Músculos de las pantorrillas")
+            ]
+
+            cursor.executemany(
                 "INSERT INTO MuscleGroups (Id, Name, SpanishName, Description) VALUES (?, ?, ?, ?)",
-                (mg.get('Id'), mg.get('Name'), mg.get('SpanishName'), mg.get('Description'))
+                basic_muscle_groups
             )
-        print(f"✅ Restaurados {len(backup_data['muscle_groups'])} grupos musculares")
-
-    # Insert basic equipment types if none in backup
-    if not backup_data['equipment_types']:
-        basic_equipment = [
-            (1, "Bodyweight", "Peso corporal", "Sin equipamiento"),
-            (2, "Dumbbells", "Mancuernas", "Ejercicios con mancuernas"),
-            (3, "Barbell", "Barra", "Ejercicios con barra"),
-            (4, "Resistance Bands", "Bandas elásticas", "Ejercicios con bandas"),
-            (5, "Cable Machine", "Máquina de cables", "Ejercicios en máquina de cables"),
-            (6, "Machine", "Máquina", "Ejercicios en máquina"),
-            (7, "Kettlebell", "Pesa rusa", "Ejercicios con pesa rusa"),
-            (8, "Medicine Ball", "Balón medicinal", "Ejercicios con balón")
-        ]
-
-        cursor.executemany(
-            "INSERT INTO EquipmentTypes (Id, Name, SpanishName, Description) VALUES (?, ?, ?, ?)",
-            basic_equipment
-        )
-        print(f"✅ Insertados {len(basic_equipment)} tipos de equipamiento básicos")
-    else:
-        # Insert backed up equipment types
-        for et in backup_data['equipment_types']:
-            cursor.execute(
+            count("rows_copied", len(basic_muscle_groups))
+            print(f"✅ Insertados {len(basic_muscle_groups)} grupos musculares básicos")
+        else:
+            # Insert backed up muscle groups
+            for mg in backup_data['muscle_groups']:
+                cursor.execute(
+                    "INSERT INTO MuscleGroups (Id, Name, SpanishName, Description) VALUES (?, ?, ?, ?)",
+                    (mg.get('Id'), mg.get('Name'), mg.get('SpanishName'), mg.get('Description'))
+                )
+            count("rows_copied", len(backup_data['muscle_groups']))
+            print(f"✅ Restaurados {len(backup_data['muscle_groups'])} grupos musculares")
+
+        # Insert basic equipment types if none in backup
+        if not backup_data['equipment_types']:
+            basic_equipment = [
+                (1, "Bodyweight", "Peso corporal", "Sin equipamiento"),
+                (2, "Dumbbells", "Mancuernas", "Ejercicios con mancuernas"),
+                (3, "Barbell", "Barra", "Ejercicios con barra"),
+                (4, "Resistance Bands", "Bandas elásticas", "Ejercicios con bandas"),
+                (5, "Cable Machine", "Máquina de cables", "Ejercicios en máquina de cables"),
+                (6, "Machine", "Máquina", "Ejercicios en máquina"),
+                (7, "Kettlebell", "Pesa rusa", "Ejercicios con pesa rusa"),
+                (8, "Medicine Ball", "Balón medicinal", "Ejercicios con balón")
+            ]
+
+            cursor.executemany(
                 "INSERT INTO EquipmentTypes (Id, Name, SpanishName, Description) VALUES (?, ?, ?, ?)",
-                (et.get('Id'), et.get('Name'), et.get('SpanishName'), et.get('Description'))
+                basic_equipment
             )
-        print(f"✅ Restaurados {len(backup_data['equipment_types'])} tipos de equipamiento")
-
-    # Insert backed up exercises
-    if backup_data['exercises']:
-        for ex in backup_data['exercises']:
-            try:
-                cursor.execute("""
-                    INSERT INTO Exercises (Id, Name, SpanishName, Description, Instructions,
-                                         PrimaryMuscleGroupId, EquipmentTypeId, DifficultyLevel,
-                                         ExerciseType, DurationSeconds, IsActive, CreatedAt, UpdatedAt, ParentExerciseId)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    ex.get('Id'), ex.get('Name'), ex.get('SpanishName'), ex.get('Description'),
-                    ex.get('Instructions'), ex.get('PrimaryMuscleGroupId'), ex.get('EquipmentTypeId'),
-                    ex.get('DifficultyLevel'), ex.get('ExerciseType'), ex.get('DurationSeconds'),
-                    ex.get('IsActive', 1), ex.get('CreatedAt'), ex.get('UpdatedAt'), ex.get('ParentExerciseId')
-                ))
-            except Exception as e:
-                print(f"⚠️ Error insertando ejercicio {ex.get('SpanishName', 'N/A')}: {e}")
-
-        print(f"✅ Restaurados {len(backup_data['exercises'])} ejercicios")
-    else:
-        print("ℹ️ No hay ejercicios para restaurar en el backup.")
+            count("rows_copied", len(basic_equipment))
+            print(f"✅ Insertados {len(basic_equipment)} tipos de equipamiento básicos")
+        else:
+            # Insert backed up equipment types
+            for et in backup_data['equipment_types']:
+                cursor.execute(
+                    "INSERT INTO EquipmentTypes (Id, Name, SpanishName, Description) VALUES (?, ?, ?, ?)",
+                    (et.get('Id'), et.get('Name'), et.get('SpanishName'), et.get('Description'))
+                )
+            count("rows_copied", len(backup_data['equipment_types']))
+            print(f"✅ Restaurados {len(backup_data['equipment_types'])} tipos de equipamiento")
+
+        # Insert backed up exercises. The hierarchy triggers are dropped for the
+        # bulk load (parents may come after their children, cycles are reported
+        # instead of aborting the restore) and the closure is rebuilt once after
+        drop_exercise_hierarchy_triggers(cursor)
+        if backup_data['exercises']:
+            for ex in backup_data['exercises']:
+                try:
+                    cursor.execute("""
+                        INSERT INTO Exercises (Id, Name, SpanishName, Description, Instructions,
+                                             PrimaryMuscleGroupId, EquipmentTypeId, DifficultyLevel,
+                                             ExerciseType, DurationSeconds, IsActive, CreatedAt, UpdatedAt, ParentExerciseId)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, (
+                        ex.get('Id'), ex.get('Name'), ex.get('SpanishName'), ex.get('Description'),
+                        ex.get('Instructions'), ex.get('PrimaryMuscleGroupId'), ex.get('EquipmentTypeId'),
+                        ex.get('DifficultyLevel'), ex.get('ExerciseType'), ex.get('DurationSeconds'),
+                        ex.get('IsActive', 1), ex.get('CreatedAt'), ex.get('UpdatedAt'), ex.get('ParentExerciseId')
+                    ))
+                    count("rows_copied")
+                except Exception as e:
+                    print(f"⚠️ Error insertando ejercicio {ex.get('SpanishName', 'N/A')}: {e}")
+
+            print(f"✅ Restaurados {len(backup_data['exercises'])} ejercicios")
+        else:
+            print("ℹ️ No hay ejercicios para restaurar en el backup.")
 
-    conn.commit()
-    conn.close()
+        install_exercise_hierarchy(cursor)
+        hierarchy_rows = cursor.execute("SELECT COUNT(*) FROM ExerciseHierarchy").fetchone()[0]
+        print(f"✅ Jerarquía de variantes reconstruida: {hierarchy_rows} relaciones")
 
     print("🎉 Base de datos poblada exitosamente")
 
-def verify_new_database():
+@span("verify_new_database")
+def verify_new_database(db_path=None):
     """Verify the new database has correct structure and data"""
     print("\n=== VERIFICANDO BASE DE DATOS NUEVA ===")
+    db_path = db_path or gymdb.default_db_path()
+    if not Path(db_path).is_file():
+        print(f"❌ No se encontró la base de datos: {db_path}")
+        return False
 
-    conn = sqlite3.connect('gymroutine.db')
-    cursor = conn.cursor()
-
-    # Check table structure
-    cursor.execute("PRAGMA table_info(ExerciseImages)")
-    columns = cursor.fetchall()
-
-    has_image_metadata = any(col[1] == 'ImageMetadata' for col in columns)
-    has_image_data = any(col[1] == 'ImageData' for col in columns)
-
-    print("📋 Columnas en tabla ExerciseImages:")
-    for col in columns:
-        print(f"  - {col[1]} ({col[2]})")
-
-    print(f"\n✅ ImageMetadata column: {'✅ SÍ' if has_image_metadata else '❌ NO'}")
-    print(f"✅ ImageData column: {'✅ SÍ' if has_image_data else '❌ NO'}")
-
-    # Check data counts
-    cursor.execute("SELECT COUNT(*) FROM Exercises")
-    exercise_count = cursor.fetchone()[0]
-
-    cursor.execute("SELECT COUNT(*) FROM MuscleGroups")
-    mg_count = cursor.fetchone()[0]
-
-    cursor.execute("SELECT COUNT(*) FROM EquipmentTypes")
-    et_count = cursor.fetchone()[0]
-
-    print(f"\n📊 Datos en nueva BD:")
-    print(f"  - Ejercicios: {exercise_count}")
-    print(f"  - Grupos musculares: {mg_count}")
-    print(f"  - Tipos de equipamiento: {et_count}")
-
-    # Show some sample exercises
-    cursor.execute("SELECT SpanishName, Description FROM Exercises LIMIT 5")
-    exercises = cursor.fetchall()
-
-    print(f"\n📝 Ejercicios de ejemplo:")
-    for ex in exercises:
-        print(f"  - {ex[0]}: {ex[1]}")
-
-    conn.close()
+    with gymdb.connection(db_path, readonly=True) as conn:
+        cursor = conn.cursor()
+
+        # Check table structure
+        cursor.execute("PRAGMA table_info(ExerciseImages)")
+        columns = cursor.fetchall()
+
+        has_image_metadata = any(col[1] == 'ImageMetadata' for col in columns)
+        has_image_data = any(col[1] == 'ImageData' for col in columns)
+
+        print("📋 Columnas en tabla ExerciseImages:")
+        for col in columns:
+            print(f"  - {col[1]} ({col[2]})")
+
+        print(f"\n✅ ImageMetadata column: {'✅ SÍ' if has_image_metadata else '❌ NO'}")
+        print(f"✅ ImageData column: {'✅ SÍ' if has_image_data else '❌ NO'}")
+
+        # Check data counts
+        cursor.execute("SELECT COUNT(*) FROM Exercises")
+        exercise_count = cursor.fetchone()[0]
+
+        cursor.execute("SELECT COUNT(*) FROM MuscleGroups")
+        mg_count = cursor.fetchone()[0]
+
+        cursor.execute("SELECT COUNT(*) FROM EquipmentTypes")
+        et_count = cursor.fetchone()[0]
+
+        print(f"\n📊 Datos en nueva BD:")
+        print(f"  - Ejercicios: {exercise_count}")
+        print(f"  - Grupos musculares: {mg_count}")
+        print(f"  - Tipos de equipamiento: {et_count}")
+
+        # Check the variant hierarchy: one self row per exercise, one depth-1
+        # row per (existing) parent link
+        cursor.execute("SELECT COUNT(*), COALESCE(MAX(Depth), 0) FROM ExerciseHierarchy")
+        hierarchy_count, hierarchy_depth = cursor.fetchone()
+        cursor.execute("""
+            SELECT COUNT(*) FROM Exercises e
+            WHERE NOT EXISTS (SELECT 1 FROM ExerciseHierarchy h
+                              WHERE h.AncestorId = e.Id AND h.DescendantId = e.Id AND h.Depth = 0)
+               OR (e.ParentExerciseId IN (SELECT Id FROM Exercises)
+                   AND NOT EXISTS (SELECT 1 FROM ExerciseHierarchy h
+                                   WHERE h.AncestorId = e.ParentExerciseId AND h.DescendantId = e.Id
+                                     AND h.Depth = 1))
+        """)
+        hierarchy_missing = cursor.fetchone()[0]
+        cycles = find_exercise_cycles(cursor)
+
+        print(f"  - Jerarquía de variantes: {hierarchy_count} relaciones, profundidad máxima {hierarchy_depth}")
+        if hierarchy_missing:
+            print(f"⚠️ {hierarchy_missing} ejercicios sin su relación en ExerciseHierarchy")
+        if cycles:
+            print(f"⚠️ {len(cycles)} ciclos en ParentExerciseId")
+
+        # Show some sample exercises
+        cursor.execute("SELECT SpanishName, Description FROM Exercises LIMIT 5")
+        exercises = cursor.fetchall()
+
+        print(f"\n📝 Ejercicios de ejemplo:")
+        for ex in exercises:
+            print(f"  - {ex[0]}: {ex[1]}")
 
     if has_image_metadata and has_image_data and exercise_count > 0:
         print("\n🎉 BASE DE DATOS NUEVA LISTA PARA USAR")
@@ -345,19 +569,30 @@ def verify_new_database():
         print("\n❌ Hay problemas con la nueva BD")
         return False
 
-if __name__ == "__main__":
+def main():
+    parser = argparse.ArgumentParser(description="Respalda, recrea y verifica gymroutine.db")
+    parser.add_argument("--db", default=None,
+                        help=f"Ruta de la base de datos (por defecto ${gymdb.DB_PATH_ENV} o gymroutine.db)")
+    add_profile_argument(parser, "backup_and_recreate_db")
+    args = parser.parse_args()
+
+    with profiling(args.profile, "backup_and_recreate_db"):
+        run(args.db)
+
+
+def run(db_path=None):
     try:
         # Step 1: Backup existing data
-        backup_data = backup_existing_data()
+        backup_data = backup_existing_data(db_path)
 
         # Step 2: Create fresh database
-        create_fresh_database()
+        create_fresh_database(db_path)
 
         # Step 3: Populate with data
-        populate_basic_data(backup_data)
+        populate_basic_data(backup_data, db_path)
 
         # Step 4: Verify everything is correct
-        success = verify_new_database()
+        success = verify_new_database(db_path)
 
         if success:
             print("\n🎯 OPERACIÓN COMPLETADA EXITOSAMENTE")
@@ -368,4 +603,10 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"\n❌ ERROR GENERAL: {e}")
         import traceback
-        traceback.print_exc()
\ No newline at end of file
+        traceback.print_exc()
+    finally:
+        gymdb.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,598 @@
+#!/usr/bin/env python3
+"""
+Differential, compressed backups of gymroutine.db: a full base snapshot
+followed by deltas that hold only the rows changed since the previous snapshot,
+chained through a manifest. Restoring replays base + deltas in one transaction.
+
+Usage:
+  python scripts/backup_snapshots.py create [--db gymroutine.db] [--dir backups] [--full] [--max-chain 14]
+  python scripts/backup_snapshots.py list [--dir backups]
+  python scripts/backup_snapshots.py restore [--db gymroutine.db] [--dir backups] [--upto SEQ]
+  python scripts/backup_snapshots.py --self-check [--exercises 100000]
+
+Layout of --dir:
+  manifest.json                   the chain: seq, kind, parent, digests, sha256 per file
+  row_digests.json.gz             per-row digests of Exercises as of the latest snapshot
+  0001-full-20261019T020000.jsonl.gz
+  0002-delta-20261020T020000.jsonl.gz
+
+Notes:
+  - Backs up the tables backup_existing_data() covers: MuscleGroups,
+    EquipmentTypes and Exercises.
+  - Exercises changes are found by content, not by CreatedAt/UpdatedAt (the
+    app never sets UpdatedAt): every snapshot keeps an 8-byte digest per row
+    in row_digests.json.gz, and a delta holds the rows whose digest is new or
+    different plus the Ids that disappeared. If that file is missing or belongs
+    to another snapshot, the next snapshot is a full one.
+  - The lookup tables have no timestamps; they are small, so each snapshot
+    stores their content digest and a delta carries them whole only when the
+    digest changed.
+  - A delta with no changed rows, deletions or lookup changes is not written.
+    After --max-chain deltas the next snapshot is a full one, which also bounds
+    how many files a restore has to replay.
+  - Files are written as gzip-compressed JSON lines, one row per line, so
+    neither backup nor restore holds a table in memory. Each file ends with a
+    marker line and its sha256 is in the manifest; restore checks the whole
+    chain before it touches the database.
+  - restore recreates the database with create_fresh_database() (the old file
+    is kept as <db>.old_backup) and replays the chain up to --upto.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import gzip
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import gymdb
+from instrumentation import add_profile_argument, count, profiling, span
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_DIR = Path("backups")
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 2
+ROW_DIGESTS_NAME = "row_digests.json.gz"
+MAX_CHAIN = 14
+COMPRESS_LEVEL = 6
+BATCH_SIZE = 1000
+
+# Restore order (referenced tables first). True: diffed row by row; False:
+# small lookup table, compared by one digest of its whole content
+TABLES: Tuple[Tuple[str, bool], ...] = (
+    ("MuscleGroups", False),
+    ("EquipmentTypes", False),
+    ("Exercises", True),
+)
+
+
+class SnapshotError(Exception):
+    pass
+
+
+# --------------------------------------------------------------------------- #
+# Manifest
+# --------------------------------------------------------------------------- #
+
+def load_manifest(backup_dir: Path) -> Dict[str, object]:
+    path = backup_dir / MANIFEST_NAME
+    if not path.exists():
+        return {"version": MANIFEST_VERSION, "snapshots": []}
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError as exc:
+        raise SnapshotError(f"{path} is corrupted: {exc}") from None
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise SnapshotError(f"{path} has unsupported version {manifest.get('version')}")
+    return manifest
+
+
+def save_manifest(backup_dir: Path, manifest: Dict[str, object]) -> None:
+    path = backup_dir / MANIFEST_NAME
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def chain_for(manifest: Dict[str, object], upto: Optional[int] = None) -> List[Dict[str, object]]:
+    """Snapshots to replay for `upto` (default: the latest), base first."""
+    by_seq = {entry["seq"]: entry for entry in manifest["snapshots"]}
+    if not by_seq:
+        return []
+    seq = max(by_seq) if upto is None else upto
+    chain = []
+    while seq is not None:
+        entry = by_seq.get(seq)
+        if entry is None:
+            raise SnapshotError(f"Snapshot {seq} is missing from the manifest")
+        chain.append(entry)
+        seq = entry["parent"]
+    chain.reverse()
+    if chain[0]["kind"] != "full":
+        raise SnapshotError(f"Chain for snapshot {chain[-1]['seq']} does not start with a full snapshot")
+    return chain
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# --------------------------------------------------------------------------- #
+# Reading the database
+# --------------------------------------------------------------------------- #
+
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _id_ranges(ids: Iterable[int]) -> List[List[int]]:
+    """[1, 2, 3, 7, 8] -> [[1, 3], [7, 8]]"""
+    ranges: List[List[int]] = []
+    for value in ids:
+        if ranges and value == ranges[-1][1] + 1:
+            ranges[-1][1] = value
+        else:
+            ranges.append([value, value])
+    return ranges
+
+
+def _row_digest(row: Sequence[object]) -> bytes:
+    encoded = json.dumps(list(row), ensure_ascii=False, default=str, separators=(",", ":"))
+    return hashlib.blake2b(encoded.encode("utf-8"), digest_size=8).digest()
+
+
+def _changed_rows(
+    conn: sqlite3.Connection,
+    table: str,
+    previous: Optional[Dict[int, bytes]],
+    current: Dict[int, bytes],
+) -> Iterator[tuple]:
+    """Yield rows that are new or differ from `previous` (all rows when None); fills `current`."""
+    for row in conn.execute(f"SELECT * FROM {table} ORDER BY Id"):
+        digest = current[row[0]] = _row_digest(row)
+        if previous is None or previous.get(row[0]) != digest:
+            yield row
+
+
+def load_row_digests(backup_dir: Path, manifest: Dict[str, object], seq: int) -> Optional[Dict[str, Dict[int, bytes]]]:
+    """Per-row digests saved with snapshot `seq`; None when missing or stale."""
+    info = manifest.get("row_digests")
+    path = backup_dir / ROW_DIGESTS_NAME
+    if not info or info.get("seq") != seq or not path.exists() or file_digest(path) != info.get("sha256"):
+        return None
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        saved = json.load(fh)
+    return {
+        table: dict(zip(block["ids"], (bytes.fromhex(block["digests"][i:i + 16])
+                                       for i in range(0, len(block["digests"]), 16))))
+        for table, block in saved.items()
+    }
+
+
+def save_row_digests(backup_dir: Path, digests: Dict[str, Dict[int, bytes]]) -> str:
+    path = backup_dir / ROW_DIGESTS_NAME
+    tmp = path.with_name(path.name + ".tmp")
+    saved = {
+        table: {"ids": list(rows), "digests": b"".join(rows.values()).hex()}
+        for table, rows in digests.items()
+    }
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=COMPRESS_LEVEL) as fh:
+        json.dump(saved, fh, separators=(",", ":"))
+    os.replace(tmp, path)
+    return file_digest(path)
+
+
+class SnapshotWriter:
+    """gzip JSON lines: header, per table a block line then its rows, an end marker."""
+
+    def __init__(self, path: Path, header: Dict[str, object]):
+        self.path = path
+        self.tmp = path.with_name(path.name + ".part")
+        self.fh = gzip.open(self.tmp, "wt", encoding="utf-8", compresslevel=COMPRESS_LEVEL)
+        self.rows = 0
+        self.line(header)
+
+    def line(self, value: object) -> None:
+        self.fh.write(json.dumps(value, ensure_ascii=False, separators=(",", ":")))
+        self.fh.write("\n")
+
+    def table(self, name: str, mode: str, columns: List[str], rows: Iterable[Sequence[object]]) -> int:
+        self.line({"table": name, "mode": mode, "columns": columns})
+        written = 0
+        for row in rows:
+            self.line(list(row))
+            written += 1
+        self.line({"rows": written})
+        self.rows += written
+        return written
+
+    def deleted(self, name: str, ranges: List[List[int]]) -> None:
+        self.line({"table": name, "deleted": ranges})
+
+    def close(self) -> None:
+        self.line({"end": True, "rows": self.rows})
+        self.fh.close()
+        os.replace(self.tmp, self.path)
+
+    def abort(self) -> None:
+        self.fh.close()
+        self.tmp.unlink(missing_ok=True)
+
+
+def create_snapshot(
+    db_path: Optional[Path | str] = None,
+    backup_dir: Path | str = DEFAULT_DIR,
+    full: bool = False,
+    max_chain: int = MAX_CHAIN,
+) -> Optional[Dict[str, object]]:
+    """Write a full or delta snapshot and record it; None when nothing changed."""
+    db_path = Path(db_path) if db_path is not None else gymdb.default_db_path()
+    backup_dir = Path(backup_dir)
+    if not db_path.exists():
+        raise SnapshotError(f"Database not found: {db_path}")
+    backup_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = load_manifest(backup_dir)
+    chain = chain_for(manifest)
+    previous = chain[-1] if chain else None
+    previous_digests = load_row_digests(backup_dir, manifest, previous["seq"]) if previous else None
+    if previous_digests is None or len(chain) > max_chain:
+        full = True
+    kind = "full" if full else "delta"
+    seq = max((entry["seq"] for entry in manifest["snapshots"]), default=0) + 1
+    stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+    path = backup_dir / f"{seq:04d}-{kind}-{stamp}.jsonl.gz"
+
+    start = time.perf_counter()
+    conn = gymdb.open_connection(db_path, readonly=True)
+    conn.execute("BEGIN")  # one read snapshot for every table, even while the app writes
+    writer = SnapshotWriter(path, {"seq": seq, "kind": kind, "created": stamp})
+    entry: Dict[str, object] = {
+        "seq": seq,
+        "kind": kind,
+        "parent": None if full else previous["seq"],
+        "file": path.name,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "digests": {},
+        "changed_rows": {},
+    }
+    row_digests: Dict[str, Dict[int, bytes]] = {}
+    changed = False
+    try:
+        for table, per_row in TABLES:
+            columns = _columns(conn, table)
+            if not columns:
+                continue
+            with span("snapshot_table", table=table):
+                if per_row:
+                    before = None if full else previous_digests.get(table, {})
+                    current = row_digests[table] = {}
+                    written = writer.table(table, "upsert", columns, _changed_rows(conn, table, before, current))
+                    changed |= written > 0
+                    if before is not None:
+                        deleted = sorted(before.keys() - current.keys())
+                        if deleted:
+                            writer.deleted(table, _id_ranges(deleted))
+                            changed = True
+                else:
+                    rows = conn.execute(f"SELECT * FROM {table} ORDER BY Id").fetchall()
+                    digest = hashlib.sha256(
+                        json.dumps([columns, rows], ensure_ascii=False, default=str).encode("utf-8")
+                    ).hexdigest()
+                    entry["digests"][table] = digest
+                    if full or digest != previous["digests"].get(table):
+                        written = writer.table(table, "replace", columns, rows)
+                        changed = True
+                    else:
+                        written = 0
+                entry["changed_rows"][table] = written
+                count("rows_backed_up", written)
+    except BaseException:
+        writer.abort()
+        raise
+    finally:
+        conn.close()
+
+    if not full and not changed:
+        writer.abort()
+        return None
+    writer.close()
+    entry["bytes"] = path.stat().st_size
+    entry["sha256"] = file_digest(path)
+    manifest["row_digests"] = {"seq": seq, "sha256": save_row_digests(backup_dir, row_digests)}
+    entry["seconds"] = round(time.perf_counter() - start, 3)
+    manifest["db"] = str(db_path)
+    manifest["snapshots"].append(entry)
+    save_manifest(backup_dir, manifest)
+    return entry
+
+
+# --------------------------------------------------------------------------- #
+# Restore
+# --------------------------------------------------------------------------- #
+
+def _read_lines(path: Path) -> Iterator[object]:
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        for line in fh:
+            yield json.loads(line)
+
+
+def _ids_from_ranges(ranges: List[List[int]]) -> Iterator[Tuple[int]]:
+    for first, last in ranges:
+        for value in range(first, last + 1):
+            yield (value,)
+
+
+def _batched(items: Iterator, size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def replay_snapshot(conn: sqlite3.Connection, path: Path) -> int:
+    """Apply one snapshot file inside the caller's transaction; returns rows written."""
+    lines = _read_lines(path)
+    header = next(lines, None)
+    if not isinstance(header, dict) or "kind" not in header:
+        raise SnapshotError(f"{path.name}: missing header")
+    applied = 0
+    for block in lines:
+        if block.get("end"):
+            return applied
+        table = block["table"]
+        target = set(_columns(conn, table))
+        if "deleted" in block:
+            ids = _ids_from_ranges(block["deleted"])
+            deleted = conn.executemany(f"DELETE FROM {table} WHERE Id = ?", ids).rowcount
+            count("rows_deleted", deleted)
+            continue
+        columns = block["columns"]
+        keep = [index for index, column in enumerate(columns) if column in target]
+        if block["mode"] == "replace":
+            conn.execute(f"DELETE FROM {table}")
+        names = ", ".join(columns[index] for index in keep)
+        marks = ", ".join("?" for _ in keep)
+        sql = f"INSERT OR REPLACE INTO {table} ({names}) VALUES ({marks})"
+
+        def rows() -> Iterator[list]:
+            for row in lines:
+                if isinstance(row, dict):  # {"rows": n} closes the block
+                    return
+                yield [row[index] for index in keep]
+
+        for batch in _batched(rows(), BATCH_SIZE):
+            conn.executemany(sql, batch)
+            applied += len(batch)
+    raise SnapshotError(f"{path.name}: truncated (no end marker)")
+
+
+def restore_snapshots(
+    db_path: Optional[Path | str] = None,
+    backup_dir: Path | str = DEFAULT_DIR,
+    upto: Optional[int] = None,
+) -> Dict[str, object]:
+    """Recreate the database from the chain ending at `upto` (default: the latest)."""
+    db_path = Path(db_path) if db_path is not None else gymdb.default_db_path()
+    backup_dir = Path(backup_dir)
+    chain = chain_for(load_manifest(backup_dir), upto)
+    if not chain:
+        raise SnapshotError(f"No snapshots in {backup_dir}")
+
+    with span("verify_chain"):
+        for entry in chain:
+            path = backup_dir / entry["file"]
+            if not path.exists():
+                raise SnapshotError(f"Missing snapshot file {path}")
+            if file_digest(path) != entry["sha256"]:
+                raise SnapshotError(f"Checksum mismatch for {path}")
+
+    if str(PROJECT_ROOT) not in sys.path:
+        sys.path.insert(0, str(PROJECT_ROOT))
+    import backup_and_recreate_db
+
+    start = time.perf_counter()
+    backup_and_recreate_db.create_fresh_database(db_path)
+    rows = 0
+    # One write transaction for the whole chain: a failure leaves the fresh, empty DB.
+    # Upserts would trip the hierarchy triggers, so the closure is rebuilt once at the end
+    with gymdb.transaction(db_path) as conn:
+        cursor = conn.cursor()
+        backup_and_recreate_db.drop_exercise_hierarchy_triggers(cursor)
+        for entry in chain:
+            with span("replay_snapshot", seq=entry["seq"]):
+                rows += replay_snapshot(conn, backup_dir / entry["file"])
+        backup_and_recreate_db.install_exercise_hierarchy(cursor)
+    count("rows_copied", rows)
+    return {"snapshots": len(chain), "upto": chain[-1]["seq"], "rows": rows,
+            "seconds": round(time.perf_counter() - start, 3)}
+
+
+# --------------------------------------------------------------------------- #
+# Self-check
+# --------------------------------------------------------------------------- #
+
+CREATED_FROM = datetime(2024, 1, 1)
+
+
+def _build_synthetic_db(db_path: Path, exercises: int) -> None:
+    if str(PROJECT_ROOT) not in sys.path:
+        sys.path.insert(0, str(PROJECT_ROOT))
+    import backup_and_recreate_db
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        backup_and_recreate_db.create_fresh_database(db_path)
+    with gymdb.transaction(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO MuscleGroups (Id, Name, SpanishName, Description) VALUES (?, ?, ?, ?)",
+            [(i, f"Muscle {i}", f"Músculo {i}", f"Grupo {i}") for i in range(1, 13)],
+        )
+        conn.executemany(
+            "INSERT INTO EquipmentTypes (Id, Name, SpanishName, Description) VALUES (?, ?, ?, ?)",
+            [(i, f"Equipment {i}", f"Equipo {i}", f"Equipo {i}") for i in range(1, 9)],
+        )
+        conn.executemany(
+            """INSERT INTO Exercises (Id, Name, SpanishName, Description, Instructions, PrimaryMuscleGroupId,
+                                      EquipmentTypeId, DifficultyLevel, ExerciseType, DurationSeconds,
+                                      IsActive, CreatedAt, UpdatedAt, ParentExerciseId)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?, NULL, ?)""",
+            (
+                (i, f"Exercise {i}", f"Ejercicio {i}", f"Descripción del ejercicio {i % 997}",
+                 "Mantén la espalda recta y controla el movimiento.", i % 12 + 1, i % 8 + 1,
+                 i % 4 + 1, i % 3, (None, 30, 60)[i % 3], (CREATED_FROM + timedelta(minutes=i)).isoformat(),
+                 i // 10 or None)
+                for i in range(1, exercises + 1)
+            ),
+        )
+
+
+def _dump(db_path: Path) -> Dict[str, list]:
+    with gymdb.connection(db_path, readonly=True) as conn:
+        return {table: conn.execute(f"SELECT * FROM {table} ORDER BY Id").fetchall() for table, _ in TABLES}
+
+
+def self_check(exercises: int) -> int:
+    checks: List[Tuple[str, bool]] = []
+    with tempfile.TemporaryDirectory(prefix="snapshots_") as tmp:
+        source = Path(tmp) / "gymroutine.db"
+        backups = Path(tmp) / "backups"
+        _build_synthetic_db(source, exercises)
+        gymdb.close_all(source)
+        db_bytes = source.stat().st_size
+
+        base = create_snapshot(source, backups)
+        print(f"  full   {base['changed_rows']['Exercises']:>8} rows  {base['bytes'] / 1024:9.1f} KiB"
+              f"  {base['seconds'] * 1000:8.1f} ms   (database {db_bytes / 1024:.1f} KiB)")
+
+        nightly = max(1, exercises // 100)
+        with gymdb.transaction(source) as conn:
+            # Edits as the app makes them: UpdatedAt is left alone
+            conn.execute("UPDATE Exercises SET Description = Description || ' (rev)' WHERE Id % 100 = 0")
+            conn.execute("UPDATE Exercises SET Name = 'Renamed', IsActive = 0 WHERE Id = 11")
+            conn.execute("DELETE FROM Exercises WHERE Id IN (3, 5, 7)")
+            conn.executemany(
+                """INSERT INTO Exercises (Name, SpanishName, Description, Instructions, PrimaryMuscleGroupId,
+                                          EquipmentTypeId, DifficultyLevel, ExerciseType, CreatedAt)
+                   VALUES (?, ?, 'Nuevo', 'Nuevo', 1, 1, 1, 0, '2026-10-19 02:00:00')""",
+                [(f"New {i}", f"Nuevo {i}") for i in range(nightly // 2)],
+            )
+        gymdb.close_all(source)
+        delta = create_snapshot(source, backups)
+        print(f"  delta  {delta['changed_rows']['Exercises']:>8} rows  {delta['bytes'] / 1024:9.1f} KiB"
+              f"  {delta['seconds'] * 1000:8.1f} ms")
+        expected = len(range(100, exercises + 1, 100)) + 1 + nightly // 2
+        checks.append(("delta holds only changed rows", delta["changed_rows"]["Exercises"] == expected))
+        with gzip.open(backups / delta["file"], "rt", encoding="utf-8") as fh:
+            captured = any(line.startswith('[11,"Renamed"') for line in fh)
+        checks.append(("edit without UpdatedAt captured", captured))
+        checks.append(("delta skips unchanged lookup tables", delta["changed_rows"]["MuscleGroups"] == 0))
+
+        with gymdb.transaction(source) as conn:
+            conn.execute("UPDATE MuscleGroups SET SpanishName = 'Pecho' WHERE Id = 1")
+        gymdb.close_all(source)
+        lookup = create_snapshot(source, backups)
+        checks.append(("lookup change captured", lookup is not None and lookup["changed_rows"]["MuscleGroups"] == 12))
+        checks.append(("no snapshot when nothing changed", create_snapshot(source, backups) is None))
+
+        restored = Path(tmp) / "restored.db"
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = restore_snapshots(restored, backups)
+        print(f"  restore {result['snapshots']} snapshots, {result['rows']} rows in {result['seconds'] * 1000:.1f} ms")
+        checks.append(("restore matches the source", _dump(restored) == _dump(source)))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            restore_snapshots(restored, backups, upto=base["seq"])
+        checks.append(("restore --upto base gives the base", len(_dump(restored)["Exercises"]) == exercises))
+
+        (backups / delta["file"]).write_bytes(b"tampered")
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                restore_snapshots(restored, backups)
+            checks.append(("corrupted chain refused", False))
+        except SnapshotError:
+            checks.append(("corrupted chain refused", True))
+        gymdb.close_all()
+
+    for name, ok in checks:
+        print(f"  {'ok  ' if ok else 'FAIL'} {name}")
+    return 0 if all(ok for _, ok in checks) else 1
+
+
+# --------------------------------------------------------------------------- #
+# CLI
+# --------------------------------------------------------------------------- #
+
+def print_chain(backup_dir: Path) -> None:
+    manifest = load_manifest(backup_dir)
+    latest = {entry["seq"] for entry in chain_for(manifest)}
+    for entry in manifest["snapshots"]:
+        rows = sum(entry["changed_rows"].values())
+        mark = "*" if entry["seq"] in latest else " "
+        print(f"{mark} {entry['seq']:>4} {entry['kind']:<5} {entry['created']}  {rows:>8} rows"
+              f"  {entry['bytes'] / 1024:9.1f} KiB  {entry['file']}")
+    if not manifest["snapshots"]:
+        print(f"No snapshots in {backup_dir}")
+
+
+def main(argv: Optional[List[str]] = None, prog: Optional[str] = None) -> int:
+    ap = argparse.ArgumentParser(prog=prog, description="Differential compressed backups of gymroutine.db")
+    ap.add_argument("action", nargs="?", choices=("create", "list", "restore"))
+    ap.add_argument("--db", default=None, help="Database path (default: $GYMDB_PATH or gymroutine.db)")
+    ap.add_argument("--dir", default=str(DEFAULT_DIR), help="Snapshot directory")
+    ap.add_argument("--full", action="store_true", help="create: write a full snapshot even if a chain exists")
+    ap.add_argument("--max-chain", type=int, default=MAX_CHAIN, help="create: deltas before the next full snapshot")
+    ap.add_argument("--upto", type=int, default=None, help="restore: last snapshot to replay (default: latest)")
+    ap.add_argument("--self-check", action="store_true", help="Back up, change and restore a synthetic DB")
+    ap.add_argument("--exercises", type=int, default=20000, help="Rows in the --self-check database")
+    add_profile_argument(ap, "backup_snapshots")
+    args = ap.parse_args(argv)
+
+    if args.self_check:
+        return self_check(args.exercises)
+    if args.action is None:
+        ap.print_help()
+        return 0
+
+    backup_dir = Path(args.dir)
+    try:
+        with profiling(args.profile, "backup_snapshots"):
+            if args.action == "list":
+                print_chain(backup_dir)
+            elif args.action == "create":
+                entry = create_snapshot(args.db, backup_dir, args.full, args.max_chain)
+                if entry is None:
+                    print("No changes since the last snapshot")
+                else:
+                    print(f"{entry['kind']} snapshot {entry['seq']}: {sum(entry['changed_rows'].values())} rows, "
+                          f"{entry['bytes'] / 1024:.1f} KiB in {entry['seconds']:.2f} s -> {backup_dir / entry['file']}")
+            else:
+                result = restore_snapshots(args.db, backup_dir, args.upto)
+                print(f"Restored {result['rows']} rows from {result['snapshots']} snapshots "
+                      f"(up to {result['upto']}) in {result['seconds']:.2f} s")
+    except SnapshotError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        gymdb.close_all()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,629 @@
+#!/usr/bin/env python3
+"""
+Reproducible benchmarks for the hot functions of the Python tools, run over a
+fixed offline corpus, with regression checks against a stored baseline.
+
+Usage:
+  python scripts/benchmark_scripts.py [--repeat 5] [--only fit_icon] [--out benchmark_results.json]
+  python scripts/benchmark_scripts.py --save-baseline          # record scripts/benchmark_baseline.json
+  python scripts/benchmark_scripts.py --tolerance 0.25         # exit 1 on a >25% regression
+  python scripts/benchmark_scripts.py --list
+
+Corpus (nothing is downloaded):
+  - Repo icons: icon_32.png, gym_icon_512.png, icon_transparent.png.
+  - The first SAMPLE_IMAGES images of docs/ejercicios (sorted by path), and the
+    names of every file and folder there as text input for sanitize_for_fs.
+  - scripts/benchmark_corpus/*.html: small pages laid out like the liftmanual
+    exercise pages download_exercise_assets.py parses.
+  - A synthetic gymroutine.db built in a temporary directory with
+    --synthetic-exercises rows (fixed seed), used by the backup/restore steps.
+  - A second synthetic DB of HIERARCHY_EXERCISES exercises in deep variant
+    trees (HIERARCHY_TREE per tree, ~3 of 4 extending the deepest chain), for
+    the ExerciseHierarchy closure table against recursive CTEs.
+
+Notes:
+  - Every benchmark runs once as warm-up, then --repeat timed runs; min, median
+    and mean are recorded. Setup (decoding images, rebuilding the database) is
+    not timed.
+  - Peak memory comes from one extra run under tracemalloc, so it counts Python
+    allocations only; Pillow's pixel buffers are allocated in C and not included.
+  - A benchmark is a regression when its median time exceeds the baseline by more
+    than --tolerance and by more than TIME_SLACK (10 ms), or its peak memory by
+    more than --memory-tolerance and MEMORY_SLACK (64 KiB).
+  - The baseline is committed as scripts/benchmark_baseline.json; re-record it
+    with --save-baseline when a change is meant to move the numbers.
+  - Benchmarks whose tool cannot be imported (e.g. bs4/requests missing for the
+    scraper) are reported as skipped, not failed.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPTS_DIR.parent
+CORPUS_DIR = SCRIPTS_DIR / "benchmark_corpus"
+EXERCISES_ROOT = PROJECT_ROOT / "docs" / "ejercicios"
+DEFAULT_OUT = PROJECT_ROOT / "benchmark_results.json"
+DEFAULT_BASELINE = SCRIPTS_DIR / "benchmark_baseline.json"
+
+for _path in (SCRIPTS_DIR, PROJECT_ROOT):
+    if str(_path) not in sys.path:
+        sys.path.insert(0, str(_path))
+
+ICON_FILES = ("icon_32.png", "gym_icon_512.png", "icon_transparent.png")
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+SAMPLE_IMAGES = 2
+SYNTHETIC_SEED = 1234
+HIERARCHY_EXERCISES = 4000
+HIERARCHY_TREE = 400
+HIERARCHY_QUERIES = 200
+
+# The closure table's alternative: walk ParentExerciseId on every call
+SUBTREE_CTE_SQL = """
+    WITH RECURSIVE subtree(Id, Depth) AS (
+        SELECT Id, 0 FROM Exercises WHERE Id = ?
+        UNION ALL
+        SELECT e.Id, s.Depth + 1 FROM Exercises e JOIN subtree s ON e.ParentExerciseId = s.Id
+    )
+    SELECT Id, Depth FROM subtree WHERE Depth > 0
+"""
+ROOT_CTE_SQL = """
+    WITH RECURSIVE chain(Id, ParentId, Depth) AS (
+        SELECT Id, ParentExerciseId, 0 FROM Exercises WHERE Id = ?
+        UNION ALL
+        SELECT e.Id, e.ParentExerciseId, c.Depth + 1 FROM Exercises e JOIN chain c ON e.Id = c.ParentId
+    )
+    SELECT Id FROM chain ORDER BY Depth DESC LIMIT 1
+"""
+# Peak memory below this many bytes over baseline is noise, not a regression
+MEMORY_SLACK = 64 * 1024
+# Likewise for a median this many seconds over baseline (scheduler jitter on ms-scale runs)
+TIME_SLACK = 0.010
+
+
+class Benchmark(NamedTuple):
+    name: str
+    group: str
+    # build(context) -> (setup, run). setup() runs untimed before every run and
+    # its result is passed to run(). Raising ImportError marks it skipped.
+    build: Callable[["Corpus"], Tuple[Callable[[], Any], Callable[[Any], Any]]]
+
+
+# --------------------------------------------------------------------------- #
+# Corpus
+# --------------------------------------------------------------------------- #
+
+class Corpus:
+    """Lazily loaded inputs shared by the benchmarks."""
+
+    def __init__(self, workdir: Path, synthetic_exercises: int):
+        self.workdir = workdir
+        self.synthetic_exercises = synthetic_exercises
+        self._cache: Dict[str, Any] = {}
+
+    def _cached(self, key: str, factory: Callable[[], Any]) -> Any:
+        if key not in self._cache:
+            self._cache[key] = factory()
+        return self._cache[key]
+
+    def icon(self, name: str):
+        def load():
+            from PIL import Image
+            with Image.open(PROJECT_ROOT / name) as im:
+                return im.convert("RGBA")
+        return self._cached(f"icon:{name}", load)
+
+    def sample_images(self) -> List[Any]:
+        def load():
+            from PIL import Image
+            paths = sorted(
+                p for p in EXERCISES_ROOT.rglob("*")
+                if p.suffix.lower() in IMAGE_SUFFIXES and p.is_file()
+            )[:SAMPLE_IMAGES]
+            images = []
+            for path in paths:
+                with Image.open(path) as im:
+                    images.append(im.convert("RGBA"))
+            return images
+        return self._cached("sample_images", load)
+
+    def exercise_names(self) -> List[str]:
+        def load():
+            names = []
+            for path in sorted(EXERCISES_ROOT.rglob("*")):
+                names.append(path.stem if path.is_file() else path.name)
+            return names
+        return self._cached("exercise_names", load)
+
+    def html_pages(self) -> List[str]:
+        return self._cached(
+            "html_pages",
+            lambda: [p.read_text(encoding="utf-8") for p in sorted(CORPUS_DIR.glob("*.html"))],
+        )
+
+    def synthetic_backup(self) -> Dict[str, list]:
+        return self._cached("synthetic_backup", lambda: synthetic_backup(self.synthetic_exercises))
+
+    def db_dir(self) -> Path:
+        """Directory holding a populated synthetic gymroutine.db."""
+        def build():
+            import backup_and_recreate_db as db
+            path = self.workdir / "populated"
+            path.mkdir(parents=True, exist_ok=True)
+            with quiet_in(path):
+                db.create_fresh_database()
+                db.populate_basic_data(self.synthetic_backup())
+            return path
+        return self._cached("db_dir", build)
+
+    def hierarchy_db(self) -> Path:
+        """gymroutine.db with deep variant trees and a built ExerciseHierarchy."""
+        def build():
+            import backup_and_recreate_db as db
+            path = self.workdir / "hierarchy"
+            path.mkdir(parents=True, exist_ok=True)
+            with quiet_in(path):
+                db.create_fresh_database()
+                db.populate_basic_data(hierarchy_backup(HIERARCHY_EXERCISES, HIERARCHY_TREE))
+            return path / "gymroutine.db"
+        return self._cached("hierarchy_db", build)
+
+    def hierarchy_ids(self) -> List[int]:
+        rng = random.Random(SYNTHETIC_SEED)
+        return self._cached(
+            "hierarchy_ids", lambda: [rng.randint(1, HIERARCHY_EXERCISES) for _ in range(HIERARCHY_QUERIES)]
+        )
+
+
+def synthetic_backup(exercises: int) -> Dict[str, list]:
+    """A backup_existing_data()-shaped payload with deterministic rows."""
+    rng = random.Random(SYNTHETIC_SEED)
+    muscle_groups = [
+        {"Id": i, "Name": f"Muscle {i}", "SpanishName": f"Músculo {i}", "Description": f"Grupo {i}"}
+        for i in range(1, 13)
+    ]
+    equipment_types = [
+        {"Id": i, "Name": f"Equipment {i}", "SpanishName": f"Equipo {i}", "Description": f"Equipo {i}"}
+        for i in range(1, 9)
+    ]
+    rows = []
+    for i in range(1, exercises + 1):
+        rows.append({
+            "Id": i,
+            "Name": f"Exercise {i}",
+            "SpanishName": f"Ejercicio {i}",
+            "Description": " ".join(rng.choice(("press", "remo", "sentadilla", "curl", "plancha")) for _ in range(12)),
+            "Instructions": "Mantén la espalda recta y controla el movimiento.",
+            "PrimaryMuscleGroupId": rng.randint(1, len(muscle_groups)),
+            "EquipmentTypeId": rng.randint(1, len(equipment_types)),
+            "DifficultyLevel": rng.randint(1, 4),
+            "ExerciseType": rng.randint(0, 7),
+            "DurationSeconds": rng.choice((None, 30, 45, 60)),
+            "IsActive": 1,
+            "CreatedAt": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T10:00:00",
+            "UpdatedAt": None,
+            "ParentExerciseId": rng.randint(1, i - 1) if i > 1 and rng.random() < 0.2 else None,
+        })
+    return {
+        "exercises": rows,
+        "muscle_groups": muscle_groups,
+        "equipment_types": equipment_types,
+        "backup_timestamp": "2025-01-01T00:00:00",
+    }
+
+
+def hierarchy_backup(exercises: int, tree_size: int) -> Dict[str, list]:
+    """synthetic_backup() rows rearranged into deep ParentExerciseId trees."""
+    rng = random.Random(SYNTHETIC_SEED)
+    backup = synthetic_backup(exercises)
+    deepest = 0
+    for row in backup["exercises"]:
+        index = row["Id"] - 1
+        if index % tree_size == 0:
+            row["ParentExerciseId"] = None
+            deepest = row["Id"]
+        elif rng.random() < 0.75:
+            row["ParentExerciseId"] = deepest
+            deepest = row["Id"]
+        else:
+            row["ParentExerciseId"] = rng.randint(index - index % tree_size + 1, row["Id"] - 1)
+    return backup
+
+
+@contextlib.contextmanager
+def quiet_in(path: Path) -> Iterator[None]:
+    """Run in `path` with stdout discarded; the DB steps use CWD-relative files."""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        os.chdir(previous)
+
+
+def _reset_db(path: Path) -> None:
+    """Drop gymroutine.db (and its pooled connections, WAL and moved copy) from path."""
+    import gymdb
+
+    gymdb.close_all(path / "gymroutine.db")
+    for name in ("gymroutine.db", "gymroutine.db.old_backup"):
+        for suffix in ("", "-wal", "-shm"):
+            target = path / (name + suffix)
+            if target.exists():
+                target.unlink()
+
+
+# --------------------------------------------------------------------------- #
+# Benchmarks
+# --------------------------------------------------------------------------- #
+
+def bench_remove_background_icon(corpus: Corpus):
+    from remove_bg_transparent import pick_background_color, remove_background, sample_border_colors
+    im = corpus.icon("gym_icon_512.png")
+    bg = pick_background_color(sample_border_colors(im))
+    return (lambda: im), (lambda src: remove_background(src, bg))
+
+
+def bench_remove_background_photos(corpus: Corpus):
+    from remove_bg_transparent import pick_background_color, remove_background, sample_border_colors
+    images = [(im, pick_background_color(sample_border_colors(im))) for im in corpus.sample_images()]
+
+    def run(items):
+        for im, bg in items:
+            remove_background(im, bg)
+    return (lambda: images), run
+
+
+def bench_normalize_transparent_pixels(corpus: Corpus):
+    from fit_icon import normalize_transparent_pixels
+    im = corpus.icon("gym_icon_512.png")
+    # normalize_transparent_pixels converts (copies) before writing, so the input is reusable
+    return (lambda: im), normalize_transparent_pixels
+
+
+def bench_autocrop_to_content(corpus: Corpus):
+    from fit_icon import autocrop_to_content
+    images = [corpus.icon(name) for name in ICON_FILES]
+
+    def run(items):
+        for im in items:
+            autocrop_to_content(im)
+    return (lambda: images), run
+
+
+def bench_fit_square_with_padding(corpus: Corpus):
+    from fit_icon import autocrop_to_content, fit_square_with_padding
+    cropped = autocrop_to_content(corpus.icon("gym_icon_512.png"))
+
+    def run(im):
+        fit_square_with_padding(im, 8.0)
+        fit_square_with_padding(im, -6.0)
+    return (lambda: cropped), run
+
+
+def bench_sanitize_for_fs(corpus: Corpus):
+    from download_exercise_assets import sanitize_for_fs
+    names = corpus.exercise_names()
+
+    def run(items):
+        for text in items:
+            sanitize_for_fs(text, allow_spaces=True)
+            sanitize_for_fs(text, allow_spaces=False, max_len=180)
+    return (lambda: names), run
+
+
+def bench_pick_description_and_image(corpus: Corpus):
+    from bs4 import BeautifulSoup
+    from download_exercise_assets import pick_description, pick_image_url
+    soups = [BeautifulSoup(text, "html.parser") for text in corpus.html_pages()]
+
+    def run(items):
+        for soup in items:
+            pick_description(soup)
+            pick_image_url(soup)
+    return (lambda: soups), run
+
+
+def bench_parse_html_pages(corpus: Corpus):
+    from bs4 import BeautifulSoup
+    import download_exercise_assets  # noqa: F401  (same import requirements as the scraper)
+    pages = corpus.html_pages()
+
+    def run(items):
+        for text in items:
+            BeautifulSoup(text, "html.parser")
+    return (lambda: pages), run
+
+
+def bench_backup_existing_data(corpus: Corpus):
+    import backup_and_recreate_db as db
+    path = corpus.db_dir()
+
+    def run(_):
+        with quiet_in(path):
+            db.backup_existing_data()
+    return (lambda: None), run
+
+
+def bench_create_fresh_database(corpus: Corpus):
+    import backup_and_recreate_db as db
+    path = corpus.workdir / "fresh"
+    path.mkdir(parents=True, exist_ok=True)
+
+    def setup():
+        _reset_db(path)
+
+    def run(_):
+        with quiet_in(path):
+            db.create_fresh_database()
+    return setup, run
+
+
+def bench_populate_basic_data(corpus: Corpus):
+    import backup_and_recreate_db as db
+    path = corpus.workdir / "restore"
+    path.mkdir(parents=True, exist_ok=True)
+    backup = corpus.synthetic_backup()
+
+    def setup():
+        _reset_db(path)
+        with quiet_in(path):
+            db.create_fresh_database()
+        return backup
+
+    def run(data):
+        with quiet_in(path):
+            db.populate_basic_data(data)
+    return setup, run
+
+
+def bench_verify_new_database(corpus: Corpus):
+    import backup_and_recreate_db as db
+    path = corpus.db_dir()
+
+    def run(_):
+        with quiet_in(path):
+            db.verify_new_database()
+    return (lambda: None), run
+
+
+def bench_rebuild_exercise_hierarchy(corpus: Corpus):
+    import backup_and_recreate_db as db
+    import gymdb
+    path = corpus.hierarchy_db()
+
+    def run(_):
+        with gymdb.transaction(path) as conn:
+            db.rebuild_exercise_hierarchy(conn.cursor())
+    return (lambda: None), run
+
+
+def _bench_hierarchy_query(sql_name: str):
+    def build(corpus: Corpus):
+        import backup_and_recreate_db as db
+        import gymdb
+        path = corpus.hierarchy_db()
+        ids = corpus.hierarchy_ids()
+        sql = getattr(db, sql_name, None) or globals()[sql_name]
+
+        def run(_):
+            with gymdb.connection(path, readonly=True) as conn:
+                for exercise_id in ids:
+                    conn.execute(sql, (exercise_id,)).fetchall()
+        return (lambda: None), run
+    return build
+
+
+BENCHMARKS: Tuple[Benchmark, ...] = (
+    Benchmark("remove_background/gym_icon_512", "remove_bg_transparent", bench_remove_background_icon),
+    Benchmark("remove_background/sample_photos", "remove_bg_transparent", bench_remove_background_photos),
+    Benchmark("normalize_transparent_pixels/gym_icon_512", "fit_icon", bench_normalize_transparent_pixels),
+    Benchmark("autocrop_to_content/icons", "fit_icon", bench_autocrop_to_content),
+    Benchmark("fit_square_with_padding/gym_icon_512", "fit_icon", bench_fit_square_with_padding),
+    Benchmark("sanitize_for_fs/exercise_names", "download_exercise_assets", bench_sanitize_for_fs),
+    Benchmark("pick_description+pick_image_url/html_pages", "download_exercise_assets", bench_pick_description_and_image),
+    Benchmark("html_parse/html_pages", "download_exercise_assets", bench_parse_html_pages),
+    Benchmark("backup_existing_data/synthetic_db", "backup_and_recreate_db", bench_backup_existing_data),
+    Benchmark("create_fresh_database", "backup_and_recreate_db", bench_create_fresh_database),
+    Benchmark("populate_basic_data/synthetic_db", "backup_and_recreate_db", bench_populate_basic_data),
+    Benchmark("verify_new_database/synthetic_db", "backup_and_recreate_db", bench_verify_new_database),
+    Benchmark("rebuild_exercise_hierarchy/deep_trees", "backup_and_recreate_db", bench_rebuild_exercise_hierarchy),
+    Benchmark("variants_of/closure_table", "backup_and_recreate_db", _bench_hierarchy_query("EXERCISE_VARIANTS_SQL")),
+    Benchmark("variants_of/recursive_cte", "backup_and_recreate_db", _bench_hierarchy_query("SUBTREE_CTE_SQL")),
+    Benchmark("root_of/closure_table", "backup_and_recreate_db", _bench_hierarchy_query("EXERCISE_ROOT_SQL")),
+    Benchmark("root_of/recursive_cte", "backup_and_recreate_db", _bench_hierarchy_query("ROOT_CTE_SQL")),
+)
+
+
+# --------------------------------------------------------------------------- #
+# Runner
+# --------------------------------------------------------------------------- #
+
+def measure(setup: Callable[[], Any], run: Callable[[Any], Any], repeat: int) -> Dict[str, Any]:
+    run(setup())  # warm-up: imports, caches, first-touch page faults
+
+    timings: List[float] = []
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        run(arg)
+        timings.append(time.perf_counter() - start)
+
+    arg = setup()
+    tracemalloc.start()
+    try:
+        run(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "status": "ok",
+        "runs": repeat,
+        "min_seconds": round(min(timings), 6),
+        "median_seconds": round(statistics.median(timings), 6),
+        "mean_seconds": round(statistics.fmean(timings), 6),
+        "peak_memory_bytes": peak,
+    }
+
+
+def run_benchmarks(benchmarks: List[Benchmark], repeat: int, synthetic_exercises: int) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory(prefix="gym_bench_") as tmp:
+        corpus = Corpus(Path(tmp), synthetic_exercises)
+        for bench in benchmarks:
+            try:
+                setup, run = bench.build(corpus)
+            except ImportError as exc:
+                results[bench.name] = {"status": "skipped", "reason": f"{type(exc).__name__}: {exc}"}
+                print(f"  {bench.name:<50} skipped ({exc})", file=sys.stderr)
+                continue
+            result = measure(setup, run, repeat)
+            result["group"] = bench.group
+            results[bench.name] = result
+            print(
+                f"  {bench.name:<50} median {result['median_seconds'] * 1000:10.2f} ms"
+                f"  peak {result['peak_memory_bytes'] / 1024:10.1f} KiB",
+                file=sys.stderr,
+            )
+        if "gymdb" in sys.modules:
+            sys.modules["gymdb"].close_all()  # release the temp DBs before cleanup
+    return results
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        from PIL import __version__ as pillow_version
+    except ImportError:
+        pillow_version = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "pillow": pillow_version,
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float,
+    memory_tolerance: float,
+) -> List[str]:
+    """Annotate results with their change against the baseline; return regressions."""
+    regressions: List[str] = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if result.get("status") != "ok" or not base or base.get("status") != "ok":
+            continue
+        time_ratio = result["median_seconds"] / base["median_seconds"] if base["median_seconds"] else 1.0
+        time_delta = result["median_seconds"] - base["median_seconds"]
+        memory_delta = result["peak_memory_bytes"] - base["peak_memory_bytes"]
+        memory_ratio = result["peak_memory_bytes"] / base["peak_memory_bytes"] if base["peak_memory_bytes"] else 1.0
+        result["baseline"] = {
+            "median_seconds": base["median_seconds"],
+            "peak_memory_bytes": base["peak_memory_bytes"],
+            "time_ratio": round(time_ratio, 3),
+            "memory_ratio": round(memory_ratio, 3),
+        }
+        flags = []
+        if time_ratio > 1 + tolerance and time_delta > TIME_SLACK:
+            flags.append(f"time x{time_ratio:.2f}")
+        if memory_ratio > 1 + memory_tolerance and memory_delta > MEMORY_SLACK:
+            flags.append(f"memory x{memory_ratio:.2f}")
+        result["regression"] = bool(flags)
+        if flags:
+            regressions.append(f"{name}: {', '.join(flags)}")
+    return regressions
+
+
+# --------------------------------------------------------------------------- #
+# CLI
+# --------------------------------------------------------------------------- #
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark the tools' hot functions over an offline corpus")
+    ap.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark (after one warm-up)")
+    ap.add_argument("--only", action="append", default=[], metavar="TEXT",
+                    help="Run benchmarks whose name or group contains TEXT (repeatable)")
+    ap.add_argument("--out", default=str(DEFAULT_OUT), help="Results JSON path")
+    ap.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Baseline JSON path")
+    ap.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="Allowed median time increase (0.25 = 25%%)")
+    ap.add_argument("--memory-tolerance", type=float, default=0.10, help="Allowed peak memory increase")
+    ap.add_argument("--synthetic-exercises", type=int, default=2000, help="Exercises in the synthetic DB")
+    ap.add_argument("--list", action="store_true", help="List benchmarks and exit")
+    args = ap.parse_args()
+
+    selected = [
+        bench for bench in BENCHMARKS
+        if not args.only or any(text in bench.name or text in bench.group for text in args.only)
+    ]
+    if args.list:
+        for bench in selected:
+            print(f"{bench.group:<26} {bench.name}")
+        return 0
+    if not selected:
+        print("No benchmark matches --only.", file=sys.stderr)
+        return 1
+
+    print(f"Running {len(selected)} benchmarks ({args.repeat} runs each)", file=sys.stderr)
+    results = run_benchmarks(selected, max(1, args.repeat), args.synthetic_exercises)
+    report = {
+        "environment": environment(),
+        "settings": {"repeat": args.repeat, "synthetic_exercises": args.synthetic_exercises},
+        "results": results,
+    }
+
+    baseline_path = Path(args.baseline)
+    regressions: List[str] = []
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Baseline written to {baseline_path}")
+    elif baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+        if baseline.get("settings") != report["settings"]:
+            print(f"Warning: baseline was recorded with {baseline.get('settings')}", file=sys.stderr)
+        base_env = baseline.get("environment", {})
+        if (base_env.get("python"), base_env.get("machine")) != (report["environment"]["python"], report["environment"]["machine"]):
+            print("Warning: baseline comes from a different Python/machine; timings may not be comparable",
+                  file=sys.stderr)
+        regressions = compare(results, baseline.get("results", {}), args.tolerance, args.memory_tolerance)
+        report["baseline"] = {"path": str(baseline_path), "timestamp": base_env.get("timestamp")}
+        report["regressions"] = regressions
+    else:
+        print(f"No baseline at {baseline_path}; run with --save-baseline to record one.", file=sys.stderr)
+
+    out = Path(args.out)
+    out.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Results written to {out}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {baseline_path}:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    if "baseline" in report:
+        print(f"No regressions against {baseline_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
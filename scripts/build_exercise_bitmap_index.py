@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Export a compact, memory-mappable bitmap index of the exercise catalog so routine
+generation can find candidate exercises with a few AND/OR operations instead of
+SQL round-trips.
+
+Usage:
+  python scripts/build_exercise_bitmap_index.py [--db gymroutine.db] [--out exercise_index.bidx]
+  python scripts/build_exercise_bitmap_index.py --benchmark [--synthetic 20000] [--queries 2000]
+
+Query API:
+  index = ExerciseBitmapIndex.open("exercise_index.bidx")
+  ids = index.select(muscle=[1, 7], equipment=[2, 3], difficulty=[1, 2], include_secondary=True)
+  bits = index.bitset("primary_muscle", 1) & index.bitset("equipment", 2)
+  ids = index.ids(bits)
+
+Notes:
+  - One bitset per value of each family: primary_muscle, secondary_muscle, muscle
+    (primary OR secondary), equipment, difficulty, type, plus a single 'active' set.
+    Bit i stands for the i-th exercise in Id order.
+  - Values inside a family are OR-ed, families are AND-ed, and only active exercises
+    are returned by select().
+  - Bitsets are stored as raw little-endian bytes, 8-byte aligned, so the reader
+    only maps the file and turns the slices it needs into Python ints on demand.
+"""
+from __future__ import annotations
+
+import argparse
+import mmap
+import random
+import sqlite3
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import gymdb
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_DB = gymdb.default_db_path(PROJECT_ROOT / "gymroutine.db")
+DEFAULT_OUT = PROJECT_ROOT / "exercise_index.bidx"
+
+MAGIC = b"GYMBIDX1"
+# magic, exercise count, bytes per bitset, toc entry count, ids offset, toc offset
+HEADER = struct.Struct("<8sIIIQQ")
+# family code, value, bitset offset
+TOC_ENTRY = struct.Struct("<BxxxiQ")
+
+FAMILIES = ("active", "primary_muscle", "secondary_muscle", "muscle", "equipment", "difficulty", "type")
+FAMILY_CODES = {name: code for code, name in enumerate(FAMILIES)}
+
+
+def _align(offset: int, boundary: int = 8) -> int:
+    return (offset + boundary - 1) // boundary * boundary
+
+
+# --------------------------------------------------------------------------- #
+# Building
+# --------------------------------------------------------------------------- #
+
+def bitset_size(count: int) -> int:
+    return _align(max(1, (count + 7) // 8))
+
+
+def load_bitsets(conn: sqlite3.Connection) -> Tuple[List[int], Dict[Tuple[str, int], bytearray]]:
+    rows = conn.execute(
+        """
+        SELECT Id, PrimaryMuscleGroupId, EquipmentTypeId, DifficultyLevel, ExerciseType, IsActive
+        FROM Exercises
+        ORDER BY Id
+        """
+    ).fetchall()
+    ids = [row[0] for row in rows]
+    position = {exercise_id: bit for bit, exercise_id in enumerate(ids)}
+    size = bitset_size(len(ids))
+
+    bitsets: Dict[Tuple[str, int], bytearray] = {}
+
+    def set_bit(family: str, value: Optional[int], bit: int) -> None:
+        if value is None:
+            return
+        key = (family, int(value))
+        bitset = bitsets.get(key)
+        if bitset is None:
+            bitset = bitsets[key] = bytearray(size)
+        bitset[bit >> 3] |= 1 << (bit & 7)
+
+    for bit, (_, primary, equipment, difficulty, exercise_type, is_active) in enumerate(rows):
+        if is_active:
+            set_bit("active", 1, bit)
+        set_bit("primary_muscle", primary, bit)
+        set_bit("muscle", primary, bit)
+        set_bit("equipment", equipment, bit)
+        set_bit("difficulty", difficulty, bit)
+        set_bit("type", exercise_type, bit)
+
+    for exercise_id, muscle_id in conn.execute("SELECT ExerciseId, MuscleGroupId FROM ExerciseSecondaryMuscles"):
+        bit = position.get(exercise_id)
+        if bit is not None:
+            set_bit("secondary_muscle", muscle_id, bit)
+            set_bit("muscle", muscle_id, bit)
+
+    return ids, bitsets
+
+
+def write_index(path: Path, ids: Sequence[int], bitsets: Dict[Tuple[str, int], bytearray]) -> int:
+    bitset_bytes = bitset_size(len(ids))
+    keys = sorted(bitsets, key=lambda k: (FAMILY_CODES[k[0]], k[1]))
+
+    ids_offset = HEADER.size
+    ids_blob = array("q", ids).tobytes()
+    toc_offset = _align(ids_offset + len(ids_blob))
+    data_offset = _align(toc_offset + TOC_ENTRY.size * len(keys))
+
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with tmp.open("wb") as fh:
+        fh.write(HEADER.pack(MAGIC, len(ids), bitset_bytes, len(keys), ids_offset, toc_offset))
+        fh.write(ids_blob)
+        fh.write(b"\0" * (toc_offset - fh.tell()))
+        for index, (family, value) in enumerate(keys):
+            fh.write(TOC_ENTRY.pack(FAMILY_CODES[family], value, data_offset + index * bitset_bytes))
+        fh.write(b"\0" * (data_offset - fh.tell()))
+        for key in keys:
+            fh.write(bitsets[key])
+        size = fh.tell()
+    tmp.replace(path)
+    return size
+
+
+# --------------------------------------------------------------------------- #
+# Reading
+# --------------------------------------------------------------------------- #
+
+class ExerciseBitmapIndex:
+    """Read-only view over a .bidx file. Bitsets are Python ints built lazily from the mmap."""
+
+    def __init__(self, buffer: mmap.mmap):
+        self._buffer = buffer
+        magic, count, bitset_bytes, entries, ids_offset, toc_offset = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("Not an exercise bitmap index file")
+        self.exercise_count = count
+        self._bitset_bytes = bitset_bytes
+        self._view = memoryview(buffer)
+        self._ids = self._view[ids_offset:ids_offset + count * 8].cast("q")
+        self._offsets: Dict[Tuple[str, int], int] = {}
+        for i in range(entries):
+            code, value, offset = TOC_ENTRY.unpack_from(buffer, toc_offset + i * TOC_ENTRY.size)
+            self._offsets[(FAMILIES[code], value)] = offset
+        self._cache: Dict[Tuple[str, int], int] = {}
+
+    @classmethod
+    def open(cls, path: Path | str) -> "ExerciseBitmapIndex":
+        with open(path, "rb") as fh:
+            return cls(mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def close(self) -> None:
+        self._ids.release()
+        self._view.release()
+        self._buffer.close()
+
+    def values(self, family: str) -> List[int]:
+        return sorted(value for fam, value in self._offsets if fam == family)
+
+    def bitset(self, family: str, value: int) -> int:
+        key = (family, value)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        offset = self._offsets.get(key)
+        bits = 0 if offset is None else int.from_bytes(
+            self._buffer[offset:offset + self._bitset_bytes], "little"
+        )
+        self._cache[key] = bits
+        return bits
+
+    def any_of(self, family: str, values: Iterable[int]) -> int:
+        bits = 0
+        for value in values:
+            bits |= self.bitset(family, value)
+        return bits
+
+    def select_bits(
+        self,
+        muscle: Optional[Iterable[int]] = None,
+        equipment: Optional[Iterable[int]] = None,
+        difficulty: Optional[Iterable[int]] = None,
+        exercise_type: Optional[Iterable[int]] = None,
+        include_secondary: bool = False,
+        active_only: bool = True,
+    ) -> int:
+        bits = self.bitset("active", 1) if active_only else (1 << self.exercise_count) - 1
+        if muscle is not None:
+            bits &= self.any_of("muscle" if include_secondary else "primary_muscle", muscle)
+        if equipment is not None:
+            bits &= self.any_of("equipment", equipment)
+        if difficulty is not None:
+            bits &= self.any_of("difficulty", difficulty)
+        if exercise_type is not None:
+            bits &= self.any_of("type", exercise_type)
+        return bits
+
+    def select(self, **filters) -> List[int]:
+        return self.ids(self.select_bits(**filters))
+
+    def ids(self, bits: int) -> List[int]:
+        result: List[int] = []
+        ids = self._ids
+        while bits:
+            low = bits & -bits
+            result.append(ids[low.bit_length() - 1])
+            bits ^= low
+        return result
+
+    def count(self, bits: int) -> int:
+        return bin(bits).count("1")
+
+
+# --------------------------------------------------------------------------- #
+# Benchmark
+# --------------------------------------------------------------------------- #
+
+def create_synthetic_db(conn: sqlite3.Connection, exercises: int, seed: int = 42) -> None:
+    """Fill an empty connection with a random catalog shaped like gymroutine.db."""
+    rng = random.Random(seed)
+    conn.executescript(
+        """
+        CREATE TABLE Exercises (
+            Id INTEGER PRIMARY KEY AUTOINCREMENT,
+            PrimaryMuscleGroupId INTEGER NOT NULL,
+            EquipmentTypeId INTEGER NOT NULL,
+            DifficultyLevel INTEGER NOT NULL,
+            ExerciseType INTEGER NOT NULL,
+            IsActive INTEGER NOT NULL DEFAULT 1
+        );
+        CREATE TABLE ExerciseSecondaryMuscles (
+            Id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ExerciseId INTEGER NOT NULL,
+            MuscleGroupId INTEGER NOT NULL
+        );
+        CREATE INDEX IX_ExerciseSecondaryMuscles_ExerciseId ON ExerciseSecondaryMuscles(ExerciseId);
+        """
+    )
+    conn.executemany(
+        "INSERT INTO Exercises (Id, PrimaryMuscleGroupId, EquipmentTypeId, DifficultyLevel, ExerciseType, IsActive) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            (i, rng.randint(1, 8), rng.randint(1, 8), rng.randint(1, 4), rng.randint(0, 7), int(rng.random() > 0.05))
+            for i in range(1, exercises + 1)
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO ExerciseSecondaryMuscles (ExerciseId, MuscleGroupId) VALUES (?, ?)",
+        ((i, rng.randint(1, 8)) for i in range(1, exercises + 1) for _ in range(rng.randint(0, 2))),
+    )
+    conn.commit()
+
+
+def sql_select(conn: sqlite3.Connection, muscle, equipment, difficulty, exercise_type) -> List[int]:
+    def marks(values) -> str:
+        return ",".join("?" * len(values))
+
+    sql = (
+        "SELECT e.Id FROM Exercises e WHERE e.IsActive = 1"
+        f" AND (e.PrimaryMuscleGroupId IN ({marks(muscle)}) OR EXISTS ("
+        "   SELECT 1 FROM ExerciseSecondaryMuscles s"
+        f"  WHERE s.ExerciseId = e.Id AND s.MuscleGroupId IN ({marks(muscle)})))"
+        f" AND e.EquipmentTypeId IN ({marks(equipment)})"
+        f" AND e.DifficultyLevel IN ({marks(difficulty)})"
+        f" AND e.ExerciseType IN ({marks(exercise_type)})"
+        " ORDER BY e.Id"
+    )
+    params = [*muscle, *muscle, *equipment, *difficulty, *exercise_type]
+    return [row[0] for row in conn.execute(sql, params)]
+
+
+def run_benchmark(conn: sqlite3.Connection, index_path: Path, queries: int, seed: int = 7) -> bool:
+    rng = random.Random(seed)
+    workload = [
+        (
+            rng.sample(range(1, 9), rng.randint(1, 2)),
+            rng.sample(range(1, 9), rng.randint(1, 3)),
+            rng.sample(range(1, 5), rng.randint(1, 2)),
+            rng.sample(range(0, 8), rng.randint(1, 3)),
+        )
+        for _ in range(queries)
+    ]
+
+    start = time.perf_counter()
+    sql_results = [sql_select(conn, *q) for q in workload]
+    sql_elapsed = time.perf_counter() - start
+
+    index = ExerciseBitmapIndex.open(index_path)
+    try:
+        start = time.perf_counter()
+        bitmap_results = [
+            index.select(muscle=m, equipment=e, difficulty=d, exercise_type=t, include_secondary=True)
+            for m, e, d, t in workload
+        ]
+        bitmap_elapsed = time.perf_counter() - start
+    finally:
+        index.close()
+
+    matches = sql_results == bitmap_results
+    print(f"Queries: {queries}")
+    print(f"  SQL:    {sql_elapsed * 1000:9.1f} ms total, {sql_elapsed / queries * 1e6:8.1f} us/query")
+    print(f"  Bitmap: {bitmap_elapsed * 1000:9.1f} ms total, {bitmap_elapsed / queries * 1e6:8.1f} us/query")
+    if bitmap_elapsed > 0:
+        print(f"  Speed-up: {sql_elapsed / bitmap_elapsed:.1f}x")
+    print(f"  Results identical: {'yes' if matches else 'NO'}")
+    return matches
+
+
+# --------------------------------------------------------------------------- #
+# CLI
+# --------------------------------------------------------------------------- #
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Build a bitmap index of Exercises for candidate selection")
+    ap.add_argument("--db", default=str(DEFAULT_DB), help="SQLite database path")
+    ap.add_argument("--out", default=None, help=f"Output .bidx path (default: {DEFAULT_OUT.name}; "
+                                                 "a temp file with --synthetic)")
+    ap.add_argument("--benchmark", action="store_true", help="Compare bitmap queries against the equivalent SQL")
+    ap.add_argument("--synthetic", type=int, default=None, help="Benchmark on an in-memory catalog of N exercises")
+    ap.add_argument("--queries", type=int, default=2000, help="Number of random benchmark queries")
+    args = ap.parse_args()
+
+    if args.synthetic:
+        conn = sqlite3.connect(":memory:")
+        create_synthetic_db(conn, args.synthetic)
+    else:
+        if not Path(args.db).exists():
+            print(f"Database not found: {args.db}", file=sys.stderr)
+            return 1
+        conn = gymdb.open_connection(args.db, readonly=True)
+
+    # A synthetic catalog must not replace the real index
+    scratch = tempfile.TemporaryDirectory(prefix="bidx_") if args.synthetic and not args.out else None
+    if args.out:
+        out = Path(args.out)
+    elif scratch:
+        out = Path(scratch.name) / DEFAULT_OUT.name
+    else:
+        out = DEFAULT_OUT
+    try:
+        start = time.perf_counter()
+        ids, bitsets = load_bitsets(conn)
+        size = write_index(out, ids, bitsets)
+        elapsed = time.perf_counter() - start
+        print(f"Indexed {len(ids)} exercises into {len(bitsets)} bitsets ({size} bytes) in {elapsed * 1000:.1f} ms")
+        print(f"Index saved to {out}")
+
+        if args.benchmark:
+            return 0 if run_benchmark(conn, out, args.queries) else 1
+    finally:
+        conn.close()
+        if scratch:
+            scratch.cleanup()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
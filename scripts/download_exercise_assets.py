@@ -1,17 +1,27 @@
-﻿import csv
+﻿from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
 import json
+import os
 import re
 import sys
+import tempfile
+import threading
 import time
 import unicodedata
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
 from urllib.parse import urljoin, urlparse
 
-import requests
-from bs4 import BeautifulSoup
-from googletrans import Translator
-from requests.adapters import HTTPAdapter, Retry
+from instrumentation import add_profile_argument, count, profiling, span
+from translation_memory import PhraseMemory
+
+if TYPE_CHECKING:
+    import requests
+    from bs4 import BeautifulSoup
+    from googletrans import Translator
 
 BASE_URL = "https://liftmanual.com"
 MUSCLE_INDEX_URL = f"{BASE_URL}/muscle/"
@@ -19,6 +29,8 @@ PROJECT_ROOT = Path(__file__).resolve().parents[1]
 OUTPUT_ROOT = PROJECT_ROOT / "docs" / "ejercicios"
 METADATA_FILE = OUTPUT_ROOT / "metadata.csv"
 TRANSLATION_CACHE_FILE = OUTPUT_ROOT / "translations_cache.json"
+DOWNLOAD_MANIFEST_FILE = OUTPUT_ROOT / "downloads_manifest.json"
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
 
 USER_AGENT = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -26,18 +38,44 @@ USER_AGENT = (
     "Chrome/128.0.0.0 Safari/537.36"
 )
 
-session = requests.Session()
-retry_strategy = Retry(
-    total=5,
-    backoff_factor=1.0,
-    status_forcelist=[429, 500, 502, 503, 504],
-    allowed_methods=["GET"],
-)
-session.mount("https://", HTTPAdapter(max_retries=retry_strategy))
-session.headers.update({"User-Agent": USER_AGENT})
-
-translator = Translator()
+# requests, bs4 and googletrans are imported on first use so that importing this
+# module (for sanitize_for_fs, the tools CLI, benchmarks) stays cheap.
+_session: Optional[requests.Session] = None
+_translator: Optional[Translator] = None
 translation_cache: Dict[str, str] = {}
+# casefolded English name -> Spanish folder an earlier run saved it under
+folder_translations: Dict[str, str] = {}
+phrase_memory = PhraseMemory()
+# image url -> {"path": repo-relative path, "sha256": ..., "bytes": ...}
+download_manifest: Dict[str, Dict[str, object]] = {}
+
+
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        import requests
+        from requests.adapters import HTTPAdapter, Retry
+
+        retry_strategy = Retry(
+            total=5,
+            backoff_factor=1.0,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"],
+        )
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(max_retries=retry_strategy))
+        session.headers.update({"User-Agent": USER_AGENT})
+        _session = session
+    return _session
+
+
+def get_translator() -> Translator:
+    global _translator
+    if _translator is None:
+        from googletrans import Translator
+
+        _translator = Translator()
+    return _translator
 
 
 def load_translation_cache() -> None:
@@ -48,11 +86,43 @@ def load_translation_cache() -> None:
             print("Warning: translation cache file is corrupted, ignoring.", file=sys.stderr)
 
 
+# Image files are named after the page description, which starts with the English name
+GUIDE_FILENAME = re.compile(r"^Read our (?P<name>.+?) guide\b", re.IGNORECASE)
+
+
+def load_folder_translations() -> None:
+    """Remember the Spanish folder of every exercise already on disk.
+
+    Without translations_cache.json the phrase memory would name many of them
+    differently from the backend translation that created the folder, and a
+    re-scrape would download them again into new folders.
+    """
+    for image in sorted(OUTPUT_ROOT.glob("*/*/*")):
+        match = GUIDE_FILENAME.match(image.name)
+        if match and image.is_file():
+            folder_translations.setdefault(match.group("name").casefold(), image.parent.name)
+
+
 def save_translation_cache() -> None:
     TRANSLATION_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
     TRANSLATION_CACHE_FILE.write_text(json.dumps(translation_cache, ensure_ascii=False, indent=2), encoding="utf-8")
 
 
+def load_download_manifest() -> None:
+    if DOWNLOAD_MANIFEST_FILE.exists():
+        try:
+            download_manifest.update(json.loads(DOWNLOAD_MANIFEST_FILE.read_text(encoding="utf-8")))
+        except json.JSONDecodeError:
+            print("Warning: download manifest is corrupted, ignoring.", file=sys.stderr)
+
+
+def save_download_manifest() -> None:
+    DOWNLOAD_MANIFEST_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = DOWNLOAD_MANIFEST_FILE.with_name(DOWNLOAD_MANIFEST_FILE.name + ".tmp")
+    tmp.write_text(json.dumps(download_manifest, ensure_ascii=False, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, DOWNLOAD_MANIFEST_FILE)
+
+
 INVALID_FS_CHARS = re.compile(r"[<>:\"/\\|?*]")
 MULTIPLE_SPACES = re.compile(r"\s+")
 
@@ -78,10 +148,34 @@ def translate_text(text: str) -> str:
         return text
     cached = translation_cache.get(key)
     if cached:
+        count("translations_cached")
+        phrase_memory.note_cached()
+        return cached
+    existing = folder_translations.get(key.casefold())
+    if existing:
+        count("translations_from_folders")
+        phrase_memory.note_cached()
+        translation_cache[key] = existing
+        return existing
+    translated = phrase_memory.translate(key, translate_remote)
+    # Cached like remote results, so later runs (and folder names) stay stable
+    # even if the phrase tables change
+    translation_cache[key] = translated
+    return translated
+
+
+def translate_remote(text: str) -> str:
+    """Backend translation of a whole name or of the part the phrase memory lacks."""
+    key = text.strip()
+    cached = translation_cache.get(key)
+    if cached:
+        count("translations_cached")
         return cached
+    count("translations_remote")
     for attempt in range(3):
         try:
-            result = translator.translate(key, src="en", dest="es")
+            with span("translate_remote"):
+                result = get_translator().translate(key, src="en", dest="es")
             translated = result.text.strip()
             if translated:
                 translation_cache[key] = translated
@@ -95,9 +189,15 @@ def translate_text(text: str) -> str:
 
 
 def get_soup(url: str) -> BeautifulSoup:
-    response = session.get(url, timeout=30)
-    response.raise_for_status()
-    return BeautifulSoup(response.text, "html.parser")
+    from bs4 import BeautifulSoup
+
+    with span("http_get"):
+        response = get_session().get(url, timeout=30)
+        response.raise_for_status()
+    count("pages_fetched")
+    count("bytes_downloaded", len(response.content))
+    with span("html_parse"):
+        return BeautifulSoup(response.text, "html.parser")
 
 
 def collect_muscle_links() -> List[Tuple[str, str]]:
@@ -208,11 +308,125 @@ def pick_image_url(soup: BeautifulSoup) -> Optional[str]:
     return candidates[0][1]
 
 
-def download_file(url: str, dest: Path) -> None:
+class IncompleteDownload(IOError):
+    pass
+
+
+def file_digest(path: Path) -> Tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    with path.open("rb") as fh:
+        while True:
+            chunk = fh.read(DOWNLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def _stored_path(path: Path) -> str:
+    try:
+        return path.relative_to(PROJECT_ROOT).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def image_is_complete(path: Path) -> bool:
+    """True when the whole image decodes; a body cut short fails here."""
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(path) as im:
+            im.load()
+    except (UnidentifiedImageError, OSError, SyntaxError, ValueError):
+        return False
+    return True
+
+
+def remote_size(url: str) -> Optional[int]:
+    """Content-Length from a HEAD request, when the server gives an uncompressed one."""
+    try:
+        response = get_session().head(url, timeout=30, allow_redirects=True)
+        response.raise_for_status()
+    except Exception:
+        return None
+    if response.headers.get("Content-Length") and response.headers.get("Content-Encoding", "identity") == "identity":
+        return int(response.headers["Content-Length"])
+    return None
+
+
+def find_downloaded(url: str, candidate: Optional[Path] = None) -> Optional[Path]:
+    """Return an intact local copy of url, or None when it has to be downloaded.
+
+    A manifest entry must still match on size, sha256 and decode as an image.
+    Without one, `candidate` (where this run would save the file) is adopted
+    into the manifest if an earlier run left it there with the server's
+    Content-Length and it decodes.
+    """
+    entry = download_manifest.get(url)
+    if entry:
+        path = PROJECT_ROOT / str(entry["path"])
+        # Size first: a cheap stat rules out most truncated or replaced files
+        if not path.is_file() or path.stat().st_size != entry["bytes"]:
+            return None
+        with span("verify_existing"):
+            sha, _ = file_digest(path)
+            intact = sha == entry["sha256"] and image_is_complete(path)
+        return path if intact else None
+
+    if candidate is None or not candidate.is_file():
+        return None
+    expected = remote_size(url)
+    if expected is None or candidate.stat().st_size != expected:
+        return None
+    with span("verify_existing"):
+        if not image_is_complete(candidate):
+            return None
+        sha, size = file_digest(candidate)
+    download_manifest[url] = {"path": _stored_path(candidate), "sha256": sha, "bytes": size}
+    count("images_adopted")
+    return candidate
+
+
+def download_file(url: str, dest: Path) -> Tuple[str, int]:
+    """Stream url to dest through a temp file, hashing as it goes.
+
+    dest only appears once the body is complete (atomic rename), so an
+    interrupted or truncated transfer never leaves a file that looks done.
+    Returns (sha256, size) and records them in the download manifest.
+    """
     dest.parent.mkdir(parents=True, exist_ok=True)
-    response = session.get(url, timeout=60)
-    response.raise_for_status()
-    dest.write_bytes(response.content)
+    tmp = dest.with_name(dest.name + ".part")
+    digest = hashlib.sha256()
+    size = 0
+    with span("download_image"), get_session().get(url, timeout=60, stream=True) as response:
+        response.raise_for_status()
+        # Content-Length counts encoded bytes; only compare when the body is not compressed
+        expected = None
+        if response.headers.get("Content-Length") and response.headers.get("Content-Encoding", "identity") == "identity":
+            expected = int(response.headers["Content-Length"])
+        try:
+            with tmp.open("wb") as fh:
+                for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    fh.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+            if expected is not None and size != expected:
+                raise IncompleteDownload(f"received {size} of {expected} bytes")
+            # Without a Content-Length a dropped connection looks like a normal end
+            if not image_is_complete(tmp):
+                raise IncompleteDownload(f"{size} bytes received but the image does not decode")
+            os.replace(tmp, dest)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+    count("images_downloaded")
+    count("bytes_downloaded", size)
+
+    sha = digest.hexdigest()
+    download_manifest[url] = {"path": _stored_path(dest), "sha256": sha, "bytes": size}
+    return sha, size
 
 
 def ensure_unique_path(base_path: Path) -> Path:
@@ -238,11 +452,143 @@ def ensure_unique_filename(directory: Path, filename: str, extension: str) -> Pa
         counter += 1
 
 
-def main() -> None:
+# --------------------------------------------------------------------------- #
+# Self-check
+# --------------------------------------------------------------------------- #
+
+def _serve(files: Dict[str, bytes]):
+    """Serve `files` on localhost. /cut/<name> promises the full length but
+    sends half; /unsized/<name> sends half with no Content-Length."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_HEAD(self) -> None:
+            self._respond(body=False)
+
+        def do_GET(self) -> None:
+            self._respond(body=True)
+
+        def _respond(self, body: bool) -> None:
+            mode, _, name = self.path.strip("/").rpartition("/")
+            data = files.get(name)
+            if data is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            if mode != "unsized":
+                self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            if not body:
+                return
+            sent = data[:len(data) // 2] if mode in ("cut", "unsized") else data
+            for start in range(0, len(sent), 64 * 1024):
+                self.wfile.write(sent[start:start + 64 * 1024])
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def self_check() -> int:
+    import io
+    import random
+
+    from PIL import Image
+
+    def png(size: Tuple[int, int], noise: bool) -> bytes:
+        im = Image.new("RGB", size, (240, 240, 240))
+        if noise:
+            rng = random.Random(7)
+            im = Image.frombytes("RGB", size, bytes(rng.getrandbits(8) for _ in range(size[0] * size[1] * 3)))
+        buffer = io.BytesIO()
+        im.save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    files = {"small.png": png((160, 120), False), "large.png": png((1200, 1000), True)}
+    server = _serve(files)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    download_manifest.clear()
+    checks: List[Tuple[str, bool]] = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="downloads_") as tmp:
+            root = Path(tmp)
+
+            def leftovers() -> List[str]:
+                return sorted(path.name for path in root.rglob("*.part"))
+
+            small = root / "Pecho" / "small.png"
+            download_file(f"{base}/small.png", small)
+            checks.append(("small image downloaded intact", small.read_bytes() == files["small.png"]))
+
+            large = root / "Pecho" / "large.png"
+            sha, size = download_file(f"{base}/large.png", large)
+            checks.append((f"large body streamed ({size / 1024 / 1024:.1f} MB)",
+                           size == len(files["large.png"]) and sha == hashlib.sha256(files["large.png"]).hexdigest()))
+
+            for mode in ("cut", "unsized"):
+                dest = root / "Pecho" / f"{mode}.png"
+                try:
+                    download_file(f"{base}/{mode}/large.png", dest)
+                    failed = False
+                except Exception:
+                    failed = True
+                checks.append((f"{mode} body rejected, nothing left behind",
+                               failed and not dest.exists() and not leftovers()))
+
+            checks.append(("intact file skipped", find_downloaded(f"{base}/small.png") == small))
+            with large.open("r+b") as fh:
+                fh.truncate(size // 2)
+            checks.append(("truncated file not skipped", find_downloaded(f"{base}/large.png") is None))
+            download_file(f"{base}/large.png", large)
+            checks.append(("truncated file re-downloaded", large.read_bytes() == files["large.png"]))
+
+            download_manifest.clear()
+            checks.append(("unrecorded file adopted", find_downloaded(f"{base}/small.png", small) == small
+                           and f"{base}/small.png" in download_manifest))
+            small.write_bytes(files["small.png"][:-10])
+            download_manifest.clear()
+            checks.append(("unrecorded short file not adopted", find_downloaded(f"{base}/small.png", small) is None))
+            checks.append(("no .part files survive", not leftovers()))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    for name, ok in checks:
+        print(f"  {'ok  ' if ok else 'FAIL'} {name}")
+    return 0 if all(ok for _, ok in checks) else 1
+
+
+def main(argv: Optional[List[str]] = None, prog: Optional[str] = None) -> int:
+    ap = argparse.ArgumentParser(prog=prog, description="Download exercise images and descriptions from liftmanual.com")
+    ap.add_argument("--self-check", action="store_true",
+                    help="Download from a local server: truncated, large and already present files")
+    add_profile_argument(ap, "download_exercise_assets")
+    args = ap.parse_args(argv)
+
+    if args.self_check:
+        return self_check()
+
+    with profiling(args.profile, "download_exercise_assets"):
+        try:
+            scrape()
+        finally:
+            save_translation_cache()
+            save_download_manifest()
+    return 0
+
+
+def scrape() -> None:
     OUTPUT_ROOT.mkdir(parents=True, exist_ok=True)
     load_translation_cache()
+    load_folder_translations()
+    load_download_manifest()
 
-    muscle_links = collect_muscle_links()
+    with span("collect_muscles"):
+        muscle_links = collect_muscle_links()
     print(f"Found {len(muscle_links)} muscle groups")
 
     processed_slugs: set[str] = set()
@@ -254,7 +600,8 @@ def main() -> None:
         muscle_folder = OUTPUT_ROOT / muscle_folder_name
         muscle_folder.mkdir(parents=True, exist_ok=True)
 
-        exercises = collect_exercise_links(muscle_url)
+        with span("collect_exercises"):
+            exercises = collect_exercise_links(muscle_url)
         print(f"Processing {len(exercises)} exercises for {muscle_name_en} -> {muscle_name_es}")
 
         for exercise_name_en, exercise_url in exercises:
@@ -270,19 +617,34 @@ def main() -> None:
                 print(f"  Failed to fetch {exercise_url}: {exc}", file=sys.stderr)
                 continue
 
-            description = pick_description(soup) or "Sin descripción disponible"
-            image_url = pick_image_url(soup)
+            with span("extract"):
+                description = pick_description(soup) or "Sin descripción disponible"
+                image_url = pick_image_url(soup)
             if not image_url:
                 print(f"  No image found for {exercise_name_en}", file=sys.stderr)
                 continue
 
             exercise_name_es = translate_text(exercise_name_en)
             exercise_folder_name = sanitize_for_fs(exercise_name_es, allow_spaces=True)
-            exercise_folder = ensure_unique_path(muscle_folder / exercise_folder_name)
-            exercise_folder.mkdir(parents=True, exist_ok=True)
-
             desc_filename = sanitize_for_fs(description, allow_spaces=True, max_len=180)
             file_extension = Path(urlparse(image_url).path).suffix or ".jpg"
+            # Where this run would save it: an earlier run may have left it there
+            candidate = muscle_folder / exercise_folder_name / f"{desc_filename}{file_extension}"
+            existing = find_downloaded(image_url, candidate)
+            if existing:
+                count("images_skipped")
+                print(f"  Already downloaded {exercise_name_es} -> {existing.relative_to(PROJECT_ROOT)}")
+                records.append((
+                    muscle_name_es,
+                    exercise_name_es,
+                    exercise_name_en,
+                    description,
+                    str(existing.relative_to(PROJECT_ROOT))
+                ))
+                continue
+
+            exercise_folder = ensure_unique_path(muscle_folder / exercise_folder_name)
+            exercise_folder.mkdir(parents=True, exist_ok=True)
             image_path = ensure_unique_filename(exercise_folder, desc_filename, file_extension)
 
             try:
@@ -299,21 +661,20 @@ def main() -> None:
                 description,
                 str(image_path.relative_to(PROJECT_ROOT))
             ))
-            time.sleep(0.6)
+            with span("throttle_sleep"):
+                time.sleep(0.6)
 
     if records:
-        with METADATA_FILE.open("w", encoding="utf-8", newline="") as fh:
+        with span("write_metadata"), METADATA_FILE.open("w", encoding="utf-8", newline="") as fh:
             writer = csv.writer(fh)
             writer.writerow(["Grupo muscular (es)", "Ejercicio (es)", "Ejercicio (en)", "Descripción", "Ruta imagen"])
             writer.writerows(records)
         print(f"Metadata saved to {METADATA_FILE.relative_to(PROJECT_ROOT)}")
 
     save_translation_cache()
+    print(phrase_memory.report())
     print("Done")
 
 
 if __name__ == "__main__":
-    try:
-        main()
-    finally:
-        save_translation_cache()
+    raise SystemExit(main())
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Extract the embedded images (word/media/*) of the RUTINAS routine documents into a
+deduplicated, content-addressed store under src/app-ui/Images/AutoMap.
+
+Usage:
+  python scripts/extract_routine_images.py [--source RUTINAS] [--out src/app-ui/Images/AutoMap] [--verify]
+
+Notes:
+  - Members are streamed out of the docx/zip archives chunk by chunk; nothing is
+    unpacked to disk besides the image being copied.
+  - Each image is hashed (SHA-256) while it is copied and written once as
+    media/<hash>.<ext>, no matter how many client files embed it.
+  - manifest.json records which client file references which image, in
+    natural member-name order (image1, image2, ..., image10 as Word numbers
+    them), which is not necessarily the order they appear in the document.
+  - On later runs a member is not read again when the same archive had the same
+    member at the same position with the same CRC-32 and size, so regenerating
+    AutoMap is mostly metadata work. A CRC-32/size match from any other member
+    is only a hint: that member is hashed and reused only if the SHA-256 agrees.
+    Pass --verify to re-hash every member.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_SOURCE = PROJECT_ROOT / "RUTINAS"
+DEFAULT_OUT = PROJECT_ROOT / "src" / "app-ui" / "Images" / "AutoMap"
+
+MEDIA_DIR_NAME = "media"
+MANIFEST_NAME = "manifest.json"
+COPY_CHUNK_SIZE = 256 * 1024
+MEDIA_PREFIX = "word/media/"
+
+
+def client_slug(path: Path) -> str:
+    """Client folder name used by AutoMap, e.g. 'alex 2025.docx' -> 'alex_2025'."""
+    return re.sub(r"\s+", "_", path.stem.strip()).lower()
+
+
+def natural_key(name: str) -> List[object]:
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)]
+
+
+def iter_media_members(archive: zipfile.ZipFile) -> Iterator[Tuple[zipfile.ZipFile, zipfile.ZipInfo]]:
+    """Yield (archive, member) for every word/media entry, descending into wrapped .docx files."""
+    infos = archive.infolist()
+    media = [i for i in infos if i.filename.startswith(MEDIA_PREFIX) and not i.is_dir()]
+    if media:
+        for info in sorted(media, key=lambda i: natural_key(i.filename)):
+            yield archive, info
+        return
+    for info in infos:
+        if info.filename.lower().endswith(".docx"):
+            with archive.open(info) as member, zipfile.ZipFile(member) as inner:
+                yield from iter_media_members(inner)
+
+
+def stream_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo, media_dir: Path) -> Tuple[str, int, Path]:
+    """Copy one member into a temp file in media_dir, hashing on the fly."""
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_name = tempfile.mkstemp(dir=media_dir, prefix=".extract-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out, archive.open(info) as src:
+            while True:
+                chunk = src.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+    return digest.hexdigest(), size, Path(tmp_name)
+
+
+def hash_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> str:
+    digest = hashlib.sha256()
+    with archive.open(info) as src:
+        for chunk in iter(lambda: src.read(COPY_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(path: Path) -> Dict[str, dict]:
+    if path.exists():
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except json.JSONDecodeError:
+            print("Warning: manifest is corrupted, rebuilding from scratch.", file=sys.stderr)
+    return {"images": {}, "sources": {}}
+
+
+def save_manifest(path: Path, manifest: Dict[str, dict]) -> None:
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Extract deduplicated routine images into AutoMap")
+    ap.add_argument("--source", default=str(DEFAULT_SOURCE), help="Folder with .docx/.zip routines")
+    ap.add_argument("--out", default=str(DEFAULT_OUT), help="AutoMap output folder")
+    ap.add_argument("--verify", action="store_true", help="Re-hash every member instead of trusting CRC/size")
+    args = ap.parse_args()
+
+    source = Path(args.source)
+    if not source.is_dir():
+        print(f"Source folder not found: {source}", file=sys.stderr)
+        return 1
+
+    out_root = Path(args.out)
+    media_dir = out_root / MEDIA_DIR_NAME
+    media_dir.mkdir(parents=True, exist_ok=True)
+    for leftover in media_dir.glob(".extract-*.part"):
+        leftover.unlink()
+    manifest_path = out_root / MANIFEST_NAME
+    previous = load_manifest(manifest_path)
+
+    images: Dict[str, dict] = previous.get("images", {})
+    present = {digest for digest, meta in images.items() if (out_root / meta["path"]).exists()}
+    # (crc, size) -> hash: a hint only, CRC-32 collisions are easy to come by
+    known_members: Dict[Tuple[int, int], str] = {
+        (images[digest]["crc"], images[digest]["bytes"]): digest for digest in present
+    }
+    # (archive, order, member, crc, size) -> hash: the same member seen in the same place last run
+    trusted: Dict[Tuple[str, int, str, int, int], str] = {
+        (name, ref["order"], ref["member"], images[ref["sha256"]]["crc"], images[ref["sha256"]]["bytes"]): ref["sha256"]
+        for name, entry in previous.get("sources", {}).items()
+        for ref in entry["images"]
+        if ref["sha256"] in present
+    }
+
+    sources: Dict[str, dict] = {}
+    written = reused = confirmed = streamed = 0
+
+    archives = sorted(p for p in source.iterdir() if p.is_file() and p.suffix.lower() in (".docx", ".zip"))
+    for archive_path in archives:
+        refs: List[dict] = []
+        try:
+            with zipfile.ZipFile(archive_path) as archive:
+                for owner, info in iter_media_members(archive):
+                    key = (info.CRC, info.file_size)
+                    digest = None
+                    if not args.verify:
+                        digest = trusted.get((archive_path.name, len(refs) + 1, info.filename, *key))
+                        if digest:
+                            reused += 1
+                        elif key in known_members and hash_member(owner, info) == known_members[key]:
+                            digest = known_members[key]
+                            confirmed += 1
+                    if not digest:
+                        digest, size, tmp_path = stream_member(owner, info, media_dir)
+                        streamed += 1
+                        ext = Path(info.filename).suffix.lower()
+                        final_rel = f"{MEDIA_DIR_NAME}/{digest}{ext}"
+                        final_path = out_root / final_rel
+                        if final_path.exists():
+                            tmp_path.unlink()
+                        else:
+                            os.replace(tmp_path, final_path)
+                            written += 1
+                        images[digest] = {"path": final_rel, "bytes": size, "crc": info.CRC}
+                        known_members[key] = digest
+                    refs.append({"member": info.filename, "sha256": digest, "order": len(refs) + 1})
+        except zipfile.BadZipFile as exc:
+            print(f"  Failed to read {archive_path.name}: {exc}", file=sys.stderr)
+            # Keep the previous references so their images are not pruned below
+            if archive_path.name in previous.get("sources", {}):
+                sources[archive_path.name] = previous["sources"][archive_path.name]
+            continue
+        sources[archive_path.name] = {"client": client_slug(archive_path), "images": refs}
+
+    # Drop images no source references anymore
+    referenced = {ref["sha256"] for entry in sources.values() for ref in entry["images"]}
+    removed = 0
+    for digest in sorted(set(images) - referenced):
+        stale = out_root / images.pop(digest)["path"]
+        if stale.exists():
+            stale.unlink()
+            removed += 1
+
+    save_manifest(manifest_path, {
+        "generated_at": datetime.now().isoformat(),
+        "images": dict(sorted(images.items())),
+        "sources": sources,
+    })
+
+    total_refs = sum(len(entry["images"]) for entry in sources.values())
+    print(
+        f"Processed {len(sources)} archives: {total_refs} image references, {len(images)} unique images "
+        f"({written} written, {streamed} streamed, {reused} reused from manifest, "
+        f"{confirmed} matched by hash, {removed} removed)"
+    )
+    print(f"Manifest saved to {manifest_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,7 +4,7 @@ Auto-crop a transparent PNG to its non-transparent content, add padding,
 fit to a square, and export a 32x32 ICO (or PNG).
 
 Usage:
-  python scripts/fit_icon.py --source icon_transparent.png --out gym_icon.ico --size 32 --padding 8
+  python scripts/fit_icon.py --source icon_transparent.png --out gym_icon.ico --size 32 --padding 8 [--profile]
 """
 from __future__ import annotations
 
@@ -12,6 +12,8 @@ import argparse
 from pathlib import Path
 from PIL import Image
 
+from instrumentation import add_profile_argument, count, profiling, span
+
 
 def autocrop_to_content(im: Image.Image, alpha_threshold: int = 1) -> Image.Image:
     rgba = im.convert("RGBA")
@@ -28,6 +30,7 @@ def normalize_transparent_pixels(im: Image.Image) -> Image.Image:
     rgba = im.convert("RGBA")
     px = rgba.load()
     w, h = rgba.size
+    count("pixels_processed", w * h)
     for y in range(h):
         for x in range(w):
             r, g, b, a = px[x, y]
@@ -77,23 +80,31 @@ def fit_square_with_padding(
         return normalize_transparent_pixels(canvas)
 
 
-def main() -> int:
-    ap = argparse.ArgumentParser(description="Crop transparent PNG and fit to square with padding")
+def main(argv: list[str] | None = None, prog: str | None = None) -> int:
+    ap = argparse.ArgumentParser(prog=prog, description="Crop transparent PNG and fit to square with padding")
     ap.add_argument("--source", required=True, help="Input transparent PNG")
     ap.add_argument("--out", required=True, help="Output path (.ico or .png)")
     ap.add_argument("--size", type=int, default=32, help="Output size (square)")
     ap.add_argument("--padding", type=float, default=8.0, help="Padding percent relative to content's max side (negative overscales)")
     ap.add_argument("--edge-margin", type=int, default=None, help="Exact margin in pixels on each edge in the final size; overrides padding if set")
-    args = ap.parse_args()
+    add_profile_argument(ap, "fit_icon")
+    args = ap.parse_args(argv)
+
+    with profiling(args.profile, "fit_icon"):
+        return run(args)
 
+
+def run(args: argparse.Namespace) -> int:
     src = Path(args.source)
     out = Path(args.out)
     if not src.exists():
         print(f"Source not found: {src}")
         return 1
 
-    im = Image.open(src).convert("RGBA")
-    tight = autocrop_to_content(im)
+    with span("load"):
+        im = Image.open(src).convert("RGBA")
+    with span("autocrop"):
+        tight = autocrop_to_content(im)
 
     if args.edge_margin is not None:
         # Compute scale so that max(content) becomes (size - 2*margin)
@@ -106,20 +117,25 @@ def main() -> int:
         scale = usable / float(side if side else 1)
         new_w = max(1, int(round(cw * scale)))
         new_h = max(1, int(round(ch * scale)))
-        scaled = tight.resize((new_w, new_h), Image.LANCZOS)
-        canvas = Image.new("RGBA", (target_side, target_side), (255, 255, 255, 0))
-        x = (target_side - new_w) // 2
-        y = (target_side - new_h) // 2
-        canvas.paste(scaled, (x, y), scaled)
-        final = normalize_transparent_pixels(canvas)
-    else:
-        fitted = fit_square_with_padding(tight, padding_percent=args.padding)
-        final = fitted.resize((args.size, args.size), Image.LANCZOS)
-
-    if out.suffix.lower() == ".ico":
-        final.save(out, format="ICO", sizes=[(args.size, args.size)])
+        with span("resize"):
+            scaled = tight.resize((new_w, new_h), Image.LANCZOS)
+        with span("compose"):
+            canvas = Image.new("RGBA", (target_side, target_side), (255, 255, 255, 0))
+            x = (target_side - new_w) // 2
+            y = (target_side - new_h) // 2
+            canvas.paste(scaled, (x, y), scaled)
+            final = normalize_transparent_pixels(canvas)
     else:
-        final.save(out, format="PNG")
+        with span("compose"):
+            fitted = fit_square_with_padding(tight, padding_percent=args.padding)
+        with span("resize"):
+            final = fitted.resize((args.size, args.size), Image.LANCZOS)
+
+    with span("save"):
+        if out.suffix.lower() == ".ico":
+            final.save(out, format="ICO", sizes=[(args.size, args.size)])
+        else:
+            final.save(out, format="PNG")
 
     print(f"Saved: {out} size={args.size} padding={args.padding}%")
     return 0
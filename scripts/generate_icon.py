@@ -3,7 +3,7 @@
 Generate a valid Windows .ico file containing multiple sizes from a source image.
 
 Usage:
-  python scripts/generate_icon.py --source <path-to-image> --out <path-to-ico>
+  python scripts/generate_icon.py --source <path-to-image> --out <path-to-ico> [--profile]
 
 Defaults:
   --source: tries to auto-detect a PNG in CWD with 'icon' in the name, else first PNG
@@ -21,6 +21,8 @@ except Exception as exc:  # pragma: no cover
     print("Pillow is required: pip install pillow", file=sys.stderr)
     raise
 
+from instrumentation import add_profile_argument, count, profiling, span
+
 
 DEFAULT_SIZES = [16, 24, 32, 48, 64, 128, 256]
 
@@ -30,13 +32,19 @@ def auto_find_source(cwd: Path) -> Path | None:
     return candidates[0] if candidates else None
 
 
-def main() -> int:
-    parser = argparse.ArgumentParser(description="Generate multi-size .ico from an image")
+def main(argv: list[str] | None = None, prog: str | None = None) -> int:
+    parser = argparse.ArgumentParser(prog=prog, description="Generate multi-size .ico from an image")
     parser.add_argument("--source", type=str, default=None, help="Source image (PNG preferred)")
     parser.add_argument("--out", type=str, default="gym_icon.ico", help="Output .ico path")
     parser.add_argument("--sizes", type=str, default=None, help="Comma-separated sizes, e.g. 16,32,48,256")
-    args = parser.parse_args()
+    add_profile_argument(parser, "generate_icon")
+    args = parser.parse_args(argv)
+
+    with profiling(args.profile, "generate_icon"):
+        return run(args)
+
 
+def run(args: argparse.Namespace) -> int:
     cwd = Path.cwd()
     out_path = Path(args.out)
 
@@ -56,14 +64,17 @@ def main() -> int:
     try:
         with Image.open(source) as im:
             # Convert to RGBA to ensure proper alpha handling
-            im = im.convert("RGBA")
+            with span("load"):
+                im = im.convert("RGBA")
+            count("pixels_processed", im.width * im.height)
 
             # Save ICO with provided sizes; Pillow will generate each size from the source
-            im.save(
-                out_path,
-                format="ICO",
-                sizes=[(sz, sz) for sz in sizes],
-            )
+            with span("save_ico", sizes=len(sizes)):
+                im.save(
+                    out_path,
+                    format="ICO",
+                    sizes=[(sz, sz) for sz in sizes],
+                )
 
         print(f"Wrote icon: {out_path} with sizes: {sizes}")
         return 0
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Shared SQLite access for the Python tools: WAL mode, tuned pragmas, a busy
+timeout, per-connection statement caches and a small connection pool.
+
+Usage in a tool:
+  import gymdb
+
+  with gymdb.connection() as conn:                 # pooled, read-write
+      conn.execute("SELECT COUNT(*) FROM Exercises").fetchone()
+  with gymdb.transaction(db_path) as conn:        # BEGIN IMMEDIATE ... COMMIT
+      conn.executemany("INSERT ...", rows)
+  conn = gymdb.open_connection(db_path)            # one tuned, unpooled connection
+
+  python scripts/gymdb.py --concurrency-check [--readers 4] [--seconds 3]
+
+Notes:
+  - The DB path defaults to $GYMDB_PATH, else gymroutine.db in the current
+    directory (what backup_and_recreate_db.py has always used).
+  - WAL lets the app keep reading while a tool writes, and vice versa; only two
+    writers wait on each other, for up to BUSY_TIMEOUT_MS instead of failing
+    with "database is locked". journal_mode=WAL is stored in the file, so the
+    app opens it in WAL mode too. Copying or moving the DB must include the
+    -wal/-shm files, or happen after close_all() has checkpointed them away.
+  - Writers should use transaction(), which takes the write lock up front
+    (BEGIN IMMEDIATE); a deferred transaction that upgrades from read to write
+    can fail with SQLITE_BUSY without waiting.
+  - Pooled connections keep sqlite3's statement cache (STATEMENT_CACHE entries)
+    alive between calls, so repeated statements are not re-prepared.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import os
+import queue
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DB_PATH_ENV = "GYMDB_PATH"
+DEFAULT_DB_NAME = "gymroutine.db"
+
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE = 256
+POOL_SIZE = 4
+PRAGMAS = (
+    ("synchronous", "NORMAL"),  # durable at checkpoints; safe with WAL
+    ("temp_store", "MEMORY"),
+    ("cache_size", -16000),  # KiB
+    ("mmap_size", 64 * 1024 * 1024),
+)
+
+
+def default_db_path(fallback: Optional[Path | str] = None) -> Path:
+    env = os.environ.get(DB_PATH_ENV)
+    if env:
+        return Path(env)
+    return Path(fallback) if fallback is not None else Path(DEFAULT_DB_NAME)
+
+
+def open_connection(path: Optional[Path | str] = None, readonly: bool = False) -> sqlite3.Connection:
+    """Open one tuned connection. Read-only connections never create the file."""
+    db_path = Path(path) if path is not None else default_db_path()
+    if readonly:
+        conn = sqlite3.connect(
+            f"{db_path.resolve().as_uri()}?mode=ro",
+            uri=True,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            cached_statements=STATEMENT_CACHE,
+            check_same_thread=False,
+        )
+    else:
+        conn = sqlite3.connect(
+            str(db_path),
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            cached_statements=STATEMENT_CACHE,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+class ConnectionPool:
+    """Up to `size` connections to one file, handed out one thread at a time."""
+
+    def __init__(self, path: Path | str, size: int = POOL_SIZE, readonly: bool = False):
+        self.path = Path(path)
+        self.size = size
+        self.readonly = readonly
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._all: List[sqlite3.Connection] = []
+
+    def acquire(self, timeout: Optional[float] = None) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                conn = open_connection(self.path, self.readonly)
+                self._all.append(conn)
+                return conn
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No free connection to {self.path} after {timeout}s") from None
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextlib.contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[sqlite3.Connection]:
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    @contextlib.contextmanager
+    def transaction(self, timeout: Optional[float] = None) -> Iterator[sqlite3.Connection]:
+        with self.connection(timeout) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all.clear()
+            self._opened = 0
+            self._idle = queue.LifoQueue()
+
+
+_pools: Dict[Tuple[str, bool], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path: Optional[Path | str] = None, readonly: bool = False) -> ConnectionPool:
+    db_path = Path(path) if path is not None else default_db_path()
+    key = (str(db_path.resolve()), readonly)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(db_path, readonly=readonly)
+        return pool
+
+
+def connection(path: Optional[Path | str] = None, readonly: bool = False):
+    return get_pool(path, readonly).connection()
+
+
+def transaction(path: Optional[Path | str] = None):
+    return get_pool(path).transaction()
+
+
+def close_all(path: Optional[Path | str] = None) -> None:
+    """Close pooled connections (of one file, or all). Needed before moving a DB."""
+    with _pools_lock:
+        wanted = str(Path(path).resolve()) if path is not None else None
+        # Read-only pools first: only a read-write connection closing last can
+        # checkpoint and remove the -wal/-shm files
+        for key in sorted(_pools, key=lambda item: not item[1]):
+            if wanted is None or key[0] == wanted:
+                _pools.pop(key).close()
+
+
+# --------------------------------------------------------------------------- #
+# Concurrency check
+# --------------------------------------------------------------------------- #
+
+def run_concurrency_check(readers: int, seconds: float, journal_mode: str) -> Dict[str, object]:
+    """One writer inserting in small transactions while `readers` threads query."""
+    with tempfile.TemporaryDirectory(prefix="gymdb_check_") as tmp:
+        db_path = Path(tmp) / "check.db"
+        setup = sqlite3.connect(db_path)
+        setup.execute(f"PRAGMA journal_mode = {journal_mode}")
+        setup.execute("CREATE TABLE Rows (Id INTEGER PRIMARY KEY, Batch INTEGER NOT NULL, Payload TEXT NOT NULL)")
+        setup.commit()
+        setup.close()
+
+        pool = ConnectionPool(db_path, size=1)
+        read_pool = ConnectionPool(db_path, size=readers, readonly=True)
+        if journal_mode.upper() != "WAL":
+            # open_connection() switches writers to WAL; undo it for the comparison run
+            with pool.connection() as conn:
+                conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+
+        stop = threading.Event()
+        errors: List[str] = []
+        written = [0]
+        reads = [0] * readers
+        worst_read = [0.0] * readers
+        regressions = [0] * readers
+
+        def writer() -> None:
+            batch = 0
+            while not stop.is_set():
+                try:
+                    with pool.transaction() as conn:
+                        conn.executemany(
+                            "INSERT INTO Rows (Batch, Payload) VALUES (?, ?)",
+                            [(batch, "x" * 200)] * 50,
+                        )
+                    written[0] += 50
+                    batch += 1
+                except sqlite3.Error as exc:
+                    errors.append(f"writer: {exc}")
+
+        def reader(slot: int) -> None:
+            last = 0
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    with read_pool.connection() as conn:
+                        total, batches = conn.execute(
+                            "SELECT COUNT(*), COUNT(DISTINCT Batch) FROM Rows"
+                        ).fetchone()
+                except sqlite3.Error as exc:
+                    errors.append(f"reader {slot}: {exc}")
+                    continue
+                worst_read[slot] = max(worst_read[slot], time.perf_counter() - start)
+                reads[slot] += 1
+                # Every committed batch holds exactly 50 rows; a torn read would break that
+                if total < last or total != batches * 50:
+                    regressions[slot] += 1
+                last = total
+
+        threads = [threading.Thread(target=writer)]
+        threads += [threading.Thread(target=reader, args=(slot,)) for slot in range(readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        with pool.connection() as conn:
+            final = conn.execute("SELECT COUNT(*) FROM Rows").fetchone()[0]
+        pool.close()
+        read_pool.close()
+
+    return {
+        "journal_mode": journal_mode,
+        "rows_written": written[0],
+        "rows_final": final,
+        "reads": sum(reads),
+        "worst_read_ms": max(worst_read) * 1000,
+        "inconsistent_reads": sum(regressions),
+        "errors": errors,
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Shared SQLite access layer for the tools")
+    ap.add_argument("--concurrency-check", action="store_true",
+                    help="Run one writer against several readers on a temporary DB")
+    ap.add_argument("--readers", type=int, default=4, help="Reader threads for --concurrency-check")
+    ap.add_argument("--seconds", type=float, default=3.0, help="Duration of each --concurrency-check run")
+    args = ap.parse_args()
+
+    if not args.concurrency_check:
+        ap.print_help()
+        return 0
+
+    ok = True
+    for mode in ("WAL", "DELETE"):
+        result = run_concurrency_check(args.readers, args.seconds, mode)
+        print(
+            f"{mode:<6} writer rows {result['rows_written']:>8} (final {result['rows_final']:>8}) | "
+            f"reads {result['reads']:>7} | worst read {result['worst_read_ms']:8.1f} ms | "
+            f"inconsistent {result['inconsistent_reads']} | errors {len(result['errors'])}"
+        )
+        for error in result["errors"][:5]:
+            print(f"    {error}", file=sys.stderr)
+        if mode == "WAL":
+            ok = (
+                not result["errors"]
+                and result["inconsistent_reads"] == 0
+                and result["rows_final"] == result["rows_written"]
+            )
+    print("WAL check passed" if ok else "WAL check FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
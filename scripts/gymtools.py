@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+One entry point for the Python tools. Subcommands import their tool (and its
+heavy dependencies: Pillow, requests, bs4, googletrans) only when they run.
+
+Usage:
+  python scripts/gymtools.py --help
+  python scripts/gymtools.py scrape [--profile]
+  python scripts/gymtools.py bg-remove --source in.png --out out.png [--tolerance 28] [--feather 12]
+  python scripts/gymtools.py fit-icon --source in.png --out out.png --size 512 [--padding 6]
+  python scripts/gymtools.py gen-icon --source in.png --out gym_icon.ico [--sizes 16,32,256]
+  python scripts/gymtools.py backup                       # gymroutine.db -> data_backup.json
+  python scripts/gymtools.py restore [--backup data_backup.json]
+  python scripts/gymtools.py verify
+  python scripts/gymtools.py snapshot create|list|restore [--dir backups] [--upto SEQ]
+  python scripts/gymtools.py --import-report <command> ...
+
+Notes:
+  - `<command> --help` shows that tool's own options; the tools keep working as
+    standalone scripts with the same arguments.
+  - The DB commands use --db, else $GYMDB_PATH, else gymroutine.db in the current
+    directory, like backup_and_recreate_db.py (which still performs backup +
+    recreate + restore + verify in one go).
+  - --import-report prints, to stderr, how long startup and the command's import
+    took and which heavy modules ended up loaded. For a per-module breakdown use
+    `python -X importtime scripts/gymtools.py ...`.
+"""
+from __future__ import annotations
+
+import time
+
+_STARTED = time.perf_counter()
+
+import sys  # noqa: E402
+from pathlib import Path  # noqa: E402
+
+_MODULES_AT_START = len(sys.modules)
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPTS_DIR.parent
+
+HEAVY_MODULES = ("PIL", "requests", "bs4", "googletrans", "sqlite3", "cProfile")
+
+# name -> (module, help). Tool modules expose main(argv, prog).
+TOOL_COMMANDS = {
+    "scrape": ("download_exercise_assets", "Download exercise images and descriptions from liftmanual.com"),
+    "bg-remove": ("remove_bg_transparent", "Remove a uniform background to transparency"),
+    "fit-icon": ("fit_icon", "Crop a transparent PNG and fit it to a padded square"),
+    "gen-icon": ("generate_icon", "Generate a multi-size .ico from an image"),
+    "snapshot": ("backup_snapshots", "Differential compressed backups: create, list, restore"),
+}
+DB_COMMANDS = {
+    "backup": "Back up exercises, muscle groups and equipment to data_backup.json",
+    "restore": "Recreate gymroutine.db and load a data_backup.json into it",
+    "verify": "Check the schema and row counts of gymroutine.db",
+}
+
+
+class ImportReport:
+    def __init__(self) -> None:
+        self.command = ""
+        self.import_seconds = 0.0
+        self.dispatch_at = 0.0
+
+    def print(self, stream=sys.stderr) -> None:
+        now = time.perf_counter()
+        loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+        print("\n--- import report ---", file=stream)
+        print(f"command                   {self.command or '(none)'}", file=stream)
+        if self.dispatch_at:
+            print(f"startup to dispatch       {(self.dispatch_at - _STARTED) * 1000:8.1f} ms", file=stream)
+        print(f"command import            {self.import_seconds * 1000:8.1f} ms", file=stream)
+        print(f"total (after interpreter) {(now - _STARTED) * 1000:8.1f} ms", file=stream)
+        print(f"modules imported          {len(sys.modules) - _MODULES_AT_START:8d}", file=stream)
+        print(f"heavy modules loaded      {', '.join(loaded) or 'none'}", file=stream)
+
+
+REPORT = ImportReport()
+
+
+def _import(module: str):
+    import importlib
+
+    start = time.perf_counter()
+    try:
+        return importlib.import_module(module)
+    finally:
+        REPORT.import_seconds += time.perf_counter() - start
+
+
+# --------------------------------------------------------------------------- #
+# DB commands
+# --------------------------------------------------------------------------- #
+
+def _db_module():
+    if str(PROJECT_ROOT) not in sys.path:
+        sys.path.insert(0, str(PROJECT_ROOT))
+    return _import("backup_and_recreate_db")
+
+
+def _db_parser(command: str, prog: str):
+    import argparse
+
+    from instrumentation import add_profile_argument
+
+    parser = argparse.ArgumentParser(prog=prog, description=DB_COMMANDS[command])
+    parser.add_argument("--db", default=None, help="Database path (default: $GYMDB_PATH or gymroutine.db)")
+    if command == "restore":
+        parser.add_argument("--backup", default="data_backup.json", help="Backup JSON written by `backup`")
+    add_profile_argument(parser, f"gymtools_{command}")
+    return parser
+
+
+def run_db_command(command: str, argv: list, prog: str) -> int:
+    import gymdb
+    from instrumentation import profiling
+
+    args = _db_parser(command, prog).parse_args(argv)
+    db = _db_module()
+    REPORT.dispatch_at = time.perf_counter()
+
+    try:
+        with profiling(args.profile, f"gymtools_{command}"):
+            return _run_db_steps(db, command, args)
+    finally:
+        gymdb.close_all()
+
+
+def _run_db_steps(db, command: str, args) -> int:
+    if command == "backup":
+        db.backup_existing_data(args.db)
+        return 0
+    if command == "verify":
+        import gymdb
+
+        db_path = Path(args.db) if args.db else gymdb.default_db_path()
+        if not db_path.is_file():
+            print(f"Database not found: {db_path}", file=sys.stderr)
+            return 1
+        return 0 if db.verify_new_database(db_path) else 1
+
+    import json
+
+    backup_path = Path(args.backup)
+    if not backup_path.is_file():
+        print(f"Backup not found: {backup_path}", file=sys.stderr)
+        return 1
+    backup_data = json.loads(backup_path.read_text(encoding="utf-8"))
+    for key in ("exercises", "muscle_groups", "equipment_types"):
+        backup_data.setdefault(key, [])
+    db.create_fresh_database(args.db)
+    db.populate_basic_data(backup_data, args.db)
+    return 0
+
+
+# --------------------------------------------------------------------------- #
+# CLI
+# --------------------------------------------------------------------------- #
+
+def build_parser():
+    import argparse
+
+    lines = ["commands:"]
+    for name, (_, help_text) in TOOL_COMMANDS.items():
+        lines.append(f"  {name:<12} {help_text}")
+    for name, help_text in DB_COMMANDS.items():
+        lines.append(f"  {name:<12} {help_text}")
+    lines.append("\nRun `gymtools.py <command> --help` for the options of a command.")
+
+    parser = argparse.ArgumentParser(
+        prog="gymtools.py",
+        description="Gym routine maintenance tools",
+        epilog="\n".join(lines),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--import-report", action="store_true",
+                        help="Print startup/import timings and loaded heavy modules to stderr")
+    parser.add_argument("command", choices=[*TOOL_COMMANDS, *DB_COMMANDS], metavar="command")
+    return parser
+
+
+def split_argv(argv: list) -> tuple:
+    """Split at the first command name: global options before it, the command's own after."""
+    for index, token in enumerate(argv):
+        if token in TOOL_COMMANDS or token in DB_COMMANDS:
+            return argv[:index + 1], argv[index + 1:]
+    return argv, []
+
+
+def main(argv: list | None = None) -> int:
+    global_argv, command_argv = split_argv(list(sys.argv[1:] if argv is None else argv))
+    report = "--import-report" in global_argv
+    try:
+        args = build_parser().parse_args(global_argv)
+        REPORT.command = args.command
+        prog = f"gymtools.py {args.command}"
+
+        if args.command in DB_COMMANDS:
+            return run_db_command(args.command, command_argv, prog)
+
+        module = _import(TOOL_COMMANDS[args.command][0])
+        REPORT.dispatch_at = time.perf_counter()
+        return module.main(command_argv, prog=prog) or 0
+    finally:
+        if report:
+            REPORT.print()
+
+
+if __name__ == "__main__":
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS_DIR))
+    raise SystemExit(main())
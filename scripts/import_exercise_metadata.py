@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Bulk upsert the scraper output docs/ejercicios/metadata.csv into the Exercises and
+ExerciseImages tables of gymroutine.db.
+
+Usage:
+  python scripts/import_exercise_metadata.py [--csv docs/ejercicios/metadata.csv] [--db gymroutine.db] [--dry-run]
+
+Notes:
+  - The CSV is streamed row by row. Rows are matched to existing exercises by
+    normalized name (accents, case and spacing ignored; English name first, then
+    Spanish) through an in-memory hash index built with a single SELECT.
+  - Only rows whose name, description or muscle group actually changed are
+    updated, and only image paths the exercise does not have yet are inserted,
+    so re-importing an unchanged catalog writes nothing.
+  - All writes happen inside one transaction. New exercises and muscle groups
+    are inserted as they are met so SQLite assigns their Id (AUTOINCREMENT, never
+    reusing the Id of a deleted row); updates and images go through executemany.
+  - Rows without a muscle group or without an English name never create an
+    exercise (they are counted as skipped). For an existing exercise the missing
+    value is left as it is: Spanish is never written into Name, and an empty or
+    "Sin descripción disponible" description keeps the current one.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import re
+import sqlite3
+import sys
+import time
+import unicodedata
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import gymdb
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_CSV = PROJECT_ROOT / "docs" / "ejercicios" / "metadata.csv"
+DEFAULT_DB = gymdb.default_db_path(PROJECT_ROOT / "gymroutine.db")
+
+# Spanish muscle folders written by download_exercise_assets.py -> MuscleGroups.SpanishName
+MUSCLE_ALIASES = {
+    "abdominales": "abdomen",
+    "antebrazos": "brazos",
+    "biceps": "brazos",
+    "triceps": "brazos",
+    "cuadriceps": "piernas",
+    "muslos": "piernas",
+    "isquiotibiales": "piernas",
+    "gemelos": "pantorrillas",
+}
+
+# Written by download_exercise_assets.py when a page has no description
+PLACEHOLDER_DESCRIPTION = "Sin descripción disponible"
+
+# Keyword in the English name -> EquipmentTypes.Name
+EQUIPMENT_KEYWORDS = (
+    ("dumbbell", "Dumbbells"),
+    ("barbell", "Barbell"),
+    ("ez bar", "Barbell"),
+    ("band", "Resistance Bands"),
+    ("cable", "Cable Machine"),
+    ("kettlebell", "Kettlebell"),
+    ("medicine ball", "Medicine Ball"),
+    ("lever", "Machine"),
+    ("smith", "Machine"),
+    ("sled", "Machine"),
+    ("machine", "Machine"),
+)
+DEFAULT_EQUIPMENT = "Bodyweight"
+
+# ExerciseType enum values (src/app-ui/Enums/ExerciseType.cs)
+STRENGTH, CARDIO, FLEXIBILITY = 0, 1, 2
+DEFAULT_DIFFICULTY = 1  # DifficultyLevel.Beginner
+
+BATCH_SIZE = 1000
+
+
+def normalize_name(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return re.sub(r"\s+", " ", stripped).strip().lower()
+
+
+def exercise_type_for(muscle_es: str, name_en: str) -> int:
+    muscle = normalize_name(muscle_es)
+    name = normalize_name(name_en)
+    if muscle == "cardio":
+        return CARDIO
+    if muscle == "yoga" or "stretch" in name or "pose" in name:
+        return FLEXIBILITY
+    return STRENGTH
+
+
+class CatalogIndex:
+    """Normalized-name hash indexes over the rows the importer needs to look up."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(Exercises)")}
+        self.has_updated_at = "UpdatedAt" in columns
+
+        self.exercises: Dict[str, int] = {}
+        self.current: Dict[int, Tuple[str, str, str, int]] = {}
+        for ex_id, name, spanish, description, muscle_id in conn.execute(
+            "SELECT Id, Name, SpanishName, Description, PrimaryMuscleGroupId FROM Exercises"
+        ):
+            self.current[ex_id] = (name or "", spanish or "", description or "", muscle_id)
+            for key in (normalize_name(name), normalize_name(spanish)):
+                if key:
+                    self.exercises.setdefault(key, ex_id)
+
+        self.muscles: Dict[str, int] = {}
+        for mg_id, name, spanish in conn.execute("SELECT Id, Name, SpanishName FROM MuscleGroups"):
+            for key in (normalize_name(name), normalize_name(spanish)):
+                if key:
+                    self.muscles.setdefault(key, mg_id)
+
+        self.equipment: Dict[str, int] = {
+            normalize_name(name): et_id for et_id, name in conn.execute("SELECT Id, Name FROM EquipmentTypes")
+        }
+
+        self.images: set[Tuple[int, str]] = set()
+        self.with_primary: set[int] = set()
+        for ex_id, path, is_primary in conn.execute("SELECT ExerciseId, ImagePath, IsPrimary FROM ExerciseImages"):
+            self.images.add((ex_id, path or ""))
+            if is_primary:
+                self.with_primary.add(ex_id)
+
+
+    def find_exercise(self, name_en: str, name_es: str) -> Optional[int]:
+        return self.exercises.get(normalize_name(name_en)) or self.exercises.get(normalize_name(name_es))
+
+    def equipment_for(self, name_en: str) -> int:
+        name = normalize_name(name_en)
+        for keyword, equipment in EQUIPMENT_KEYWORDS:
+            if keyword in name and normalize_name(equipment) in self.equipment:
+                return self.equipment[normalize_name(equipment)]
+        return self.equipment.get(normalize_name(DEFAULT_EQUIPMENT), 1)
+
+
+class MetadataImporter:
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.index = CatalogIndex(conn)
+        self.now = datetime.now().isoformat()
+        self.updates: List[tuple] = []
+        self.images: List[tuple] = []
+        self.stats = {"rows": 0, "inserted": 0, "updated": 0, "unchanged": 0, "images": 0, "skipped": 0}
+
+    def muscle_id(self, muscle_es: str) -> int:
+        key = normalize_name(muscle_es)
+        key = MUSCLE_ALIASES.get(key, key)
+        found = self.index.muscles.get(key)
+        if found is not None:
+            return found
+        mg_id = self.conn.execute(
+            "INSERT INTO MuscleGroups (Name, SpanishName, Description) VALUES (?, ?, ?)",
+            (muscle_es, muscle_es, f"Músculos: {muscle_es}"),
+        ).lastrowid
+        self.index.muscles[key] = mg_id
+        return mg_id
+
+    def add_row(self, row: List[str]) -> None:
+        self.stats["rows"] += 1
+        if len(row) < 5:
+            self.stats["skipped"] += 1
+            return
+        muscle_es, name_es, name_en, description, image_path = (cell.strip() for cell in row[:5])
+        if not (name_es or name_en):
+            self.stats["skipped"] += 1
+            return
+
+        ex_id = self.index.find_exercise(name_en, name_es)
+
+        if ex_id is None:
+            if not (name_en and muscle_es):
+                self.stats["skipped"] += 1
+                return
+            name_es = name_es or name_en
+            muscle_id = self.muscle_id(muscle_es)
+            ex_id = self.conn.execute(
+                """
+                INSERT INTO Exercises (Name, SpanishName, Description, Instructions,
+                                       PrimaryMuscleGroupId, EquipmentTypeId, DifficultyLevel,
+                                       ExerciseType, IsActive, CreatedAt)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (name_en, name_es, description, "", muscle_id, self.index.equipment_for(name_en),
+                 DEFAULT_DIFFICULTY, exercise_type_for(muscle_es, name_en), 1, self.now),
+            ).lastrowid
+            for key in (normalize_name(name_en), normalize_name(name_es)):
+                self.index.exercises.setdefault(key, ex_id)
+            self.index.current[ex_id] = (name_en, name_es, description, muscle_id)
+            self.stats["inserted"] += 1
+        else:
+            # Keep what the row does not provide instead of copying the other language
+            current_en, current_es, current_description, current_muscle = self.index.current[ex_id]
+            name_en = name_en or current_en
+            name_es = name_es or current_es
+            if description in ("", PLACEHOLDER_DESCRIPTION):
+                description = current_description or description
+            muscle_id = self.muscle_id(muscle_es) if muscle_es else current_muscle
+            wanted = (name_en, name_es, description, muscle_id)
+            if self.index.current.get(ex_id) != wanted:
+                self.updates.append((*wanted, ex_id))
+                self.index.current[ex_id] = wanted
+                self.stats["updated"] += 1
+            else:
+                self.stats["unchanged"] += 1
+
+        image_path = image_path.replace("\\", "/")
+        if image_path and (ex_id, image_path) not in self.index.images:
+            is_primary = 0 if ex_id in self.index.with_primary else 1
+            self.images.append((ex_id, image_path, "Front", is_primary, name_es))
+            self.index.images.add((ex_id, image_path))
+            self.index.with_primary.add(ex_id)
+            self.stats["images"] += 1
+
+        if len(self.updates) + len(self.images) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        cur = self.conn
+        if self.updates:
+            updated_at = ", UpdatedAt = ?" if self.index.has_updated_at else ""
+            rows = (
+                [(*u[:4], self.now, u[4]) for u in self.updates] if self.index.has_updated_at else self.updates
+            )
+            cur.executemany(
+                "UPDATE Exercises SET Name = ?, SpanishName = ?, Description = ?, PrimaryMuscleGroupId = ?"
+                f"{updated_at} WHERE Id = ?",
+                rows,
+            )
+        if self.images:
+            cur.executemany(
+                "INSERT INTO ExerciseImages (ExerciseId, ImagePath, ImagePosition, IsPrimary, Description) "
+                "VALUES (?, ?, ?, ?, ?)",
+                self.images,
+            )
+        self.updates.clear()
+        self.images.clear()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Bulk upsert metadata.csv into Exercises and ExerciseImages")
+    ap.add_argument("--csv", default=str(DEFAULT_CSV), help="metadata.csv written by download_exercise_assets.py")
+    ap.add_argument("--db", default=str(DEFAULT_DB), help="SQLite database path")
+    ap.add_argument("--dry-run", action="store_true", help="Report what would change and roll back")
+    args = ap.parse_args()
+
+    csv_path = Path(args.csv)
+    if not csv_path.exists():
+        print(f"CSV not found: {csv_path}", file=sys.stderr)
+        return 1
+    if not Path(args.db).exists():
+        print(f"Database not found: {args.db}", file=sys.stderr)
+        return 1
+
+    start = time.perf_counter()
+    conn = gymdb.open_connection(args.db)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        importer = MetadataImporter(conn)
+        with csv_path.open("r", encoding="utf-8-sig", newline="") as fh:
+            reader = csv.reader(fh)
+            next(reader, None)  # header
+            for row in reader:
+                importer.add_row(row)
+        importer.flush()
+        if args.dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - start
+    stats = importer.stats
+    print(
+        f"{'Would import' if args.dry_run else 'Imported'} {stats['rows']} rows in {elapsed:.2f}s: "
+        f"{stats['inserted']} inserted, {stats['updated']} updated, {stats['unchanged']} unchanged, "
+        f"{stats['images']} new images, {stats['skipped']} skipped"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+"""
+Ingest the client routine files in RUTINAS/ (.docx, zipped .docx and FICHA N.pdf)
+into gymroutine.db so their exercises, sets and reps can be queried.
+
+Usage:
+  python scripts/ingest_routines.py [--source RUTINAS] [--db gymroutine.db] [--workers 4] [--force]
+
+Notes:
+  - Files are parsed in a process pool. The docx XML is streamed straight out of
+    the zip container and PDF text is extracted page by page.
+  - Ingestion is incremental: every file is hashed and only files whose SHA-256
+    changed since the last run are parsed again. Files that disappeared from the
+    folder are pruned from the tables.
+  - Files with the same SHA-256 as an earlier file in the folder (every .docx
+    here has a byte-identical .zip copy) are skipped, so each routine is stored
+    once, under the first name in sorted order.
+  - PDF text is grouped into lines by baseline: the text matrix is tracked
+    through Tm/Td/TD/T*, so glyphs placed one by one come out as one line.
+  - Results land in RoutineSourceFiles / RoutineExerciseEntries next to Exercises.
+    ExerciseName is empty for FICHA lines such as "4 SERIES 10 REP", where the
+    exercise itself is only shown as a picture. A nameless "7 REP" line
+    continues the named exercise above it, if any, and is stored under its name.
+  - Heading lines (day names, "ENTRENAMIENTO JUEVES Y LUNES 3 SERIES DE 10 REP
+    CADA EJERCICIO") never become exercise names. A heading that sets the
+    routine-wide sets/reps is kept as a nameless entry, like a picture sheet.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import mmap
+import re
+import sqlite3
+import sys
+import unicodedata
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Iterator, List, Optional, Tuple
+from xml.etree import ElementTree
+
+import gymdb
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_SOURCE = PROJECT_ROOT / "RUTINAS"
+DEFAULT_DB = gymdb.default_db_path(PROJECT_ROOT / "gymroutine.db")
+
+SUPPORTED_SUFFIXES = (".docx", ".zip", ".pdf")
+HASH_CHUNK_SIZE = 1024 * 1024
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# (FileName, ExerciseName, NormalizedName, Sets, Reps, Page, Position, RawText)
+Entry = Tuple[str, str, str, Optional[int], Optional[int], int, int, str]
+
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS RoutineSourceFiles (
+        Id INTEGER PRIMARY KEY AUTOINCREMENT,
+        FileName TEXT NOT NULL UNIQUE,
+        FileKind TEXT NOT NULL,
+        FileHash TEXT NOT NULL,
+        SizeBytes INTEGER NOT NULL,
+        EntryCount INTEGER NOT NULL DEFAULT 0,
+        IngestedAt TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS RoutineExerciseEntries (
+        Id INTEGER PRIMARY KEY AUTOINCREMENT,
+        SourceFileId INTEGER NOT NULL,
+        ExerciseName TEXT NOT NULL,
+        NormalizedName TEXT NOT NULL,
+        Sets INTEGER NULL,
+        Reps INTEGER NULL,
+        Page INTEGER NOT NULL,
+        Position INTEGER NOT NULL,
+        RawText TEXT NOT NULL,
+        FOREIGN KEY (SourceFileId) REFERENCES RoutineSourceFiles(Id) ON DELETE CASCADE
+    );
+    CREATE INDEX IF NOT EXISTS IX_RoutineExerciseEntries_SourceFileId
+        ON RoutineExerciseEntries(SourceFileId);
+    CREATE INDEX IF NOT EXISTS IX_RoutineExerciseEntries_NormalizedName
+        ON RoutineExerciseEntries(NormalizedName);
+"""
+
+
+# --------------------------------------------------------------------------- #
+# Hashing
+# --------------------------------------------------------------------------- #
+
+def hash_file(path: Path) -> Tuple[str, str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    with path.open("rb") as fh:
+        while True:
+            chunk = fh.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+    return path.name, digest.hexdigest(), size
+
+
+# --------------------------------------------------------------------------- #
+# Line parsing
+# --------------------------------------------------------------------------- #
+
+# Column gaps, tabs and the " + " that pairs two exercises in a superset
+SEGMENT_SPLIT = re.compile(r"\s{3,}|\t+|\s+\+\s+")
+# "4 SERIES 10 REP" - the FICHA sheets show the exercise as a picture, so the name is optional
+SERIES_REPS = re.compile(
+    r"^(?:(?P<name>.*?[A-Za-zÁÉÍÓÚÑÜáéíóúñü].*?)\s+)?(?P<sets>\d{1,2})\s*SERIES?\s*(?:DE\s*)?(?P<reps>\d{1,3})\s*REP",
+    re.IGNORECASE,
+)
+SETS_REPS = re.compile(
+    r"^(?:(?P<name>.*?[A-Za-zÁÉÍÓÚÑÜáéíóúñü].*?)\s+)?(?P<sets>\d{1,2})\s*[xX]\s*(?P<reps>\d{1,3})\b"
+)
+# "PATADA DE TRICEPS 10 REP", or a bare "7 REP" continuing the previous exercise
+REPS_ONLY = re.compile(
+    r"^(?:(?P<name>.*?[A-Za-zÁÉÍÓÚÑÜáéíóúñü].*?)\s+)?(?P<reps>\d{1,3})\s*REP",
+    re.IGNORECASE,
+)
+# Section headings that carry the routine-wide sets/reps, not an exercise
+HEADING = re.compile(
+    r"^(?:ENTRENAMIENTO|RUTINA|D[IÍ]A|LUNES|MARTES|MI[EÉ]RCOLES|JUEVES|VIERNES|S[AÁ]BADO|DOMINGO)\b"
+    r"|\bCADA\s+EJERCICIO\b",
+    re.IGNORECASE,
+)
+
+
+def normalize_name(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return re.sub(r"\s+", " ", stripped).strip().lower()
+
+
+def parse_line(line: str) -> List[Tuple[str, Optional[int], Optional[int], str]]:
+    """Split a routine line into segments and pull name/sets/reps out of each."""
+    results: List[Tuple[str, Optional[int], Optional[int], str]] = []
+    for segment in SEGMENT_SPLIT.split(line.strip()):
+        segment = segment.strip()
+        if not segment:
+            continue
+        heading = HEADING.search(segment) is not None
+        match = SERIES_REPS.match(segment) or SETS_REPS.match(segment)
+        if match:
+            results.append((
+                "" if heading else (match.group("name") or "").strip(" -.:"),
+                int(match.group("sets")),
+                int(match.group("reps")),
+                segment,
+            ))
+            continue
+        match = REPS_ONLY.match(segment)
+        if match and not heading:
+            results.append(((match.group("name") or "").strip(" -.:"), None, int(match.group("reps")), segment))
+    return results
+
+
+# --------------------------------------------------------------------------- #
+# DOCX
+# --------------------------------------------------------------------------- #
+
+def iter_docx_paragraphs(stream: IO[bytes]) -> Iterator[str]:
+    """Stream paragraph text out of word/document.xml without building the tree."""
+    parts: List[str] = []
+    for event, elem in ElementTree.iterparse(stream, events=("end",)):
+        if elem.tag == f"{W_NS}t":
+            parts.append(elem.text or "")
+        elif elem.tag == f"{W_NS}tab":
+            parts.append("\t")
+        elif elem.tag == f"{W_NS}p":
+            text = "".join(parts)
+            parts.clear()
+            elem.clear()
+            if text.strip():
+                yield text
+
+
+def iter_archive_paragraphs(archive: zipfile.ZipFile) -> Iterator[str]:
+    names = archive.namelist()
+    if "word/document.xml" in names:
+        with archive.open("word/document.xml") as member:
+            yield from iter_docx_paragraphs(member)
+        return
+    # Plain zip wrapping one or more .docx files
+    for name in names:
+        if name.lower().endswith(".docx"):
+            with archive.open(name) as member, zipfile.ZipFile(member) as inner:
+                yield from iter_archive_paragraphs(inner)
+
+
+# --------------------------------------------------------------------------- #
+# PDF
+# --------------------------------------------------------------------------- #
+
+PDF_OBJECT = re.compile(rb"(\d+)\s+(\d+)\s+obj\b")
+PDF_REF = re.compile(rb"(\d+)\s+\d+\s+R")
+PDF_TEXT_TOKEN = re.compile(
+    rb"\((?:\\.|[^\\()]|\((?:\\.|[^\\()])*\))*\)|<[0-9A-Fa-f\s]*>|\[|\]|"
+    rb"[-+]?(?:\d+\.?\d*|\.\d+)|\bT[Jj\*]|\bT[dDmL]\b|\bBT\b|'|\""
+)
+# Baselines closer than this (user space units) belong to the same line
+BASELINE_TOLERANCE = 1.0
+# Separates text objects that share a baseline; SEGMENT_SPLIT cuts on it
+SEGMENT_GAP = "   "
+PDF_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f"}
+
+
+class PdfReader:
+    """Minimal streaming PDF text reader for the simple FICHA exports.
+
+    Object offsets are found by scanning an mmap of the file; content streams are
+    only sliced and inflated when their page is reached, so memory stays flat.
+    """
+
+    def __init__(self, fh: IO[bytes]):
+        self._data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self._offsets = {}
+        for match in PDF_OBJECT.finditer(self._data):
+            self._offsets[int(match.group(1))] = match.end()
+
+    def close(self) -> None:
+        self._data.close()
+
+    def _object_dict(self, num: int) -> bytes:
+        start = self._offsets[num]
+        end = self._data.find(b"endobj", start)
+        stream_at = self._data.find(b"stream", start, end)
+        return self._data[start:stream_at if stream_at != -1 else end]
+
+    def _stream(self, num: int) -> bytes:
+        start = self._offsets[num]
+        end = self._data.find(b"endobj", start)
+        head = self._data.find(b"stream", start, end)
+        if head == -1:
+            return b""
+        body = head + len(b"stream")
+        if self._data[body:body + 2] == b"\r\n":
+            body += 2
+        elif self._data[body:body + 1] in (b"\n", b"\r"):
+            body += 1
+        tail = self._data.rfind(b"endstream", body, end)
+        raw = self._data[body:tail]
+        header = self._data[start:head]
+        if b"/FlateDecode" in header:
+            return zlib.decompress(raw)
+        if b"/Filter" in header:
+            return b""  # image or unsupported filter, no text inside
+        return raw
+
+    def _page_numbers(self) -> List[int]:
+        pages: List[int] = []
+        roots = [n for n in self._offsets if re.search(rb"/Type\s*/Pages\b", self._object_dict(n))]
+        kids_of = set()
+        for num in roots:
+            kids = re.search(rb"/Kids\s*\[([^\]]*)\]", self._object_dict(num))
+            if kids:
+                kids_of.update(int(ref) for ref in PDF_REF.findall(kids.group(1)))
+        top = [n for n in roots if n not in kids_of]
+
+        def walk(num: int) -> None:
+            body = self._object_dict(num)
+            if re.search(rb"/Type\s*/Pages\b", body):
+                kids = re.search(rb"/Kids\s*\[([^\]]*)\]", body)
+                for ref in PDF_REF.findall(kids.group(1)) if kids else []:
+                    walk(int(ref))
+            elif re.search(rb"/Type\s*/Page\b", body):
+                pages.append(num)
+
+        for num in top:
+            walk(num)
+        if not pages:
+            pages = sorted(
+                (n for n in self._offsets if re.search(rb"/Type\s*/Page\b", self._object_dict(n))),
+                key=self._offsets.__getitem__,
+            )
+        return pages
+
+    def iter_pages(self) -> Iterator[List[str]]:
+        for page_num in self._page_numbers():
+            contents = re.search(rb"/Contents\s*(\[[^\]]*\]|\d+\s+\d+\s+R)", self._object_dict(page_num))
+            if not contents:
+                yield []
+                continue
+            lines: List[str] = []
+            for ref in PDF_REF.findall(contents.group(1)):
+                lines.extend(extract_text_lines(self._stream(int(ref))))
+            yield lines
+
+
+def decode_pdf_string(token: bytes) -> str:
+    if token.startswith(b"<"):
+        hex_digits = re.sub(rb"\s", b"", token[1:-1])
+        if len(hex_digits) % 2:
+            hex_digits += b"0"
+        return bytes.fromhex(hex_digits.decode("ascii")).decode("latin-1")
+    out = bytearray()
+    body = token[1:-1]
+    i = 0
+    while i < len(body):
+        ch = body[i:i + 1]
+        if ch == b"\\" and i + 1 < len(body):
+            nxt = body[i + 1:i + 2]
+            if nxt in PDF_ESCAPES:
+                out += PDF_ESCAPES[nxt]
+                i += 2
+            elif nxt.isdigit():
+                octal = re.match(rb"[0-7]{1,3}", body[i + 1:i + 4]).group(0)
+                out.append(int(octal, 8) & 0xFF)
+                i += 1 + len(octal)
+            elif nxt in (b"\n", b"\r"):
+                i += 2
+            else:
+                out += nxt
+                i += 2
+        else:
+            out += ch
+            i += 1
+    return out.decode("latin-1")
+
+
+def extract_text_lines(content: bytes) -> List[str]:
+    """Collect shown strings from a content stream, one line per baseline.
+
+    The text line matrix is followed through Tm, Td, TD, TL and T*, and a new
+    line starts only when the baseline moves, so FICHA exports that position
+    every glyph with its own Td still read as "PATADA DE TRICEPS 10 REP".
+    """
+    lines: List[str] = []
+    current: List[str] = []
+    pending: List[str] = []
+    operands: List[float] = []
+    matrix = [1.0, 0.0, 0.0, 1.0, 0.0, 0.0]
+    leading = 0.0
+    baseline: Optional[float] = None
+    joiner = ""
+
+    def move(tx: float, ty: float) -> None:
+        a, b, c, d, e, f = matrix
+        matrix[4] = tx * a + ty * c + e
+        matrix[5] = tx * b + ty * d + f
+
+    for match in PDF_TEXT_TOKEN.finditer(content):
+        token = match.group(0)
+        head = token[:1]
+        if head in (b"(", b"<"):
+            pending.append(decode_pdf_string(token))
+            continue
+        if head in (b"[", b"]"):
+            continue
+        if head.isdigit() or head in (b"-", b"+", b"."):
+            operands.append(float(token))
+            continue
+        if token == b"BT":
+            matrix[:] = [1.0, 0.0, 0.0, 1.0, 0.0, 0.0]
+            joiner = SEGMENT_GAP
+        elif token == b"Tm" and len(operands) >= 6:
+            matrix[:] = operands[-6:]
+        elif token in (b"Td", b"TD") and len(operands) >= 2:
+            move(*operands[-2:])
+            if token == b"TD":
+                leading = -operands[-1]
+        elif token == b"TL" and operands:
+            leading = operands[-1]
+        elif token == b"T*":
+            move(0.0, -leading)
+        elif token in (b"Tj", b"TJ", b"'", b'"'):
+            if token in (b"'", b'"'):
+                move(0.0, -leading)
+            if baseline is not None and abs(matrix[5] - baseline) > BASELINE_TOLERANCE:
+                lines.append("".join(current))
+                current = []
+            if current:
+                current.append(joiner)
+            current.extend(pending)
+            baseline = matrix[5]
+            joiner = ""
+        pending = []
+        operands = []
+    if current:
+        lines.append("".join(current))
+    return [line for line in lines if line.strip()]
+
+
+# --------------------------------------------------------------------------- #
+# Worker
+# --------------------------------------------------------------------------- #
+
+def iter_file_lines(path: Path) -> Iterator[Tuple[int, str]]:
+    """Yield (page, line) for a routine file. Docx files are reported as page 1."""
+    if path.suffix.lower() == ".pdf":
+        with path.open("rb") as fh:
+            reader = PdfReader(fh)
+            try:
+                for page_index, lines in enumerate(reader.iter_pages(), start=1):
+                    for line in lines:
+                        yield page_index, line
+            finally:
+                reader.close()
+        return
+    with zipfile.ZipFile(path) as archive:
+        for paragraph in iter_archive_paragraphs(archive):
+            for line in paragraph.splitlines():
+                yield 1, line
+
+
+def extract_file(path_str: str) -> Tuple[str, List[Entry], Optional[str]]:
+    path = Path(path_str)
+    entries: List[Entry] = []
+    try:
+        position = 0
+        previous = ""
+        for page, line in iter_file_lines(path):
+            for name, sets, reps, raw in parse_line(line):
+                if sets is None and not name:
+                    name = previous  # still empty on picture-only sheets
+                elif name:
+                    previous = name
+                position += 1
+                entries.append((path.name, name, normalize_name(name), sets, reps, page, position, raw))
+    except (zipfile.BadZipFile, ElementTree.ParseError, zlib.error, KeyError, ValueError) as exc:
+        return path.name, [], f"{type(exc).__name__}: {exc}"
+    return path.name, entries, None
+
+
+# --------------------------------------------------------------------------- #
+# Database
+# --------------------------------------------------------------------------- #
+
+def ensure_schema(conn: sqlite3.Connection) -> None:
+    conn.executescript(SCHEMA)
+
+
+def load_known_hashes(conn: sqlite3.Connection) -> dict[str, str]:
+    return dict(conn.execute("SELECT FileName, FileHash FROM RoutineSourceFiles"))
+
+
+def bulk_load(
+    conn: sqlite3.Connection,
+    changed: List[Tuple[str, str, str, int]],
+    entries: List[Entry],
+    removed: List[str],
+) -> None:
+    """Replace the rows of every changed/removed file in one transaction."""
+    now = datetime.now().isoformat()
+    counts: dict[str, int] = {}
+    for entry in entries:
+        counts[entry[0]] = counts.get(entry[0], 0) + 1
+
+    with conn:
+        stale = [(name,) for name in removed] + [(name,) for name, _, _, _ in changed]
+        conn.executemany(
+            "DELETE FROM RoutineExerciseEntries WHERE SourceFileId IN "
+            "(SELECT Id FROM RoutineSourceFiles WHERE FileName = ?)",
+            stale,
+        )
+        conn.executemany("DELETE FROM RoutineSourceFiles WHERE FileName = ?", [(n,) for n in removed])
+        conn.executemany(
+            """
+            INSERT INTO RoutineSourceFiles (FileName, FileKind, FileHash, SizeBytes, EntryCount, IngestedAt)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(FileName) DO UPDATE SET
+                FileKind = excluded.FileKind,
+                FileHash = excluded.FileHash,
+                SizeBytes = excluded.SizeBytes,
+                EntryCount = excluded.EntryCount,
+                IngestedAt = excluded.IngestedAt
+            """,
+            [(name, kind, digest, size, counts.get(name, 0), now) for name, kind, digest, size in changed],
+        )
+        ids = dict(conn.execute("SELECT FileName, Id FROM RoutineSourceFiles"))
+        conn.executemany(
+            """
+            INSERT INTO RoutineExerciseEntries
+                (SourceFileId, ExerciseName, NormalizedName, Sets, Reps, Page, Position, RawText)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [(ids[e[0]], *e[1:]) for e in entries],
+        )
+
+
+# --------------------------------------------------------------------------- #
+# CLI
+# --------------------------------------------------------------------------- #
+
+def discover_files(source: Path) -> List[Path]:
+    return sorted(p for p in source.iterdir() if p.is_file() and p.suffix.lower() in SUPPORTED_SUFFIXES)
+
+
+def file_kind(path: Path) -> str:
+    return path.suffix.lower().lstrip(".")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Ingest RUTINAS routine files into gymroutine.db")
+    ap.add_argument("--source", default=str(DEFAULT_SOURCE), help="Folder with .docx/.zip/.pdf routines")
+    ap.add_argument("--db", default=str(DEFAULT_DB), help="SQLite database path")
+    ap.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    ap.add_argument("--force", action="store_true", help="Re-parse every file even if its hash is unchanged")
+    args = ap.parse_args()
+
+    source = Path(args.source)
+    if not source.is_dir():
+        print(f"Source folder not found: {source}", file=sys.stderr)
+        return 1
+
+    files = discover_files(source)
+    by_name = {p.name: p for p in files}
+
+    conn = gymdb.open_connection(args.db)
+    try:
+        ensure_schema(conn)
+        known = load_known_hashes(conn)
+
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            hashes = []
+            seen: dict[str, str] = {}
+            duplicates: List[str] = []
+            for name, digest, size in pool.map(hash_file, files):
+                if digest in seen:
+                    duplicates.append(name)
+                    del by_name[name]
+                    continue
+                seen[digest] = name
+                hashes.append((name, digest, size))
+            changed = [
+                (name, file_kind(by_name[name]), digest, size)
+                for name, digest, size in hashes
+                if args.force or known.get(name) != digest
+            ]
+            removed = sorted(set(known) - set(by_name))
+
+            entries: List[Entry] = []
+            failed: set[str] = set()
+            empty: List[str] = []
+            for name, file_entries, error in pool.map(extract_file, [str(by_name[c[0]]) for c in changed]):
+                if error:
+                    # Leave the stored hash alone so the file is retried next run
+                    failed.add(name)
+                    print(f"  Failed to parse {name}: {error}", file=sys.stderr)
+                elif not file_entries:
+                    empty.append(name)
+                    print(f"  No exercise entries found in {name}", file=sys.stderr)
+                entries.extend(file_entries)
+            unchanged = len(hashes) - len(changed)
+            changed = [c for c in changed if c[0] not in failed]
+
+        if changed or removed:
+            bulk_load(conn, changed, entries, removed)
+    finally:
+        conn.close()
+
+    print(
+        f"Scanned {len(files)} files: {len(changed)} parsed, {unchanged} unchanged, "
+        f"{len(removed)} removed, {len(entries)} exercise entries loaded"
+        + (f", {len(duplicates)} duplicates skipped" if duplicates else "")
+        + (f", {len(empty)} empty" if empty else "")
+        + (f", {len(failed)} failed" if failed else "")
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+Re-encode the exercise and AutoMap images to the smallest encoding that stays
+within an SSIM budget, stripping metadata, and report the bytes saved per file.
+
+Usage:
+  python scripts/optimize_images.py                       # dry run: report only
+  python scripts/optimize_images.py --apply [--workers 4] [--ssim 0.98]
+  python scripts/optimize_images.py --apply --convert     # also allow JPEG <-> PNG [--db gymroutine.db] [--csv metadata.csv]
+  python scripts/optimize_images.py --root docs/ejercicios --report report.csv
+
+Notes:
+  - Roots default to docs/ejercicios and src/app-ui/Images. AutoMap/media is
+    skipped: extract_routine_images.py names those files by content hash.
+  - Candidates per image: JPEG and lossy WebP at the lowest quality that meets
+    the budget (binary search), lossless PNG, and palette PNGs (exact when the
+    image has <= 256 colors, else 256/128/64/32 colors while within budget).
+    JPEG is never used for images with real transparency.
+  - Without --convert every file keeps its format and path. With --convert a
+    file may also switch between JPEG and PNG and is renamed to the new
+    extension; WebP is never a conversion target because the app loads images
+    with GDI+ (Image.FromFile/FromStream), which cannot decode it. After a
+    rename, ExerciseImages.ImagePath in --db and the image column of --csv are
+    rewritten to the new path.
+  - SSIM is computed in pure Python over 8x8 windows of Y, Cb and Cr (weighted
+    4:1:1) after compositing onto white. The windows form an evenly strided
+    grid (up to SSIM_GRID per side) over the whole native-resolution image, not
+    a downscale, which would hide compression artifacts. Images with alpha also
+    need the alpha channel within budget.
+  - Animated images (most liftmanual WebPs) are reported as skipped.
+  - EXIF orientation is applied before the EXIF block is dropped, so rotated
+    photos still display the right way up. ICC profiles are kept.
+  - A result is only written when it saves at least --min-saving of the file;
+    writes go through a temp file and os.replace.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from operator import mul
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+import gymdb
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_ROOTS = (PROJECT_ROOT / "docs" / "ejercicios", PROJECT_ROOT / "src" / "app-ui" / "Images")
+DEFAULT_REPORT = PROJECT_ROOT / "image_optimization_report.csv"
+DEFAULT_DB = gymdb.default_db_path(PROJECT_ROOT / "gymroutine.db")
+DEFAULT_CSV = PROJECT_ROOT / "docs" / "ejercicios" / "metadata.csv"
+CSV_IMAGE_COLUMN = 4
+EXCLUDED_DIR = "AutoMap/media"
+
+FORMAT_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}
+SOURCE_FORMATS = {".jpg": "JPEG", ".jpeg": "JPEG", ".png": "PNG", ".webp": "WEBP"}
+# What --convert may switch to: formats GDI+ in the app can decode
+CONVERT_FORMATS = frozenset({"JPEG", "PNG"})
+
+SSIM_GRID = 32  # windows per side sampled from large images
+SSIM_WINDOW = 8
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+QUALITY_MIN = 50  # flat backgrounds inflate SSIM; never go below this
+QUALITY_MAX = 95
+PALETTE_SIZES = (256, 128, 64, 32)
+
+
+class Options(NamedTuple):
+    ssim: float
+    min_saving: float
+    convert: bool
+    apply: bool
+
+
+class Candidate(NamedTuple):
+    data: bytes
+    format: str
+    setting: str
+    score: float
+
+
+# --------------------------------------------------------------------------- #
+# SSIM
+# --------------------------------------------------------------------------- #
+
+def _grid(length: int) -> List[int]:
+    """Offsets of up to SSIM_GRID windows spread evenly from edge to edge."""
+    count = min(SSIM_GRID, length // SSIM_WINDOW)
+    if count <= 1:
+        return [0]
+    return [(length - SSIM_WINDOW) * i // (count - 1) for i in range(count)]
+
+
+def _sample(im: Image.Image) -> Image.Image:
+    """Mosaic of 8x8 native-resolution windows on a strided grid over the whole image.
+
+    Downscaling would average away exactly the block and ringing artifacts the
+    budget is meant to catch, so windows are copied pixel for pixel; each one
+    lands on a window of _plane_ssim, so every window scored is a real one.
+    """
+    if im.width <= SSIM_GRID * SSIM_WINDOW and im.height <= SSIM_GRID * SSIM_WINDOW:
+        return im
+    lefts, tops = _grid(im.width), _grid(im.height)
+    mosaic = Image.new(im.mode, (len(lefts) * SSIM_WINDOW, len(tops) * SSIM_WINDOW))
+    for row, top in enumerate(tops):
+        for col, left in enumerate(lefts):
+            window = im.crop((left, top, left + SSIM_WINDOW, top + SSIM_WINDOW))
+            mosaic.paste(window, (col * SSIM_WINDOW, row * SSIM_WINDOW))
+    return mosaic
+
+
+def _analysis_planes(im: Image.Image) -> List[bytes]:
+    """Y, Cb, Cr (and A when present) of the sampled tiles composited onto white."""
+    small = _sample(im)
+    planes: List[bytes] = []
+    if small.mode == "RGBA":
+        background = Image.new("RGBA", small.size, (255, 255, 255, 255))
+        flat = Image.alpha_composite(background, small).convert("YCbCr")
+        planes = [band.tobytes() for band in flat.split()]
+        planes.append(small.getchannel("A").tobytes())
+    else:
+        planes = [band.tobytes() for band in small.convert("YCbCr").split()]
+    return planes
+
+
+def _plane_ssim(a: bytes, b: bytes, width: int, height: int) -> float:
+    total = 0.0
+    windows = 0
+    n = SSIM_WINDOW * SSIM_WINDOW
+    for top in range(0, height - SSIM_WINDOW + 1, SSIM_WINDOW):
+        for left in range(0, width - SSIM_WINDOW + 1, SSIM_WINDOW):
+            sa = sb = saa = sbb = sab = 0
+            for y in range(top, top + SSIM_WINDOW):
+                start = y * width + left
+                ra = a[start:start + SSIM_WINDOW]
+                rb = b[start:start + SSIM_WINDOW]
+                sa += sum(ra)
+                sb += sum(rb)
+                saa += sum(map(mul, ra, ra))
+                sbb += sum(map(mul, rb, rb))
+                sab += sum(map(mul, ra, rb))
+            mean_a = sa / n
+            mean_b = sb / n
+            var_a = saa / n - mean_a * mean_a
+            var_b = sbb / n - mean_b * mean_b
+            cov = sab / n - mean_a * mean_b
+            total += ((2 * mean_a * mean_b + SSIM_C1) * (2 * cov + SSIM_C2)) / (
+                (mean_a * mean_a + mean_b * mean_b + SSIM_C1) * (var_a + var_b + SSIM_C2)
+            )
+            windows += 1
+    return total / windows if windows else 1.0
+
+
+def ssim(reference: List[bytes], size: Tuple[int, int], candidate: Image.Image) -> float:
+    planes = _analysis_planes(candidate)
+    width, height = size
+    y, cb, cr = (_plane_ssim(reference[i], planes[i], width, height) for i in range(3))
+    score = (4 * y + cb + cr) / 6
+    if len(reference) == 4:
+        score = min(score, _plane_ssim(reference[3], planes[3], width, height))
+    return score
+
+
+# --------------------------------------------------------------------------- #
+# Encoding
+# --------------------------------------------------------------------------- #
+
+def _encode(im: Image.Image, fmt: str, icc: Optional[bytes], **params) -> bytes:
+    buffer = io.BytesIO()
+    if icc:
+        params["icc_profile"] = icc
+    im.save(buffer, format=fmt, **params)
+    return buffer.getvalue()
+
+
+def _decode(data: bytes, mode: str) -> Image.Image:
+    with Image.open(io.BytesIO(data)) as decoded:
+        return decoded.convert(mode)
+
+
+class Encoder:
+    def __init__(self, im: Image.Image, icc: Optional[bytes], budget: float):
+        self.im = im
+        self.icc = icc
+        self.budget = budget
+        self.reference = _analysis_planes(im)
+        self.analysis_size = _sample(im).size
+
+    def score(self, data: bytes) -> float:
+        return ssim(self.reference, self.analysis_size, _decode(data, self.im.mode))
+
+    def lowest_quality(self, fmt: str, **params) -> Optional[Candidate]:
+        """Binary search the lowest quality whose SSIM meets the budget."""
+        low, high = QUALITY_MIN, QUALITY_MAX
+        best: Optional[Candidate] = None
+        while low <= high:
+            quality = (low + high) // 2
+            data = _encode(self.im, fmt, self.icc, quality=quality, **params)
+            score = self.score(data)
+            if score >= self.budget:
+                best = Candidate(data, fmt, f"q{quality}", score)
+                high = quality - 1
+            else:
+                low = quality + 1
+        return best
+
+    def jpeg(self) -> Optional[Candidate]:
+        rgb = self.im.convert("RGB") if self.im.mode != "RGB" else self.im
+        encoder = self if rgb is self.im else Encoder(rgb, self.icc, self.budget)
+        return encoder.lowest_quality("JPEG", optimize=True, progressive=True)
+
+    def webp(self) -> List[Candidate]:
+        found = [Candidate(_encode(self.im, "WEBP", self.icc, lossless=True, method=6), "WEBP", "lossless", 1.0)]
+        lossy = self.lowest_quality("WEBP", method=6)
+        if lossy:
+            found.append(lossy)
+        return found
+
+    def png(self) -> List[Candidate]:
+        found = [Candidate(_encode(self.im, "PNG", self.icc, optimize=True), "PNG", "lossless", 1.0)]
+        exact = self.im.getcolors(256)
+        # Few colors: one palette holding all of them. Otherwise shrink the
+        # palette until the budget is exceeded.
+        sizes = (len(exact),) if exact is not None else PALETTE_SIZES
+        method = Image.FASTOCTREE if self.im.mode == "RGBA" else Image.MEDIANCUT
+        for colors in sizes:
+            paletted = self.im.quantize(colors=colors, method=method)
+            data = _encode(paletted, "PNG", self.icc, optimize=True)
+            score = self.score(data)
+            if score < self.budget:
+                break
+            found.append(Candidate(data, "PNG", f"palette{colors}", score))
+        return found
+
+
+def has_transparency(im: Image.Image) -> bool:
+    return im.mode == "RGBA" and im.getchannel("A").getextrema() != (255, 255)
+
+
+def optimize_file(job: Tuple[str, Options]) -> Dict[str, object]:
+    path_str, options = job
+    path = Path(path_str)
+    result: Dict[str, object] = {"path": path_str, "original_bytes": path.stat().st_size}
+    source_format = SOURCE_FORMATS[path.suffix.lower()]
+    try:
+        with Image.open(path) as opened:
+            if getattr(opened, "n_frames", 1) > 1:
+                return {**result, "status": "skipped", "detail": "animated"}
+            icc = opened.info.get("icc_profile")
+            im = ImageOps.exif_transpose(opened)
+            has_alpha = "A" in im.mode or "transparency" in im.info
+            im = im.convert("RGBA" if has_alpha else "RGB")
+    except (UnidentifiedImageError, OSError, ValueError) as exc:
+        return {**result, "status": "error", "detail": f"{type(exc).__name__}: {exc}"}
+
+    encoder = Encoder(im, icc, options.ssim)
+    formats = set(CONVERT_FORMATS) | {source_format} if options.convert else {source_format}
+    if has_transparency(im):
+        formats.discard("JPEG")
+    candidates: List[Candidate] = []
+    if "JPEG" in formats:
+        jpeg = encoder.jpeg()
+        if jpeg:
+            candidates.append(jpeg)
+    if "WEBP" in formats:
+        candidates.extend(encoder.webp())
+    if "PNG" in formats:
+        candidates.extend(encoder.png())
+    if not candidates:
+        return {**result, "status": "kept", "detail": "no candidate within budget"}
+
+    best = min(candidates, key=lambda c: len(c.data))
+    saved = result["original_bytes"] - len(best.data)
+    result.update({
+        "new_bytes": len(best.data),
+        "saved_bytes": saved,
+        "format": best.format,
+        "setting": best.setting,
+        "ssim": round(best.score, 5),
+    })
+    if saved < options.min_saving * result["original_bytes"]:
+        return {**result, "status": "kept", "detail": "saving below threshold", "new_bytes": result["original_bytes"], "saved_bytes": 0}
+
+    target = path
+    if best.format != source_format:
+        target = path.with_suffix(FORMAT_EXTENSIONS[best.format])
+        if target.exists():
+            return {**result, "status": "kept", "detail": f"{target.name} already exists", "new_bytes": result["original_bytes"], "saved_bytes": 0}
+    result["new_path"] = str(target)
+    if options.apply:
+        tmp = target.with_name(target.name + ".tmp")
+        tmp.write_bytes(best.data)
+        os.replace(tmp, target)
+        if target != path:
+            path.unlink()
+    result["status"] = "optimized" if options.apply else "would optimize"
+    return result
+
+
+# --------------------------------------------------------------------------- #
+# CLI
+# --------------------------------------------------------------------------- #
+
+def iter_images(roots: List[Path]) -> Iterator[Path]:
+    for root in roots:
+        if not root.is_dir():
+            continue
+        for path in sorted(root.rglob("*")):
+            if path.suffix.lower() not in SOURCE_FORMATS or not path.is_file():
+                continue
+            if f"/{EXCLUDED_DIR}/" in path.as_posix():
+                continue
+            yield path
+
+
+def _relative(path: str) -> str:
+    try:
+        return Path(path).relative_to(PROJECT_ROOT).as_posix()
+    except ValueError:
+        return Path(path).as_posix()
+
+
+def _path_variants(path: str) -> List[str]:
+    """How a file may be stored: absolute, or project-relative with / or \\."""
+    relative = _relative(path)
+    return list(dict.fromkeys((relative, relative.replace("/", "\\"), str(path))))
+
+
+def rewrite_references(renames: Dict[str, str], db_path: Path, csv_path: Path) -> Tuple[int, int]:
+    """Point ExerciseImages.ImagePath and metadata.csv at renamed files; returns (db rows, csv rows)."""
+    stored = {}
+    for old, new in renames.items():
+        for before, after in zip(_path_variants(old), _path_variants(new)):
+            stored[before] = after
+
+    db_rows = 0
+    if db_path.is_file():
+        with gymdb.transaction(db_path) as conn:
+            db_rows = conn.executemany(
+                "UPDATE ExerciseImages SET ImagePath = ? WHERE ImagePath = ?",
+                [(after, before) for before, after in stored.items()],
+            ).rowcount
+        gymdb.close_all(db_path)
+
+    csv_rows = 0
+    if csv_path.is_file():
+        with csv_path.open(encoding="utf-8", newline="") as fh:
+            rows = list(csv.reader(fh))
+        for row in rows:
+            if len(row) > CSV_IMAGE_COLUMN and row[CSV_IMAGE_COLUMN] in stored:
+                row[CSV_IMAGE_COLUMN] = stored[row[CSV_IMAGE_COLUMN]]
+                csv_rows += 1
+        if csv_rows:
+            tmp = csv_path.with_name(csv_path.name + ".tmp")
+            with tmp.open("w", encoding="utf-8", newline="") as fh:
+                csv.writer(fh).writerows(rows)
+            os.replace(tmp, csv_path)
+    return db_rows, csv_rows
+
+
+def write_report(path: Path, results: List[Dict[str, object]]) -> None:
+    fields = ["path", "status", "original_bytes", "new_bytes", "saved_bytes", "format", "setting", "ssim", "new_path", "detail"]
+    with path.open("w", encoding="utf-8", newline="") as fh:
+        writer = csv.DictWriter(fh, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        for row in results:
+            row = dict(row)
+            for key in ("path", "new_path"):
+                if row.get(key):
+                    row[key] = _relative(str(row[key]))
+            writer.writerow(row)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Re-encode images to the smallest encoding within an SSIM budget")
+    ap.add_argument("--root", action="append", default=None, help="Folder to optimize (repeatable)")
+    ap.add_argument("--ssim", type=float, default=0.98, help="Minimum SSIM against the original (0..1)")
+    ap.add_argument("--min-saving", type=float, default=0.02, help="Only rewrite files that shrink by this fraction")
+    ap.add_argument("--convert", action="store_true", help="Allow switching between JPEG and PNG (renames the file)")
+    ap.add_argument("--db", default=str(DEFAULT_DB), help="--convert: database whose ImagePath values are rewritten")
+    ap.add_argument("--csv", default=str(DEFAULT_CSV), help="--convert: metadata.csv whose image paths are rewritten")
+    ap.add_argument("--apply", action="store_true", help="Write the results (default: report only)")
+    ap.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    ap.add_argument("--report", default=str(DEFAULT_REPORT), help="CSV report path")
+    args = ap.parse_args()
+
+    roots = [Path(root).resolve() for root in args.root] if args.root else list(DEFAULT_ROOTS)
+    files = list(iter_images(roots))
+    if not files:
+        print("No images found.", file=sys.stderr)
+        return 1
+
+    options = Options(args.ssim, args.min_saving, args.convert, args.apply)
+    start = time.perf_counter()
+    results: List[Dict[str, object]] = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for result in pool.map(optimize_file, [(str(path), options) for path in files], chunksize=1):
+            results.append(result)
+            if result["status"] == "error":
+                print(f"  {result['path']}: {result['detail']}", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+
+    renames = {
+        str(r["path"]): str(r["new_path"])
+        for r in results
+        if r["status"] == "optimized" and r.get("new_path") and r["new_path"] != r["path"]
+    }
+    if renames:
+        db_rows, csv_rows = rewrite_references(renames, Path(args.db), Path(args.csv))
+        print(f"Renamed {len(renames)} files: updated {db_rows} ImagePath rows and {csv_rows} metadata.csv rows")
+
+    report = Path(args.report)
+    write_report(report, results)
+    original = sum(int(r["original_bytes"]) for r in results)
+    saved = sum(int(r.get("saved_bytes", 0)) for r in results if r["status"] in ("optimized", "would optimize"))
+    changed = sum(1 for r in results if r["status"] in ("optimized", "would optimize"))
+    verb = "Saved" if args.apply else "Would save"
+    print(
+        f"{verb} {saved / 1024 / 1024:.1f} MB of {original / 1024 / 1024:.1f} MB "
+        f"({saved / original:.1%}) across {changed}/{len(results)} images in {elapsed:.1f}s"
+    )
+    print(f"Report written to {report}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Pack every exercise image into one memory-mappable archive with a sorted offset
+table keyed by normalized exercise name, and read it back with zero-copy slices.
+
+Usage:
+  python scripts/pack_exercise_images.py [--out exercise_images.pack]
+  python scripts/pack_exercise_images.py --benchmark [--out exercise_images.pack]
+
+Reader API:
+  pack = ImagePack.open("exercise_images.pack")
+  data = pack.get("press de banca")          # memoryview or None
+  for entry in pack.find("Giro ruso"): ...   # every image stored under that name
+  pack.close()
+
+Notes:
+  - Sources are docs/ejercicios/<Grupo>/<Ejercicio>/* (keyed by the exercise
+    folder) and src/app-ui/Images/** (keyed by the 'NN_<exercise>' part of the
+    file name, or by client/file when the name carries no exercise).
+  - Keys are normalized: accents stripped, lowercase, '_' and runs of spaces
+    collapsed. A key may hold several images; they keep their relative path.
+  - Layout: header, fixed-size entry table sorted by key, string area, then the
+    image bytes. Opening reads only the key column; lookups are a binary search
+    over it and return memoryview slices of the mmap, so image bytes are not
+    copied until the caller needs them.
+  - --benchmark copies every packed image out with bytes() and checksums both
+    sides, so the pack pays for the same bytes the loose read_bytes() does. The
+    warm figures run with the OS page cache already filled. For the cold ones the
+    pack and every loose file are dropped from the page cache
+    (posix_fadvise DONTNEED, Linux) and each layout is timed in a fresh
+    process: startup plus one lookup, then one pass over every key. Directory
+    entries stay cached, so the loose walk is still cheaper than on a cold boot.
+"""
+from __future__ import annotations
+
+import argparse
+import bisect
+import mmap
+import os
+import re
+import struct
+import subprocess
+import sys
+import time
+import unicodedata
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+EXERCISES_ROOT = PROJECT_ROOT / "docs" / "ejercicios"
+APP_IMAGES_ROOT = PROJECT_ROOT / "src" / "app-ui" / "Images"
+DEFAULT_OUT = PROJECT_ROOT / "exercise_images.pack"
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp"}
+
+MAGIC = b"GYMPACK1"
+# magic, entry count, table offset, string area offset, data area offset
+HEADER = struct.Struct("<8sIQQQ")
+# key offset, key length, path offset, path length, data offset, data length
+ENTRY = struct.Struct("<IIIIQQ")
+DATA_ALIGNMENT = 8
+
+NUMBERED_NAME = re.compile(r"^\d+_(?P<name>.+)$")
+
+
+def normalize_key(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.replace("_", " "))
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return re.sub(r"\s+", " ", stripped).strip().lower()
+
+
+# --------------------------------------------------------------------------- #
+# Source discovery
+# --------------------------------------------------------------------------- #
+
+def iter_sources(exercises_root: Optional[Path], app_images_root: Optional[Path]) -> Iterator[Tuple[str, Path]]:
+    """Yield (normalized key, file) for every image of both loose layouts; either root may be None."""
+    if exercises_root is not None and exercises_root.is_dir():
+        for path in exercises_root.rglob("*"):
+            if path.suffix.lower() in IMAGE_SUFFIXES and path.is_file():
+                yield normalize_key(path.parent.name), path
+    if app_images_root is not None and app_images_root.is_dir():
+        for path in app_images_root.rglob("*"):
+            if path.suffix.lower() not in IMAGE_SUFFIXES or not path.is_file():
+                continue
+            match = NUMBERED_NAME.match(path.stem)
+            if match:
+                yield normalize_key(match.group("name")), path
+            else:
+                yield normalize_key(f"{path.parent.name}/{path.stem}"), path
+
+
+# --------------------------------------------------------------------------- #
+# Writer
+# --------------------------------------------------------------------------- #
+
+def _stored_path(path: Path) -> str:
+    """Project-relative path when possible (sources given with --root may live elsewhere)."""
+    try:
+        return path.relative_to(PROJECT_ROOT).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def write_pack(out: Path, sources: List[Tuple[str, Path]]) -> Tuple[int, int]:
+    """Write the pack atomically. Returns (entries, bytes written)."""
+    items = sorted(
+        ((key.encode("utf-8"), _stored_path(path).encode("utf-8"), path) for key, path in sources),
+        key=lambda item: (item[0], item[1]),
+    )
+
+    strings = bytearray()
+    string_refs: List[Tuple[int, int, int, int]] = []
+    for key, rel, _ in items:
+        key_off = len(strings)
+        strings += key
+        rel_off = len(strings)
+        strings += rel
+        string_refs.append((key_off, len(key), rel_off, len(rel)))
+
+    table_offset = HEADER.size
+    strings_offset = table_offset + ENTRY.size * len(items)
+    data_offset = _align(strings_offset + len(strings))
+
+    tmp = out.with_suffix(out.suffix + ".tmp")
+    with tmp.open("wb") as fh:
+        fh.write(HEADER.pack(MAGIC, len(items), table_offset, strings_offset, data_offset))
+        # Reserve the table; it is filled in once data offsets are known
+        fh.write(b"\0" * (ENTRY.size * len(items)))
+        fh.write(strings)
+        fh.write(b"\0" * (data_offset - fh.tell()))
+
+        table = bytearray()
+        for (key_off, key_len, rel_off, rel_len), (_, _, path) in zip(string_refs, items):
+            start = fh.tell()
+            with path.open("rb") as src:
+                while True:
+                    chunk = src.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    fh.write(chunk)
+            length = fh.tell() - start
+            fh.write(b"\0" * (_align(fh.tell()) - fh.tell()))
+            table += ENTRY.pack(key_off, key_len, rel_off, rel_len, start, length)
+
+        size = fh.tell()
+        fh.seek(table_offset)
+        fh.write(table)
+    os.replace(tmp, out)
+    return len(items), size
+
+
+def _align(offset: int) -> int:
+    return (offset + DATA_ALIGNMENT - 1) // DATA_ALIGNMENT * DATA_ALIGNMENT
+
+
+# --------------------------------------------------------------------------- #
+# Reader
+# --------------------------------------------------------------------------- #
+
+class PackEntry(NamedTuple):
+    key: str
+    path: str
+    data: memoryview
+
+
+class ImagePack:
+    """Memory-mapped reader.
+
+    Returned memoryviews point into the mapping; drop or release() them before
+    close(), which otherwise raises BufferError.
+    """
+
+    def __init__(self, buffer: mmap.mmap):
+        magic, count, table_offset, strings_offset, _ = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("Not an exercise image pack")
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+        self._count = count
+        self._table_offset = table_offset
+        self._strings_offset = strings_offset
+        # The sorted key column is tiny next to the image data; keeping it as a
+        # list lets bisect run in C instead of unpacking table rows per probe.
+        self._keys = [self._key_bytes(index) for index in range(count)]
+
+    @classmethod
+    def open(cls, path: Path | str) -> "ImagePack":
+        with open(path, "rb") as fh:
+            return cls(mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def close(self) -> None:
+        self._view.release()
+        self._buffer.close()
+
+    def __enter__(self) -> "ImagePack":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _entry(self, index: int) -> Tuple[int, int, int, int, int, int]:
+        return ENTRY.unpack_from(self._buffer, self._table_offset + index * ENTRY.size)
+
+    def _key_bytes(self, index: int) -> bytes:
+        key_off, key_len, *_ = self._entry(index)
+        start = self._strings_offset + key_off
+        return self._buffer[start:start + key_len]
+
+    def _make_entry(self, index: int) -> PackEntry:
+        key_off, key_len, rel_off, rel_len, data_off, data_len = self._entry(index)
+        base = self._strings_offset
+        return PackEntry(
+            key=self._buffer[base + key_off:base + key_off + key_len].decode("utf-8"),
+            path=self._buffer[base + rel_off:base + rel_off + rel_len].decode("utf-8"),
+            data=self._view[data_off:data_off + data_len],
+        )
+
+    def find(self, name: str) -> List[PackEntry]:
+        key = normalize_key(name).encode("utf-8")
+        index = bisect.bisect_left(self._keys, key)
+        found: List[PackEntry] = []
+        while index < self._count and self._keys[index] == key:
+            found.append(self._make_entry(index))
+            index += 1
+        return found
+
+    def get(self, name: str) -> Optional[memoryview]:
+        key = normalize_key(name).encode("utf-8")
+        index = bisect.bisect_left(self._keys, key)
+        if index < self._count and self._keys[index] == key:
+            return self._make_entry(index).data
+        return None
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def keys(self) -> List[str]:
+        seen: List[str] = []
+        for raw in self._keys:
+            key = raw.decode("utf-8")
+            if not seen or seen[-1] != key:
+                seen.append(key)
+        return seen
+
+
+# --------------------------------------------------------------------------- #
+# Benchmark
+# --------------------------------------------------------------------------- #
+
+def _loose_index() -> Dict[str, Path]:
+    loose: Dict[str, Path] = {}
+    for key, path in iter_sources(EXERCISES_ROOT, APP_IMAGES_ROOT):
+        # get() returns the image with the smallest relative path; pick the same one
+        rel = path.relative_to(PROJECT_ROOT).as_posix()
+        if key not in loose or rel < loose[key].relative_to(PROJECT_ROOT).as_posix():
+            loose[key] = path
+    return loose
+
+
+def _evict(paths: List[Path]) -> bool:
+    """Drop the files from the OS page cache; False where that is not possible."""
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)  # dirty pages are not dropped
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    return True
+
+
+def cold_run(layout: str, pack_path: Path) -> Tuple[float, float]:
+    """Startup + first lookup, then one pass over every key (run in a fresh process)."""
+    start = time.perf_counter()
+    if layout == "pack":
+        pack = ImagePack.open(pack_path)
+        keys = pack.keys()
+        bytes(pack.get(keys[0]))
+        startup = time.perf_counter() - start
+        start = time.perf_counter()
+        for key in keys:
+            zlib.crc32(bytes(pack.get(key)))
+        pack.close()
+    else:
+        loose = _loose_index()
+        keys = sorted(loose)
+        loose[keys[0]].read_bytes()
+        startup = time.perf_counter() - start
+        start = time.perf_counter()
+        for key in keys:
+            zlib.crc32(loose[key].read_bytes())
+    return startup, time.perf_counter() - start
+
+
+def _cold(layout: str, pack_path: Path, files: List[Path]) -> Optional[Tuple[float, float]]:
+    if not _evict(files):
+        return None
+    result = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--cold-run", layout, "--out", str(pack_path)],
+        check=True, capture_output=True, text=True,
+    )
+    startup, total = result.stdout.split()
+    return float(startup), float(total)
+
+
+def run_benchmark(pack_path: Path, rounds: int = 5) -> None:
+    # Loose layout: startup needs a directory walk to map names to files,
+    # then every lookup opens and reads a small file.
+    start = time.perf_counter()
+    loose = _loose_index()
+    keys = sorted(loose)
+    loose[keys[0]].read_bytes()
+    loose_startup = time.perf_counter() - start
+
+    # Both sides end up with a bytes object per image and checksum it, so
+    # neither gets away without touching the image data
+    loose_sums = []
+    start = time.perf_counter()
+    for _ in range(rounds):
+        loose_sums = [zlib.crc32(loose[key].read_bytes()) for key in keys]
+    loose_warm = (time.perf_counter() - start) / (rounds * len(keys))
+
+    start = time.perf_counter()
+    pack = ImagePack.open(pack_path)
+    bytes(pack.get(keys[0]))
+    pack_startup = time.perf_counter() - start
+
+    try:
+        packed_sums = []
+        start = time.perf_counter()
+        for _ in range(rounds):
+            packed_sums = [zlib.crc32(bytes(pack.get(key))) for key in keys]
+        pack_warm = (time.perf_counter() - start) / (rounds * len(keys))
+    finally:
+        pack.close()
+
+    loose_cold = _cold("loose", pack_path, [path for _, path in iter_sources(EXERCISES_ROOT, APP_IMAGES_ROOT)])
+    pack_cold = _cold("pack", pack_path, [pack_path])
+
+    print(f"Lookup benchmark over {len(keys)} keys")
+    print(f"  Warm ({rounds} rounds, page cache filled)")
+    print(f"    Startup (index + first read): loose {loose_startup * 1000:8.2f} ms | pack {pack_startup * 1000:8.2f} ms")
+    print(f"    Per lookup (bytes + crc32):   loose {loose_warm * 1e6:8.1f} us | pack {pack_warm * 1e6:8.1f} us")
+    if loose_cold and pack_cold:
+        print("  Cold (page cache dropped, fresh process)")
+        print(f"    Startup (index + first read): loose {loose_cold[0] * 1000:8.2f} ms | pack {pack_cold[0] * 1000:8.2f} ms")
+        print(f"    Per lookup (bytes + crc32):   loose {loose_cold[1] / len(keys) * 1e6:8.1f} us | "
+              f"pack {pack_cold[1] / len(keys) * 1e6:8.1f} us")
+    else:
+        print("  Cold: not measured (posix_fadvise is not available on this platform)")
+    print(f"  All images identical: {'yes' if packed_sums == loose_sums else 'NO'}")
+
+
+# --------------------------------------------------------------------------- #
+# CLI
+# --------------------------------------------------------------------------- #
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Pack exercise images into one memory-mappable archive")
+    ap.add_argument("--out", default=str(DEFAULT_OUT), help="Output pack path")
+    ap.add_argument("--benchmark", action="store_true", help="Compare pack lookups with the loose-file layout")
+    ap.add_argument("--cold-run", choices=("loose", "pack"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.cold_run:
+        startup, total = cold_run(args.cold_run, Path(args.out))
+        print(f"{startup} {total}")
+        return 0
+
+    sources = list(iter_sources(EXERCISES_ROOT, APP_IMAGES_ROOT))
+    if not sources:
+        print("No images found to pack.", file=sys.stderr)
+        return 1
+
+    out = Path(args.out)
+    start = time.perf_counter()
+    count, size = write_pack(out, sources)
+    elapsed = time.perf_counter() - start
+    keys = len({key for key, _ in sources})
+    print(f"Packed {count} images under {keys} keys into {out} ({size / 1024 / 1024:.1f} MB) in {elapsed:.2f}s")
+
+    if args.benchmark:
+        run_benchmark(out)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Precompute ExerciseImages.ImageMetadata (dimensions, format, size, hashes and
+dominant color) so the app never has to decode an image just to learn about it.
+
+Usage:
+  python scripts/precompute_image_metadata.py [--db gymroutine.db] [--workers 4] [--force]
+
+Notes:
+  - Rows are processed in a process pool. Each worker reads the file named by
+    ImagePath (relative to the repo root) or, when there is none, the ImageData
+    BLOB through its own read-only connection, so BLOBs never cross processes.
+  - Width, height and format come from the image header (PIL opens lazily). Only
+    the perceptual hash and dominant color need pixels, and those are computed
+    from a reduced decode (JPEG draft mode + thumbnail).
+  - ImageMetadata is stored as JSON and exposed through indexed VIRTUAL generated
+    columns (ImageWidth, ImageHeight, ImageFormat, ImageBytes, ImageSha256,
+    ImagePHash, ImageDominantColor).
+  - Incremental: rows whose content SHA-256 matches the stored one are skipped
+    without decoding. --force recomputes everything.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, UnidentifiedImageError
+
+import gymdb
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_DB = gymdb.default_db_path(PROJECT_ROOT / "gymroutine.db")
+
+PHASH_SIZE = 8
+DOMINANT_SAMPLE = 64
+DOMINANT_COLORS = 5
+BATCH_SIZE = 200
+
+GENERATED_COLUMNS = (
+    ("ImageWidth", "INTEGER", "$.width"),
+    ("ImageHeight", "INTEGER", "$.height"),
+    ("ImageFormat", "TEXT", "$.format"),
+    ("ImageBytes", "INTEGER", "$.bytes"),
+    ("ImageSha256", "TEXT", "$.sha256"),
+    ("ImagePHash", "TEXT", "$.phash"),
+    ("ImageDominantColor", "TEXT", "$.dominant_color"),
+)
+GENERATED_INDEXES = (
+    ("IX_ExerciseImages_ImageSha256", "ImageSha256"),
+    ("IX_ExerciseImages_ImagePHash", "ImagePHash"),
+    ("IX_ExerciseImages_ImageFormat", "ImageFormat"),
+    ("IX_ExerciseImages_ImageSize", "ImageWidth, ImageHeight"),
+)
+
+# (row id, image path, stored sha256)
+Job = Tuple[int, str, str]
+
+
+# --------------------------------------------------------------------------- #
+# Schema
+# --------------------------------------------------------------------------- #
+
+def ensure_generated_columns(conn: sqlite3.Connection) -> None:
+    """Add the JSON-backed generated columns and their indexes if missing."""
+    existing = {row[1] for row in conn.execute("PRAGMA table_xinfo(ExerciseImages)")}
+    for column, sql_type, json_path in GENERATED_COLUMNS:
+        if column in existing:
+            continue
+        # json_valid guard: the column defaults to '' which json_extract rejects
+        conn.execute(
+            f"ALTER TABLE ExerciseImages ADD COLUMN {column} {sql_type} GENERATED ALWAYS AS "
+            f"(CASE WHEN json_valid(ImageMetadata) THEN json_extract(ImageMetadata, '{json_path}') END) VIRTUAL"
+        )
+    for name, columns in GENERATED_INDEXES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ExerciseImages({columns})")
+
+
+# --------------------------------------------------------------------------- #
+# Worker
+# --------------------------------------------------------------------------- #
+
+_worker_db: Optional[str] = None
+_worker_conn: Optional[sqlite3.Connection] = None
+
+
+def _init_worker(db_path: str) -> None:
+    global _worker_db
+    _worker_db = db_path
+
+
+def _blob_for(row_id: int) -> bytes:
+    global _worker_conn
+    if _worker_conn is None:
+        _worker_conn = gymdb.open_connection(_worker_db, readonly=True)
+    row = _worker_conn.execute("SELECT ImageData FROM ExerciseImages WHERE Id = ?", (row_id,)).fetchone()
+    return bytes(row[0]) if row and row[0] else b""
+
+
+def resolve_image_path(image_path: str) -> Optional[Path]:
+    if not image_path:
+        return None
+    path = Path(image_path.replace("\\", "/"))
+    if not path.is_absolute():
+        path = PROJECT_ROOT / path
+    return path if path.is_file() else None
+
+
+def difference_hash(im: Image.Image) -> str:
+    """64-bit dHash: compares horizontally adjacent pixels of a 9x8 grayscale reduction."""
+    small = im.convert("L").resize((PHASH_SIZE + 1, PHASH_SIZE), Image.BILINEAR)
+    px = small.tobytes()
+    bits = 0
+    for y in range(PHASH_SIZE):
+        row = px[y * (PHASH_SIZE + 1):(y + 1) * (PHASH_SIZE + 1)]
+        for x in range(PHASH_SIZE):
+            bits = (bits << 1) | (row[x] > row[x + 1])
+    return f"{bits:016x}"
+
+
+def dominant_color(im: Image.Image) -> str:
+    rgba = im.convert("RGBA")
+    rgba.thumbnail((DOMINANT_SAMPLE, DOMINANT_SAMPLE))
+    # Ignore transparent pixels by painting them onto white, which then loses the vote
+    background = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+    rgb = Image.alpha_composite(background, rgba).convert("RGB")
+    quantized = rgb.quantize(colors=DOMINANT_COLORS)
+    palette = quantized.getpalette() or []
+    counts = sorted(quantized.getcolors() or [], reverse=True)
+    for _, index in counts:
+        r, g, b = palette[index * 3:index * 3 + 3]
+        if (r, g, b) != (255, 255, 255) or len(counts) == 1:
+            return f"#{r:02x}{g:02x}{b:02x}"
+    return "#ffffff"
+
+
+def describe_image(data: bytes) -> Dict[str, object]:
+    with Image.open(io.BytesIO(data)) as im:
+        meta: Dict[str, object] = {
+            "width": im.width,
+            "height": im.height,
+            "format": (im.format or "").lower(),
+            "mode": im.mode,
+        }
+        if im.format == "JPEG":
+            im.draft("RGB", (DOMINANT_SAMPLE * 2, DOMINANT_SAMPLE * 2))
+        im.thumbnail((DOMINANT_SAMPLE * 2, DOMINANT_SAMPLE * 2))
+        meta["phash"] = difference_hash(im)
+        meta["dominant_color"] = dominant_color(im)
+    return meta
+
+
+def compute_metadata(job: Job) -> Tuple[int, Optional[str], Optional[str]]:
+    """Return (row id, metadata json or None when unchanged/empty, error)."""
+    row_id, image_path, stored_sha = job
+    path = resolve_image_path(image_path)
+    try:
+        data = path.read_bytes() if path else _blob_for(row_id)
+    except (OSError, sqlite3.Error) as exc:
+        return row_id, None, f"{type(exc).__name__}: {exc}"
+    if not data:
+        return row_id, None, None
+
+    sha = hashlib.sha256(data).hexdigest()
+    if sha == stored_sha:
+        return row_id, None, None
+
+    try:
+        meta = describe_image(data)
+    except (UnidentifiedImageError, OSError, ValueError) as exc:
+        return row_id, None, f"{type(exc).__name__}: {exc}"
+    meta["bytes"] = len(data)
+    meta["sha256"] = sha
+    meta["source"] = "file" if path else "blob"
+    return row_id, json.dumps(meta, sort_keys=True), None
+
+
+# --------------------------------------------------------------------------- #
+# CLI
+# --------------------------------------------------------------------------- #
+
+def load_jobs(conn: sqlite3.Connection, force: bool) -> List[Job]:
+    rows = conn.execute(
+        "SELECT Id, COALESCE(ImagePath, ''), COALESCE(ImageSha256, '') FROM ExerciseImages ORDER BY Id"
+    )
+    return [(row_id, path, "" if force else sha) for row_id, path, sha in rows]
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Precompute ExerciseImages.ImageMetadata in parallel")
+    ap.add_argument("--db", default=str(DEFAULT_DB), help="SQLite database path")
+    ap.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    ap.add_argument("--force", action="store_true", help="Recompute rows even if their hash is unchanged")
+    args = ap.parse_args()
+
+    db_path = Path(args.db).resolve()
+    if not db_path.exists():
+        print(f"Database not found: {db_path}", file=sys.stderr)
+        return 1
+
+    try:
+        with gymdb.transaction(db_path) as conn:
+            ensure_generated_columns(conn)
+        with gymdb.connection(db_path, readonly=True) as conn:
+            jobs = load_jobs(conn, args.force)
+
+        updated = unchanged = failed = 0
+        pending: List[Tuple[str, int]] = []
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(str(db_path),)) as pool:
+            for row_id, meta_json, error in pool.map(compute_metadata, jobs, chunksize=8):
+                if error:
+                    failed += 1
+                    print(f"  Row {row_id}: {error}", file=sys.stderr)
+                elif meta_json is None:
+                    unchanged += 1
+                else:
+                    pending.append((meta_json, row_id))
+                    if len(pending) >= BATCH_SIZE:
+                        with gymdb.transaction(db_path) as conn:
+                            conn.executemany("UPDATE ExerciseImages SET ImageMetadata = ? WHERE Id = ?", pending)
+                        updated += len(pending)
+                        pending.clear()
+        if pending:
+            with gymdb.transaction(db_path) as conn:
+                conn.executemany("UPDATE ExerciseImages SET ImageMetadata = ? WHERE Id = ?", pending)
+            updated += len(pending)
+    finally:
+        gymdb.close_all(db_path)
+
+    print(f"Scanned {len(jobs)} images: {updated} updated, {unchanged} unchanged or empty, {failed} failed")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,7 +3,7 @@
 Remove (make transparent) the uniform background of an image by sampling border pixels.
 
 Usage:
-  python scripts/remove_bg_transparent.py --source in.png --out out.png [--tolerance 28] [--feather 12]
+  python scripts/remove_bg_transparent.py --source in.png --out out.png [--tolerance 28] [--feather 12] [--profile]
 
 Notes:
   - Auto-detects background color from the image border (corners + edges).
@@ -19,6 +19,8 @@ from typing import Iterable, Tuple
 
 from PIL import Image
 
+from instrumentation import add_profile_argument, count, profiling, span
+
 
 def sample_border_colors(im: Image.Image, step: int = 10) -> list[Tuple[int, int, int]]:
     w, h = im.size
@@ -67,6 +69,7 @@ def remove_background(
 
     hard = tolerance
     soft = tolerance + max(0.0, feather)
+    count("pixels_processed", w * h)
 
     for y in range(h):
         for x in range(w):
@@ -85,26 +88,37 @@ def remove_background(
     return src
 
 
-def main() -> int:
-    ap = argparse.ArgumentParser(description="Remove uniform background to transparency")
+def main(argv: list[str] | None = None, prog: str | None = None) -> int:
+    ap = argparse.ArgumentParser(prog=prog, description="Remove uniform background to transparency")
     ap.add_argument("--source", required=True, help="Input image path (PNG recommended)")
     ap.add_argument("--out", default="icon_transparent.png", help="Output PNG path")
     ap.add_argument("--tolerance", type=float, default=28.0, help="Color distance for full transparency")
     ap.add_argument("--feather", type=float, default=12.0, help="Additional distance for soft edge ramp")
-    args = ap.parse_args()
+    add_profile_argument(ap, "remove_bg")
+    args = ap.parse_args(argv)
+
+    with profiling(args.profile, "remove_bg"):
+        return run(args)
+
 
+def run(args: argparse.Namespace) -> int:
     src_path = Path(args.source)
     if not src_path.exists():
         print(f"Source not found: {src_path}")
         return 1
 
-    im = Image.open(src_path)
-    border = sample_border_colors(im, step=20)
-    bg = pick_background_color(border)
+    with span("load"):
+        im = Image.open(src_path)
+        im.load()
+    with span("detect_background"):
+        border = sample_border_colors(im, step=20)
+        bg = pick_background_color(border)
 
-    out_im = remove_background(im, bg, tolerance=args.tolerance, feather=args.feather)
+    with span("remove_background"):
+        out_im = remove_background(im, bg, tolerance=args.tolerance, feather=args.feather)
     out_path = Path(args.out)
-    out_im.save(out_path, format="PNG")
+    with span("save"):
+        out_im.save(out_path, format="PNG")
     print(f"Saved with transparent background: {out_path} (bg~{bg})")
     return 0
 
@@ -0,0 +1,562 @@
+#!/usr/bin/env python3
+"""
+Phrase-level translation memory for exercise names (English -> Spanish).
+
+Exercise names are mostly built from a small vocabulary: equipment
+("Dumbbell"), position and grip modifiers ("Incline", "Close Grip") and a
+movement ("Bench Press"). The memory splits a name into those phrases and, when
+every part is known, assembles the Spanish name locally in Spanish word order:
+movement, modifiers, equipment ("Incline Dumbbell Bench Press" -> "Press de
+banca inclinado con mancuernas"). Only names it cannot assemble reach the
+translation backend.
+
+Usage in a tool:
+  from translation_memory import PhraseMemory
+
+  memory = PhraseMemory()
+  spanish = memory.translate("Seated Cable Row", remote)   # remote(text) -> str
+  print(memory.report())
+
+  python scripts/translation_memory.py "Incline Dumbbell Bench Press" "Barbell Curl"
+  python scripts/translation_memory.py --names docs/ejercicios/metadata.csv [--show] [--misses 20]
+  python scripts/translation_memory.py --self-check
+
+Notes:
+  - Outcomes per name: `whole` (a fixed name such as a muscle group),
+    `assembled` (every phrase known, no backend call), `partial` (one unknown
+    run of words next to known equipment/modifiers: only that run is sent and
+    the rest assembled) and `remote` (the whole name is sent). Names with
+    connectors ("to", "on", "with"), two movements or unknown words mixed with a
+    known movement are sent whole rather than guessed.
+  - Single-word modifiers ending in -o agree with the movement's gender and
+    number ("inclinado"/"inclinadas"); in a `partial` name the movement's
+    gender is unknown, so only invariable modifiers ("de pie", "a una mano")
+    may be combined with it.
+  - --names reads one name per line, or the "Ejercicio (en)" column of the
+    metadata.csv written by download_exercise_assets.py, and reports the hit
+    rate without calling any backend; --misses lists the unknown words that
+    would save the most calls if added to the tables below.
+  - Assembled names often differ from the backend translations that named the
+    existing docs/ejercicios folders ("Aperturas con mancuernas" vs "Mosca con
+    mancuernas"). download_exercise_assets.py therefore looks up the folder an
+    exercise is already stored in (by the English name in its image file name)
+    before asking the memory, so a re-scrape without translations_cache.json
+    still finds the files it downloaded.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+# English movement -> (Spanish, gender/number of its noun: m, f, mp, fp)
+MOVEMENTS: Dict[str, Tuple[str, str]] = {
+    "bench press": ("press de banca", "m"),
+    "floor press": ("press en el suelo", "m"),
+    "press": ("press", "m"),
+    "chest press": ("press de pecho", "m"),
+    "shoulder press": ("press de hombros", "m"),
+    "overhead press": ("press por encima de la cabeza", "m"),
+    "military press": ("press militar", "m"),
+    "arnold press": ("press Arnold", "m"),
+    "hammer press": ("press martillo", "m"),
+    "push press": ("push press", "m"),
+    "leg press": ("prensa de piernas", "f"),
+    "curl": ("curl", "m"),
+    "bicep curl": ("curl de bíceps", "m"),
+    "biceps curl": ("curl de bíceps", "m"),
+    "preacher curl": ("curl predicador", "m"),
+    "hammer curl": ("curl martillo", "m"),
+    "concentration curl": ("curl concentrado", "m"),
+    "drag curl": ("curl de arrastre", "m"),
+    "spider curl": ("curl araña", "m"),
+    "wrist curl": ("curl de muñeca", "m"),
+    "finger curl": ("curl de dedos", "m"),
+    "reverse wrist curl": ("curl de muñeca inverso", "m"),
+    "leg curl": ("curl femoral", "m"),
+    "row": ("remo", "m"),
+    "bent over row": ("remo inclinado", "m"),
+    "upright row": ("remo al mentón", "m"),
+    "rear delt row": ("remo para deltoides posterior", "m"),
+    "pendlay row": ("remo Pendlay", "m"),
+    "t bar row": ("remo en barra T", "m"),
+    "fly": ("aperturas", "fp"),
+    "flye": ("aperturas", "fp"),
+    "rear delt fly": ("aperturas posteriores", "fp"),
+    "reverse fly": ("aperturas invertidas", "fp"),
+    "pec deck fly": ("aperturas en contractora", "fp"),
+    "crossover": ("cruce", "m"),
+    "lateral raise": ("elevaciones laterales", "fp"),
+    "front raise": ("elevaciones frontales", "fp"),
+    "rear delt raise": ("elevaciones posteriores", "fp"),
+    "calf raise": ("elevación de talones", "f"),
+    "leg raise": ("elevación de piernas", "f"),
+    "knee raise": ("elevación de rodillas", "f"),
+    "hip raise": ("elevación de cadera", "f"),
+    "raise": ("elevación", "f"),
+    "squat": ("sentadilla", "f"),
+    "front squat": ("sentadilla frontal", "f"),
+    "goblet squat": ("sentadilla goblet", "f"),
+    "hack squat": ("sentadilla hack", "f"),
+    "split squat": ("sentadilla dividida", "f"),
+    "bulgarian split squat": ("sentadilla búlgara", "f"),
+    "pistol squat": ("sentadilla pistola", "f"),
+    "jump squat": ("sentadilla con salto", "f"),
+    "lunge": ("zancada", "f"),
+    "walking lunge": ("zancadas caminando", "fp"),
+    "deadlift": ("peso muerto", "m"),
+    "romanian deadlift": ("peso muerto rumano", "m"),
+    "stiff leg deadlift": ("peso muerto con piernas rígidas", "m"),
+    "sumo deadlift": ("peso muerto sumo", "m"),
+    "good morning": ("buenos días", "mp"),
+    "hip thrust": ("empuje de cadera", "m"),
+    "hip adduction": ("aducción de cadera", "f"),
+    "hip abduction": ("abducción de cadera", "f"),
+    "external rotation": ("rotación externa", "f"),
+    "external shoulder rotation": ("rotación externa de hombro", "f"),
+    "internal rotation": ("rotación interna", "f"),
+    "glute bridge": ("puente de glúteos", "m"),
+    "bridge": ("puente", "m"),
+    "shrug": ("encogimiento de hombros", "m"),
+    "pullover": ("pullover", "m"),
+    "pull up": ("dominada", "f"),
+    "chin up": ("dominada supina", "f"),
+    "push up": ("flexión", "f"),
+    "pushup": ("flexión", "f"),
+    "dip": ("fondos", "mp"),
+    "triceps dip": ("fondos de tríceps", "mp"),
+    "bench dip": ("fondos en banco", "mp"),
+    "triceps extension": ("extensión de tríceps", "f"),
+    "tricep extension": ("extensión de tríceps", "f"),
+    "leg extension": ("extensión de piernas", "f"),
+    "back extension": ("extensión de espalda", "f"),
+    "extension": ("extensión", "f"),
+    "skullcrusher": ("rompecráneos", "m"),
+    "skull crusher": ("rompecráneos", "m"),
+    "kickback": ("patada de tríceps", "f"),
+    "triceps kickback": ("patada de tríceps", "f"),
+    "glute kickback": ("patada de glúteo", "f"),
+    "pushdown": ("extensión de tríceps hacia abajo", "f"),
+    "triceps pushdown": ("extensión de tríceps hacia abajo", "f"),
+    "lat pulldown": ("jalón al pecho", "m"),
+    "pulldown": ("jalón", "m"),
+    "face pull": ("face pull", "m"),
+    "crunch": ("crunch", "m"),
+    "sit up": ("abdominal", "m"),
+    "plank": ("plancha", "f"),
+    "side plank": ("plancha lateral", "f"),
+    "russian twist": ("giro ruso", "m"),
+    "twist": ("giro", "m"),
+    "mountain climber": ("escalador", "m"),
+    "step up": ("subida al cajón", "f"),
+    "stretch": ("estiramiento", "m"),
+    "quadriceps stretch": ("estiramiento de cuadríceps", "m"),
+    "hamstring stretch": ("estiramiento de isquiotibiales", "m"),
+    "hip flexor stretch": ("estiramiento de flexores de cadera", "m"),
+    "chest stretch": ("estiramiento de pecho", "m"),
+    "shoulder stretch": ("estiramiento de hombro", "m"),
+    "calf stretch": ("estiramiento de gemelos", "m"),
+    "hold": ("sostén", "m"),
+    "hang": ("suspensión", "f"),
+    "rollout": ("rueda abdominal", "f"),
+    "ab wheel rollout": ("rueda abdominal", "f"),
+    "jumping jack": ("saltos de tijera", "mp"),
+    "burpee": ("burpee", "m"),
+    "clean": ("cargada", "f"),
+    "snatch": ("arrancada", "f"),
+    "swing": ("swing", "m"),
+    "thruster": ("thruster", "m"),
+}
+
+# English modifier -> Spanish. One-word entries agree with the movement (see _agree)
+MODIFIERS: Dict[str, str] = {
+    "incline": "inclinado",
+    "decline": "declinado",
+    "seated": "sentado",
+    "sitting": "sentado",
+    "lying": "tumbado",
+    "prone": "boca abajo",
+    "supine": "boca arriba",
+    "standing": "de pie",
+    "kneeling": "de rodillas",
+    "hanging": "colgado",
+    "assisted": "asistido",
+    "alternating": "alterno",
+    "alternate": "alterno",
+    "reverse": "inverso",
+    "lateral": "lateral",
+    "front": "frontal",
+    "rear": "posterior",
+    "high": "alto",
+    "middle": "medio",
+    "low": "bajo",
+    "isometric": "isométrico",
+    "single arm": "a una mano",
+    "one arm": "a una mano",
+    "single leg": "a una pierna",
+    "one leg": "a una pierna",
+    "close grip": "con agarre cerrado",
+    "narrow grip": "con agarre cerrado",
+    "wide grip": "con agarre abierto",
+    "neutral grip": "con agarre neutro",
+    "reverse grip": "con agarre inverso",
+    "underhand": "con agarre supino",
+    "overhand": "con agarre prono",
+    "bent over": "con el torso inclinado",
+    "bent arm": "con el brazo flexionado",
+    "bent knee": "con las rodillas flexionadas",
+    "straight leg": "con la pierna recta",
+    "straight arm": "con el brazo recto",
+    "overhead": "por encima de la cabeza",
+    "behind the neck": "tras nuca",
+    "jump": "con salto",
+    "jumping": "con salto",
+    "pause": "con pausa",
+    "paused": "con pausa",
+    "walking": "caminando",
+    "sumo": "sumo",
+    "romanian": "rumano",
+    "bulgarian": "búlgaro",
+    "olympic": "olímpico",
+    "floor": "en el suelo",
+    "wall": "en la pared",
+}
+
+# English equipment -> Spanish, placed at the end of the name
+EQUIPMENT: Dict[str, str] = {
+    "dumbbell": "con mancuernas",
+    "barbell": "con barra",
+    "ez bar": "con barra Z",
+    "ez barbell": "con barra Z",
+    "trap bar": "con barra hexagonal",
+    "cable": "en polea",
+    "band": "con banda elástica",
+    "resistance band": "con banda elástica",
+    "kettlebell": "con pesa rusa",
+    "smith": "en máquina Smith",
+    "smith machine": "en máquina Smith",
+    "lever": "en máquina de palanca",
+    "machine": "en máquina",
+    "medicine ball": "con balón medicinal",
+    "stability ball": "con fitball",
+    "bodyweight": "con peso corporal",
+    "weighted": "con lastre",
+    "sled": "con trineo",
+    "suspension": "en suspensión",
+    "trx": "en TRX",
+    "landmine": "con landmine",
+    "plate": "con disco",
+}
+
+# Names translated as a whole: the muscle groups of the index page and a few
+# one-word exercise titles
+WHOLE_NAMES: Dict[str, str] = {
+    "abs": "Abdominales",
+    "abdominals": "Abdominales",
+    "back": "Espalda",
+    "lower back": "Zona lumbar",
+    "biceps": "Bíceps",
+    "triceps": "Tríceps",
+    "calves": "Gemelos",
+    "cardio": "Cardio",
+    "chest": "Pecho",
+    "forearms": "Antebrazos",
+    "glutes": "Glúteos",
+    "hamstrings": "Isquiotibiales",
+    "hips": "Caderas",
+    "lats": "Dorsales",
+    "neck": "Cuello",
+    "quadriceps": "Cuadríceps",
+    "quads": "Cuadríceps",
+    "shoulders": "Hombros",
+    "thighs": "Muslos",
+    "traps": "Trapecios",
+    "trapezius": "Trapecios",
+    "jump rope": "Saltar la comba",
+}
+
+WORD = re.compile(r"[a-z0-9]+")
+MAX_PHRASE_WORDS = max(len(key.split()) for table in (MOVEMENTS, MODIFIERS, EQUIPMENT) for key in table)
+OUTCOMES = ("cached", "whole", "assembled", "partial", "remote")
+
+Remote = Callable[[str], str]
+
+
+class Phrase(NamedTuple):
+    kind: str  # movement, modifier, equipment, unknown
+    english: str
+    spanish: str = ""
+    gender: str = ""
+
+
+def normalize(text: str) -> List[str]:
+    return WORD.findall(text.lower().replace("'", ""))
+
+
+def _singular(word: str) -> str:
+    if word.endswith(("ches", "shes", "sses")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "ceps")) and len(word) > 2:
+        return word[:-1]
+    return word
+
+
+def _invariable(spanish: str) -> bool:
+    return " " in spanish or spanish in ("sumo",)
+
+
+def _agree(adjective: str, gender: str) -> str:
+    """inclinado -> inclinada/inclinados/inclinadas; lateral -> laterales. Phrases stay as they are."""
+    if _invariable(adjective):
+        return adjective
+    plural = gender.endswith("p")
+    if adjective.endswith("o"):
+        stem = adjective[:-1] + ("a" if gender.startswith("f") else "o")
+        return stem + "s" if plural else stem
+    if not plural:
+        return adjective
+    if adjective.endswith(("a", "e")):
+        return adjective + "s"
+    return adjective + "es"
+
+
+class PhraseMemory:
+    def __init__(
+        self,
+        movements: Optional[Dict[str, Tuple[str, str]]] = None,
+        modifiers: Optional[Dict[str, str]] = None,
+        equipment: Optional[Dict[str, str]] = None,
+        whole_names: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.movements = MOVEMENTS if movements is None else movements
+        self.modifiers = MODIFIERS if modifiers is None else modifiers
+        self.equipment = EQUIPMENT if equipment is None else equipment
+        self.whole_names = WHOLE_NAMES if whole_names is None else whole_names
+        self.stats: Counter = Counter()
+        self.unknown_words: Counter = Counter()
+
+    # ---- parsing ---------------------------------------------------------- #
+
+    def _lookup(self, words: List[str]) -> Optional[Phrase]:
+        english = " ".join(words)
+        candidates = [english]
+        singular = " ".join(words[:-1] + [_singular(words[-1])])
+        if singular != english:
+            candidates.append(singular)
+        for key in candidates:
+            if key in self.movements:
+                spanish, gender = self.movements[key]
+                return Phrase("movement", english, spanish, gender)
+            if key in self.equipment:
+                return Phrase("equipment", english, self.equipment[key])
+            if key in self.modifiers:
+                return Phrase("modifier", english, self.modifiers[key])
+        return None
+
+    def parse(self, text: str) -> List[Phrase]:
+        """Longest-match split into known phrases; unknown words are grouped into runs."""
+        words = normalize(text)
+        phrases: List[Phrase] = []
+        unknown: List[str] = []
+        index = 0
+        while index < len(words):
+            for size in range(min(MAX_PHRASE_WORDS, len(words) - index), 0, -1):
+                phrase = self._lookup(words[index:index + size])
+                if phrase is not None:
+                    break
+            else:
+                unknown.append(words[index])
+                index += 1
+                continue
+            if unknown:
+                phrases.append(Phrase("unknown", " ".join(unknown)))
+                unknown = []
+            phrases.append(phrase)
+            index += size
+        if unknown:
+            phrases.append(Phrase("unknown", " ".join(unknown)))
+        return phrases
+
+    # ---- translation ------------------------------------------------------ #
+
+    def translate(self, text: str, remote: Remote) -> str:
+        """Spanish name for `text`, calling `remote` for at most one part (or the whole)."""
+        outcome, spanish = self._translate(text, remote)
+        self.stats[outcome] += 1
+        return spanish
+
+    def note_cached(self) -> None:
+        """Record a lookup answered by the caller's whole-string cache."""
+        self.stats["cached"] += 1
+
+    def _translate(self, text: str, remote: Remote) -> Tuple[str, str]:
+        key = " ".join(normalize(text))
+        if key in self.whole_names:
+            return "whole", self.whole_names[key]
+
+        phrases = self.parse(text)
+        movements = [p for p in phrases if p.kind == "movement"]
+        unknown = [p for p in phrases if p.kind == "unknown"]
+        for phrase in unknown:
+            self.unknown_words.update(phrase.english.split())
+
+        if not unknown and len(movements) == 1:
+            return "assembled", self._assemble(movements[0], phrases)
+
+        if (
+            len(unknown) == 1
+            and not movements
+            and len(phrases) > 1
+            and all(_invariable(p.spanish) for p in phrases if p.kind == "modifier")
+        ):
+            # Only the unknown run goes out; it becomes the movement of the name
+            run = _original_words(text, unknown[0].english)
+            translated = remote(run).strip() or run
+            core = Phrase("movement", unknown[0].english, translated[:1].lower() + translated[1:], "m")
+            return "partial", self._assemble(core, phrases)
+
+        return "remote", remote(text.strip())
+
+    def _assemble(self, movement: Phrase, phrases: List[Phrase]) -> str:
+        adjectives, complements, equipment = [], [], []
+        for phrase in phrases:
+            if phrase.kind == "modifier":
+                if _invariable(phrase.spanish):
+                    complements.append(phrase.spanish)
+                else:
+                    adjectives.append(_agree(phrase.spanish, movement.gender))
+            elif phrase.kind == "equipment":
+                equipment.append(phrase.spanish)
+        parts = [movement.spanish, *adjectives, *complements, *equipment]
+        # Two spellings of the same thing ("Smith Machine", "Smith") collapse to one
+        spanish = " ".join(dict.fromkeys(parts))
+        return spanish[:1].upper() + spanish[1:]
+
+    # ---- reporting -------------------------------------------------------- #
+
+    def report(self) -> str:
+        stats = self.stats
+        looked_up = sum(stats[outcome] for outcome in OUTCOMES if outcome != "cached")
+        local = stats["whole"] + stats["assembled"]
+        sent = stats["partial"] + stats["remote"]
+        rate = local / looked_up * 100 if looked_up else 0.0
+        return (
+            f"Translation memory: {local}/{looked_up} uncached names translated locally ({rate:.1f}%), "
+            f"{stats['partial']} partial, {stats['remote']} sent whole; "
+            f"backend calls {sent} instead of {looked_up} "
+            f"(+{stats['cached']} answered by the cache)"
+        )
+
+
+def _original_words(text: str, normalized_run: str) -> str:
+    """The run of `text` whose normalized words are `normalized_run`, with its original casing."""
+    target = normalized_run.split()
+    tokens = text.split()
+    for start in range(len(tokens)):
+        words: List[str] = []
+        for end in range(start, len(tokens)):
+            words += normalize(tokens[end])
+            if words == target:
+                return " ".join(tokens[start:end + 1])
+            if words != target[:len(words)]:
+                break
+    return normalized_run.title()
+
+
+# --------------------------------------------------------------------------- #
+# CLI
+# --------------------------------------------------------------------------- #
+
+SELF_CHECK = (
+    ("Barbell Bench Press", "Press de banca con barra"),
+    ("Incline Dumbbell Bench Press", "Press de banca inclinado con mancuernas"),
+    ("Dumbbell Incline Fly", "Aperturas inclinadas con mancuernas"),
+    ("Seated Cable Row", "Remo sentado en polea"),
+    ("Standing Barbell Curl", "Curl de pie con barra"),
+    ("Dumbbell Walking Lunges", "Zancadas caminando con mancuernas"),
+    ("Band Assisted Pull-Up", "Dominada asistida con banda elástica"),
+    ("Smith Machine Squat", "Sentadilla en máquina Smith"),
+    ("Lever Seated Calf Raise", "Elevación de talones sentada en máquina de palanca"),
+    ("Chest", "Pecho"),
+)
+
+
+def read_names(path: Path) -> List[str]:
+    text = path.read_text(encoding="utf-8-sig")
+    if path.suffix.lower() == ".csv":
+        rows = csv.DictReader(text.splitlines())
+        column = "Ejercicio (en)" if "Ejercicio (en)" in (rows.fieldnames or []) else (rows.fieldnames or [""])[0]
+        return [row[column] for row in rows if row.get(column)]
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def self_check() -> int:
+    memory = PhraseMemory()
+    sent: List[str] = []
+
+    def remote(text: str) -> str:
+        sent.append(text)
+        return f"<{text}>"
+
+    ok = True
+    for english, expected in SELF_CHECK:
+        got = memory.translate(english, remote)
+        good = got == expected
+        ok &= good
+        print(f"  {'ok  ' if good else 'FAIL'} {english} -> {got}" + ("" if good else f" (expected {expected})"))
+
+    partial = memory.translate("Dumbbell Zottman Curl Thing", remote)
+    good = sent[-1] == "Dumbbell Zottman Curl Thing" and partial.startswith("<")
+    ok &= good
+    print(f"  {'ok  ' if good else 'FAIL'} unknown words next to a movement are sent whole")
+    sent.clear()
+    partial = memory.translate("Kettlebell Turkish Get Up", remote)
+    good = sent == ["Turkish Get Up"] and partial == "<Turkish Get Up> con pesa rusa"
+    ok &= good
+    print(f"  {'ok  ' if good else 'FAIL'} only the unknown run is sent: {partial}")
+    print(memory.report())
+    return 0 if ok else 1
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Phrase-level translation memory for exercise names")
+    ap.add_argument("name", nargs="*", help="English exercise names to translate")
+    ap.add_argument("--names", help="File with one name per line, or metadata.csv")
+    ap.add_argument("--show", action="store_true", help="Print every translation")
+    ap.add_argument("--misses", type=int, default=10, help="Unknown words to list, most frequent first")
+    ap.add_argument("--self-check", action="store_true", help="Check a few known translations")
+    args = ap.parse_args()
+
+    if args.self_check:
+        return self_check()
+
+    names = list(args.name)
+    if args.names:
+        names_path = Path(args.names)
+        if not names_path.is_file():
+            print(f"Names file not found: {names_path}", file=sys.stderr)
+            return 1
+        names += read_names(names_path)
+    if not names:
+        ap.print_help()
+        return 0
+
+    memory = PhraseMemory()
+    for name in names:
+        # Nothing leaves the machine: the placeholder marks what would be sent
+        spanish = memory.translate(name, lambda text: f"<{text}>")
+        if args.show or args.name:
+            print(f"{name} -> {spanish}")
+    print(memory.report())
+    if args.misses and memory.unknown_words:
+        common = ", ".join(f"{word} ({hits})" for word, hits in memory.unknown_words.most_common(args.misses))
+        print(f"Most common unknown words: {common}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
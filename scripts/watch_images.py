@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""
+Watch the exercise and AutoMap image folders and rebuild the derivatives of
+only the files that changed: background removal, a fitted square icon and a
+thumbnail, on a process pool.
+
+Usage:
+  python scripts/watch_images.py [--out derived_images] [--workers 2] [--debounce 1.5]
+  python scripts/watch_images.py --once                     # catch up and exit
+  python scripts/watch_images.py --root some/dir --tasks thumb,icon --pack exercise_images.pack
+  python scripts/watch_images.py --self-check               # exercise it on a temp directory
+
+Derivatives (PNG, mirroring the source tree under --out):
+  transparent/<rel>.png   remove_bg_transparent.remove_background with the detected border color
+  icon/<rel>.png          fit_icon autocrop + fit_square_with_padding of the transparent image, ICON_SIZE px
+  thumb/<rel>.png         THUMB_SIZE px thumbnail of the original
+
+Notes:
+  - Change detection polls (mtime_ns, size) with os.scandir every --interval
+    seconds; it needs no extra packages and behaves the same on Windows, where
+    the app lives. A few hundred files cost a millisecond or two per scan.
+  - A change is queued once the file has been stable for --debounce seconds,
+    so a photo still being copied is processed once, when complete. A file that
+    changes again while in flight is requeued when its job finishes.
+  - At startup only sources newer than their derivatives (or without them) are
+    processed; deleting a source deletes its derivatives. A root or folder that
+    cannot be listed (permissions, an unplugged drive) is reported and its files
+    are kept as they were, not treated as deleted.
+  - With --pack, the exercise image pack is rewritten after each batch of
+    changes settles (see pack_exercise_images.py). It packs the --root folders
+    (folders under docs/ejercicios keyed by exercise folder, others by file
+    name), or the pack's own default sources when no --root is given.
+  - A status line on stderr shows files debouncing, queued, running, done and
+    failed, plus end-to-end latency (change seen -> derivatives written).
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from PIL import Image
+
+from fit_icon import autocrop_to_content, fit_square_with_padding
+from remove_bg_transparent import pick_background_color, remove_background, sample_border_colors
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_ROOTS = (PROJECT_ROOT / "docs" / "ejercicios", PROJECT_ROOT / "src" / "app-ui" / "Images" / "AutoMap")
+DEFAULT_OUT = PROJECT_ROOT / "derived_images"
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp"}
+TASKS = ("transparent", "icon", "thumb")
+THUMB_SIZE = 256
+ICON_SIZE = 128
+ICON_PADDING = 8.0
+LATENCY_WINDOW = 500
+
+Signature = Tuple[int, int]  # (mtime_ns, size)
+
+
+class Job(NamedTuple):
+    source: str
+    outputs: Dict[str, str]  # task -> derivative path
+
+
+# --------------------------------------------------------------------------- #
+# Worker
+# --------------------------------------------------------------------------- #
+
+def _save_atomic(im: Image.Image, dest: Path) -> None:
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(dest.name + ".tmp")
+    im.save(tmp, format="PNG")
+    os.replace(tmp, dest)
+
+
+def build_derivatives(job: Job) -> Tuple[str, Optional[str], float]:
+    """Return (source, error, seconds)."""
+    start = time.perf_counter()
+    try:
+        with Image.open(job.source) as opened:
+            im = opened.convert("RGBA")
+        if "thumb" in job.outputs:
+            thumb = im.copy()
+            thumb.thumbnail((THUMB_SIZE, THUMB_SIZE), Image.LANCZOS)
+            _save_atomic(thumb, Path(job.outputs["thumb"]))
+        if "transparent" in job.outputs or "icon" in job.outputs:
+            bg = pick_background_color(sample_border_colors(im, step=20))
+            transparent = remove_background(im, bg)
+            if "transparent" in job.outputs:
+                _save_atomic(transparent, Path(job.outputs["transparent"]))
+            if "icon" in job.outputs:
+                fitted = fit_square_with_padding(autocrop_to_content(transparent), padding_percent=ICON_PADDING)
+                _save_atomic(fitted.resize((ICON_SIZE, ICON_SIZE), Image.LANCZOS), Path(job.outputs["icon"]))
+    except Exception as exc:  # reported per file; the watcher keeps running
+        return job.source, f"{type(exc).__name__}: {exc}", time.perf_counter() - start
+    return job.source, None, time.perf_counter() - start
+
+
+# --------------------------------------------------------------------------- #
+# Watcher
+# --------------------------------------------------------------------------- #
+
+def scan(roots: List[Path], exclude: Path) -> Tuple[Dict[Path, Signature], Dict[Path, str]]:
+    """Return (image -> signature, unreadable directory -> error).
+
+    A folder that was removed between listing and scanning is simply gone; any
+    other failure means its contents are unknown, not deleted.
+    """
+    found: Dict[Path, Signature] = {}
+    failed: Dict[Path, str] = {}
+    stack: List[Path] = []
+    for root in roots:
+        if root.is_dir():
+            stack.append(root)
+        else:
+            failed[root] = "not a readable directory"
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            continue
+        except OSError as exc:
+            failed[directory] = f"{type(exc).__name__}: {exc}"
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    path = Path(entry.path)
+                    if path != exclude:
+                        stack.append(path)
+                elif os.path.splitext(entry.name)[1].lower() in IMAGE_SUFFIXES:
+                    st = entry.stat()
+                    found[Path(entry.path)] = (st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                continue
+            except OSError as exc:
+                failed[Path(entry.path)] = f"{type(exc).__name__}: {exc}"
+    return found, failed
+
+
+class Stats:
+    def __init__(self) -> None:
+        self.done = 0
+        self.failed = 0
+        self.deleted = 0
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.work_seconds: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def percentile(self, values: Deque[float], q: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def line(self, debouncing: int, queued: int, running: int) -> str:
+        median = statistics.median(self.latencies) if self.latencies else 0.0
+        return (
+            f"debouncing {debouncing:>3} | queued {queued:>3} | running {running:>2} | "
+            f"done {self.done:>5} | failed {self.failed:>3} | deleted {self.deleted:>3} | "
+            f"latency p50 {median:6.2f}s p95 {self.percentile(self.latencies, 0.95):6.2f}s | "
+            f"work p50 {statistics.median(self.work_seconds) if self.work_seconds else 0.0:5.2f}s"
+        )
+
+
+class Watcher:
+    def __init__(self, roots: List[Path], out: Path, tasks: List[str], workers: Optional[int],
+                 debounce: float, pack: Optional[Path] = None, pack_roots: Optional[List[Path]] = None):
+        self.roots = roots
+        self.out = out
+        self.tasks = tasks
+        self.debounce = debounce
+        self.pack = pack
+        self.pack_roots = pack_roots if pack_roots is not None else roots
+        self.scan_failures: Dict[Path, str] = {}
+        self.max_running = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(max_workers=self.max_running)
+        self.known: Dict[Path, Signature] = {}
+        self.pending: Dict[Path, Tuple[Signature, float, float]] = {}  # sig, first seen, last change
+        self.queue: Deque[Tuple[Path, float]] = deque()  # (source, first seen)
+        self.running: Dict[Future, Tuple[Path, float, Signature]] = {}
+        self.dirty: set[Path] = set()
+        self.stats = Stats()
+        self.pack_needed = False
+
+    # -- paths ---------------------------------------------------------------
+
+    def outputs_for(self, source: Path) -> Dict[str, str]:
+        prefix = Path(source.name)
+        for root in self.roots:
+            if source.is_relative_to(root):
+                rel = source.relative_to(root)
+                # Several roots: keep them apart under their folder name
+                prefix = Path(root.name) / rel if len(self.roots) > 1 else rel
+                break
+        return {task: str(self.out / task / prefix.with_name(prefix.name + ".png")) for task in self.tasks}
+
+    def is_stale(self, source: Path, sig: Signature) -> bool:
+        for output in self.outputs_for(source).values():
+            try:
+                if os.stat(output).st_mtime_ns < sig[0]:
+                    return True
+            except FileNotFoundError:
+                return True
+        return False
+
+    # -- loop ----------------------------------------------------------------
+
+    def start(self) -> None:
+        """Initial scan: queue only sources whose derivatives are missing or older."""
+        now = time.monotonic()
+        self.known = self.scan()
+        for source, sig in sorted(self.known.items()):
+            if self.is_stale(source, sig):
+                self.queue.append((source, now))
+
+    def scan(self) -> Dict[Path, Signature]:
+        current, failed = scan(self.roots, self.out)
+        for directory, error in failed.items():
+            if directory not in self.scan_failures:
+                print(f"\n  Cannot scan {directory} ({error}); keeping its derivatives", file=sys.stderr)
+        for directory in set(self.scan_failures) - set(failed):
+            print(f"\n  {directory} is readable again", file=sys.stderr)
+        self.scan_failures = failed
+        # Files under an unreadable folder are unknown, not deleted: keep their last state
+        for source, sig in self.known.items():
+            if source not in current and any(source.is_relative_to(d) for d in failed):
+                current[source] = sig
+        return current
+
+    def poll(self) -> None:
+        now = time.monotonic()
+        current = self.scan()
+
+        for source, sig in current.items():
+            if self.known.get(source) != sig:
+                first = self.pending[source][1] if source in self.pending else now
+                self.pending[source] = (sig, first, now)
+        for source in set(self.known) - set(current):
+            self.pending.pop(source, None)
+            self.remove_outputs(source)
+        self.known = current
+
+        for source, (sig, first, last) in list(self.pending.items()):
+            if now - last < self.debounce:
+                continue
+            del self.pending[source]
+            if any(path == source for path, _, _ in self.running.values()):
+                self.dirty.add(source)
+            elif all(path != source for path, _ in self.queue):
+                self.queue.append((source, first))
+
+        self.collect()
+        self.dispatch()
+        if self.pack and self.pack_needed and not (self.pending or self.queue or self.running):
+            self.rebuild_pack()
+
+    def dispatch(self) -> None:
+        while self.queue and len(self.running) < self.max_running:
+            source, first = self.queue.popleft()
+            sig = self.known.get(source)
+            if sig is None:
+                continue  # deleted while queued
+            future = self.pool.submit(build_derivatives, Job(str(source), self.outputs_for(source)))
+            self.running[future] = (source, first, sig)
+
+    def collect(self) -> None:
+        for future in [f for f in self.running if f.done()]:
+            source, first, sig = self.running.pop(future)
+            _, error, seconds = future.result()
+            if error:
+                self.stats.failed += 1
+                print(f"\n  {source}: {error}", file=sys.stderr)
+            else:
+                self.stats.done += 1
+                self.stats.latencies.append(time.monotonic() - first)
+                self.stats.work_seconds.append(seconds)
+                self.pack_needed = True
+            if source in self.dirty or (source in self.known and self.known[source] != sig):
+                self.dirty.discard(source)
+                self.queue.append((source, time.monotonic()))
+
+    def remove_outputs(self, source: Path) -> None:
+        for output in self.outputs_for(source).values():
+            try:
+                os.remove(output)
+            except FileNotFoundError:
+                pass
+        self.stats.deleted += 1
+        self.pack_needed = True
+
+    def rebuild_pack(self) -> None:
+        import pack_exercise_images
+
+        start = time.perf_counter()
+        sources = []
+        for root in self.pack_roots:
+            # Exercise folders are keyed by folder name, everything else by file name
+            if root.is_relative_to(pack_exercise_images.EXERCISES_ROOT):
+                sources.extend(pack_exercise_images.iter_sources(root, None))
+            else:
+                sources.extend(pack_exercise_images.iter_sources(None, root))
+        count, size = pack_exercise_images.write_pack(self.pack, sources)
+        self.pack_needed = False
+        print(f"\n  Rewrote {self.pack} ({count} images, {size / 1024 / 1024:.1f} MB) "
+              f"in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+    def idle(self) -> bool:
+        return not (self.pending or self.queue or self.running)
+
+    def status(self) -> str:
+        return self.stats.line(len(self.pending), len(self.queue), len(self.running))
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+def run_loop(watcher: Watcher, interval: float, once: bool, stop: Optional[threading.Event] = None,
+             stats_interval: float = 2.0) -> None:
+    interactive = sys.stderr.isatty()
+    last_status = 0.0
+    watcher.start()
+    while True:
+        watcher.poll()
+        now = time.monotonic()
+        if now - last_status >= stats_interval:
+            end = "\r" if interactive else "\n"
+            print(watcher.status(), end=end, file=sys.stderr, flush=True)
+            last_status = now
+        if once and watcher.idle():
+            break
+        if stop is not None and stop.wait(interval):
+            break
+        if stop is None:
+            time.sleep(interval)
+    print(watcher.status(), file=sys.stderr)
+
+
+# --------------------------------------------------------------------------- #
+# Self check
+# --------------------------------------------------------------------------- #
+
+def _sample_image(path: Path, color: Tuple[int, int, int]) -> None:
+    im = Image.new("RGB", (160, 120), (250, 250, 250))
+    im.paste(Image.new("RGB", (60, 50), color), (50, 35))
+    im.save(path)
+
+
+def self_check(workers: Optional[int]) -> int:
+    """Drop, edit and delete files in a temp tree and check the derivatives follow."""
+    with tempfile.TemporaryDirectory(prefix="watch_images_") as tmp:
+        root = Path(tmp) / "ejercicios"
+        out = Path(tmp) / "derived"
+        (root / "Pecho" / "Press de banca").mkdir(parents=True)
+        _sample_image(root / "Pecho" / "Press de banca" / "a.png", (200, 30, 30))
+
+        pack = Path(tmp) / "images.pack"
+        watcher = Watcher([root], out, list(TASKS), workers, debounce=0.3, pack=pack)
+        stop = threading.Event()
+        thread = threading.Thread(target=run_loop, args=(watcher, 0.1, False, stop, 0.5))
+        thread.start()
+
+        def wait_for(predicate, timeout: float = 30.0) -> bool:
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                if predicate():
+                    return True
+                time.sleep(0.05)
+            return False
+
+        def derived(rel: str) -> List[Path]:
+            return [out / task / (rel + ".png") for task in TASKS]
+
+        checks: List[Tuple[str, bool]] = []
+        try:
+            checks.append(("initial file processed", wait_for(lambda: all(p.exists() for p in derived("Pecho/Press de banca/a.png")))))
+
+            new = root / "Espalda" / "Remo" / "b.jpg"
+            new.parent.mkdir(parents=True)
+            _sample_image(new, (30, 30, 200))
+            checks.append(("new file processed", wait_for(lambda: all(p.exists() for p in derived("Espalda/Remo/b.jpg")))))
+
+            wait_for(watcher.idle)
+            icon = derived("Pecho/Press de banca/a.png")[1]
+            before = icon.stat().st_mtime_ns
+            done_before = watcher.stats.done
+            source = root / "Pecho" / "Press de banca" / "a.png"
+            for color in ((10, 200, 10), (10, 10, 10), (200, 200, 10)):  # burst inside the debounce window
+                _sample_image(source, color)
+                time.sleep(0.05)
+            checks.append(("edit reprocessed", wait_for(lambda: icon.exists() and icon.stat().st_mtime_ns != before)))
+            wait_for(watcher.idle)
+            checks.append(("burst debounced to one job", watcher.stats.done - done_before == 1))
+
+            new.unlink()
+            checks.append(("deletion removes derivatives", wait_for(lambda: not any(p.exists() for p in derived("Espalda/Remo/b.jpg")))))
+
+            wait_for(watcher.idle)
+            import pack_exercise_images
+
+            with pack_exercise_images.ImagePack.open(pack) as packed:
+                keys = packed.keys()
+            checks.append(("--pack packs the watched root", keys == ["press de banca/a"]))
+
+            # A root that vanishes (unplugged drive) must not look like deleted files
+            hidden = root.with_name("ejercicios_offline")
+            root.rename(hidden)
+            wait_for(lambda: root in watcher.scan_failures)
+            time.sleep(0.5)
+            kept = all(p.exists() for p in derived("Pecho/Press de banca/a.png"))
+            hidden.rename(root)
+            checks.append(("unreadable root keeps its derivatives", kept and watcher.stats.deleted == 1))
+        finally:
+            stop.set()
+            thread.join()
+            watcher.close()
+
+    for name, ok in checks:
+        print(f"  {'ok  ' if ok else 'FAIL'} {name}")
+    return 0 if all(ok for _, ok in checks) else 1
+
+
+# --------------------------------------------------------------------------- #
+# CLI
+# --------------------------------------------------------------------------- #
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Watch image folders and rebuild derivatives of changed files")
+    ap.add_argument("--root", action="append", default=None, help="Folder to watch (repeatable)")
+    ap.add_argument("--out", default=str(DEFAULT_OUT), help="Derivatives folder")
+    ap.add_argument("--tasks", default=",".join(TASKS), help=f"Comma-separated subset of {','.join(TASKS)}")
+    ap.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    ap.add_argument("--interval", type=float, default=0.5, help="Polling interval in seconds")
+    ap.add_argument("--debounce", type=float, default=1.5, help="Seconds a file must stay unchanged before processing")
+    ap.add_argument("--pack", default=None, help="Rewrite this exercise image pack after each settled batch")
+    ap.add_argument("--once", action="store_true", help="Process stale files and exit")
+    ap.add_argument("--self-check", action="store_true", help="Run the watcher against a temporary directory")
+    args = ap.parse_args()
+
+    if args.self_check:
+        return self_check(args.workers)
+
+    tasks = [task.strip() for task in args.tasks.split(",") if task.strip()]
+    unknown = sorted(set(tasks) - set(TASKS))
+    if unknown:
+        print(f"Unknown tasks: {', '.join(unknown)}", file=sys.stderr)
+        return 1
+    roots = [Path(root).resolve() for root in args.root] if args.root else list(DEFAULT_ROOTS)
+    out = Path(args.out).resolve()
+
+    pack_roots = None
+    if args.pack and not args.root:
+        import pack_exercise_images
+
+        pack_roots = [pack_exercise_images.EXERCISES_ROOT, pack_exercise_images.APP_IMAGES_ROOT]
+    watcher = Watcher(roots, out, tasks, args.workers, args.debounce, Path(args.pack) if args.pack else None,
+                      pack_roots)
+    print(f"Watching {', '.join(str(root) for root in roots)} -> {out} (Ctrl+C to stop)", file=sys.stderr)
+    try:
+        run_loop(watcher, args.interval, args.once)
+    except KeyboardInterrupt:
+        print("\nStopping...", file=sys.stderr)
+    finally:
+        watcher.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())